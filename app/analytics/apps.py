@@ -0,0 +1,20 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save, pre_save
+
+
+class AnalyticsConfig(AppConfig):
+    name = 'analytics'
+
+    def ready(self):
+        from core.models import ArchivedOrder, Order
+        from analytics import rollups
+
+        pre_save.connect(rollups.order_pre_save, sender=Order,
+                         dispatch_uid='analytics.order_pre_save')
+        post_save.connect(rollups.order_post_save, sender=Order,
+                          dispatch_uid='analytics.order_post_save')
+        post_delete.connect(rollups.order_post_delete, sender=Order,
+                            dispatch_uid='analytics.order_post_delete')
+        # Archived orders still count, until they are deleted
+        post_delete.connect(rollups.order_post_delete, sender=ArchivedOrder,
+                            dispatch_uid='analytics.archived_order_post_delete')
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import connection, transaction
+
+from core.models import ArchivedOrder, Order, OrderRollup
+
+
+ROLLUP_FIELDS = ('created_at', 'pizza_flavour_id', 'size', 'status',
+                 'quantity', 'total_price')
+
+
+class RollupDelta:
+    """Accumulates changes to the order rollups and applies them at once
+
+    Changes to the same rollup row are merged first, so applying the delta
+    is a single INSERT ... ON CONFLICT statement however many orders it
+    covers. The rows it upserts stay locked until the transaction commits,
+    so orders created one at a time for the same day, pizza, size and
+    status wait on each other. The ingestion queue drain applies one delta
+    per batch of orders instead.
+    """
+
+    def __init__(self):
+        self.rows = defaultdict(lambda: [0, 0, Decimal('0')])
+
+    def add(self, created_at, pizza_flavour, size, status, quantity,
+            total_price, sign=1):
+        day = created_at.astimezone(dt_timezone.utc).date()
+        row = self.rows[(day, pizza_flavour, size, status)]
+        row[0] += sign
+        row[1] += sign * quantity
+        row[2] += sign * (total_price or 0)
+
+    def add_order(self, order, sign=1):
+        self.add(*(getattr(order, field) for field in ROLLUP_FIELDS),
+                 sign=sign)
+
+    def add_values(self, values, sign=1):
+        self.add(*(values[field] for field in ROLLUP_FIELDS), sign=sign)
+
+    def apply(self):
+        rows = [key + tuple(totals) for key, totals in self.rows.items()
+                if any(totals)]
+        if not rows:
+            return
+
+        table = connection.ops.quote_name(OrderRollup._meta.db_table)
+        placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(rows))
+        sql = (
+            'INSERT INTO {table} (day, pizza_flavour, size, status, orders,'
+            ' quantity, revenue) VALUES ' + placeholders + ' '
+            'ON CONFLICT (day, pizza_flavour, size, status) DO UPDATE SET'
+            ' orders = {table}.orders + EXCLUDED.orders,'
+            ' quantity = {table}.quantity + EXCLUDED.quantity,'
+            ' revenue = {table}.revenue + EXCLUDED.revenue'
+        ).replace('{table}', table)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [value for row in rows for value in row])
+        self.rows.clear()
+
+
+def record_orders(orders, sign=1):
+    """Add (or with sign=-1 remove) orders to the rollups"""
+    delta = RollupDelta()
+    for order in orders:
+        delta.add_order(order, sign)
+    delta.apply()
+
+
+def loaded_values(order):
+    """Return the rollup values an order had when it was loaded or saved"""
+    values = getattr(order, '_loaded_values', {})
+    if all(field in values for field in ROLLUP_FIELDS):
+        return values
+    return Order.objects.filter(pk=order.pk).values(*ROLLUP_FIELDS).first()
+
+
+def remember_values(order):
+    order._loaded_values = {field: getattr(order, field)
+                            for field in ROLLUP_FIELDS}
+
+
+def rebuild():
+    """Recompute every rollup row from the current and archived orders
+
+    The rollups are locked for the rebuild, so order writes wait to apply
+    their changes until it commits, and then apply them to the new rows.
+    The totals are read after the lock is taken, so every order committed
+    before is counted exactly once.
+    """
+    table = connection.ops.quote_name(OrderRollup._meta.db_table)
+    orders = ' UNION ALL '.join(
+        'SELECT created_at, pizza_flavour_id, size, status, quantity,'
+        ' total_price FROM {}'.format(connection.ops.quote_name(
+            model._meta.db_table
+        ))
+        for model in (Order, ArchivedOrder)
+    )
+    sql = (
+        'INSERT INTO {table} (day, pizza_flavour, size, status, orders,'
+        ' quantity, revenue) '
+        "SELECT (created_at AT TIME ZONE 'UTC')::date, pizza_flavour_id,"
+        ' size, status, COUNT(*), SUM(quantity),'
+        ' COALESCE(SUM(total_price), 0) '
+        'FROM (' + orders + ') orders '
+        'GROUP BY 1, 2, 3, 4'
+    ).replace('{table}', table)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('LOCK TABLE {} IN EXCLUSIVE MODE'.format(table))
+        cursor.execute('DELETE FROM {}'.format(table))
+        cursor.execute(sql)
+
+
+def order_pre_save(sender, instance, raw=False, **kwargs):
+    """Signal receiver capturing the rollup values an order is leaving"""
+    if raw or instance._state.adding:
+        instance._rollup_previous = None
+    else:
+        instance._rollup_previous = loaded_values(instance)
+
+
+def order_post_save(sender, instance, created, raw=False, **kwargs):
+    """Signal receiver moving a saved order to its new rollup row"""
+    if raw:
+        return
+
+    delta = RollupDelta()
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        delta.add_values(previous, sign=-1)
+    if created or previous is not None:
+        delta.add_order(instance)
+    delta.apply()
+    remember_values(instance)
+
+
+def order_post_delete(sender, instance, **kwargs):
+    """Signal receiver removing a deleted order from the rollups"""
+    values = getattr(instance, '_loaded_values', {})
+    delta = RollupDelta()
+
+    if all(field in values for field in ROLLUP_FIELDS):
+        delta.add_values(values, sign=-1)
+    else:
+        delta.add_order(instance, sign=-1)
+    delta.apply()
@@ -0,0 +1,16 @@
+from rest_framework import serializers
+from core.metrics import TimedSerializerMixin
+
+
+class SalesSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Serializer for order totals grouped from the order rollups"""
+
+    day = serializers.DateField(required=False)
+    pizza_flavour = serializers.UUIDField(required=False)
+    flavour = serializers.CharField(required=False)
+    size = serializers.CharField(required=False)
+    status = serializers.CharField(required=False)
+    orders = serializers.IntegerField(source='total_orders')
+    quantity = serializers.IntegerField(source='total_quantity')
+    revenue = serializers.DecimalField(max_digits=18, decimal_places=2,
+                                       source='total_revenue')
@@ -0,0 +1,293 @@
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from analytics.rollups import rebuild
+from core.models import Pizza, Order, OrderRollup
+from pizza.cache import menu_cache
+
+
+SALES_URL = reverse('analytics:sales')
+ORDER_URL = reverse('order:order-list')
+BULK_ORDER_URL = reverse('order:order-bulk-create')
+TRANSITION_URL = reverse('order:adminOrders-transition')
+
+
+def rollup_rows():
+    """Return the non-empty rollup rows as comparable tuples"""
+    return sorted(
+        OrderRollup.objects.filter(orders__gt=0).values_list(
+            'day', 'pizza_flavour', 'size', 'status', 'orders', 'quantity',
+            'revenue'
+        )
+    )
+
+
+class OrderRollupTests(TestCase):
+    """Test order writes keep the sales rollups current"""
+
+    def setUp(self):
+        menu_cache.clear()
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@andela.com',
+            'password'
+        )
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        self.pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def rollup(self, **kwargs):
+        return OrderRollup.objects.get(pizza_flavour=self.pizza.uuid,
+                                       **kwargs)
+
+    def test_create_order_adds_to_rollup(self):
+        """Test creating orders counts them in their rollup row"""
+
+        self.client.post(ORDER_URL, {'pizza_flavour': 'Vegan', 'size': 'M',
+                                     'quantity': 2})
+        self.client.post(ORDER_URL, {'pizza_flavour': 'Vegan', 'size': 'M'})
+
+        rollup = self.rollup(size='M', status=Order.PENDING)
+        self.assertEqual(rollup.day, timezone.now().date())
+        self.assertEqual(rollup.orders, 2)
+        self.assertEqual(rollup.quantity, 3)
+        self.assertEqual(rollup.revenue, Decimal('45.00'))
+
+    def test_update_order_moves_rollup(self):
+        """Test changing an order moves it between rollup rows"""
+
+        self.client.post(ORDER_URL, {'pizza_flavour': 'Vegan'})
+        order = Order.objects.get(customer=self.user)
+
+        order.status = Order.IN_PROGRESS
+        order.save()
+
+        self.assertEqual(self.rollup(status=Order.PENDING).orders, 0)
+        self.assertEqual(self.rollup(status=Order.IN_PROGRESS).orders, 1)
+
+    def test_delete_order_removes_from_rollup(self):
+        """Test deleting an order takes it out of the rollups"""
+
+        self.client.post(ORDER_URL, {'pizza_flavour': 'Vegan'})
+        order = Order.objects.get(customer=self.user)
+        self.client.delete(reverse('order:order-detail', args=[order.uuid]))
+
+        rollup = self.rollup(status=Order.PENDING)
+        self.assertEqual(rollup.orders, 0)
+        self.assertEqual(rollup.revenue, Decimal('0.00'))
+
+    def test_bulk_create_and_transition_update_rollup(self):
+        """Test the bulk order endpoints keep the rollups current"""
+
+        self.client.post(BULK_ORDER_URL, [{'pizza_flavour': 'Vegan'}] * 3,
+                         format='json')
+        orders = [str(order.uuid) for order in Order.objects.all()[:2]]
+
+        self.client.force_authenticate(self.admin)
+        self.client.post(TRANSITION_URL, {'status': 'I', 'orders': orders},
+                         format='json')
+
+        self.assertEqual(self.rollup(status=Order.PENDING).orders, 1)
+        self.assertEqual(self.rollup(status=Order.IN_PROGRESS).orders, 2)
+        self.assertEqual(self.rollup(status=Order.IN_PROGRESS).revenue,
+                         Decimal('20.00'))
+
+    def test_rebuild_matches_incremental_rollups(self):
+        """Test rebuilding the rollups gives the incrementally kept rows"""
+
+        self.client.post(BULK_ORDER_URL, [
+            {'pizza_flavour': 'Vegan', 'size': 'L', 'quantity': 2},
+            {'pizza_flavour': 'Vegan'},
+        ], format='json')
+        order = Order.objects.get(size='S')
+        order.status = Order.CANCELLED
+        order.save()
+        expected = rollup_rows()
+
+        OrderRollup.objects.all().delete()
+        call_command('rebuild_order_rollups', stdout=StringIO())
+
+        self.assertEqual(rollup_rows(), expected)
+
+
+class ConcurrentTransitionRollupTests(TransactionTestCase):
+    """Test transitions racing other status changes keep the rollups right"""
+
+    def setUp(self):
+        menu_cache.clear()
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@andela.com',
+            'password'
+        )
+        pizza = Pizza.objects.create(flavour='Vegan', prices={"S": 10.00})
+        self.order = Order.objects.create(customer=self.admin,
+                                          pizza_flavour=pizza)
+
+    def transition(self, responses):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        try:
+            responses.append(client.post(
+                TRANSITION_URL,
+                {'status': 'C', 'orders': [str(self.order.uuid)]},
+                format='json'
+            ))
+        finally:
+            connection.close()
+
+    def test_transition_waits_for_concurrent_change(self):
+        """Test the status an order leaves is read after the change commits"""
+
+        responses = []
+        thread = threading.Thread(target=self.transition, args=(responses,))
+
+        with transaction.atomic():
+            self.order.status = Order.IN_PROGRESS
+            self.order.save()
+            thread.start()
+            # Let the transition block on the order row
+            time.sleep(0.5)
+        thread.join()
+
+        self.assertEqual(responses[0].data['updated'], [self.order.uuid])
+        expected = rollup_rows()
+        rebuild()
+        self.assertEqual(expected, rollup_rows())
+        self.assertEqual(
+            [row[3:5] for row in expected], [(Order.CANCELLED, 1)]
+        )
+
+
+class ConcurrentRebuildTests(TransactionTestCase):
+    """Test rebuilding the rollups while orders are written"""
+
+    def test_rebuild_waits_for_order_writes(self):
+        """Test an order written during a rebuild is counted once"""
+
+        user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        pizza = Pizza.objects.create(flavour='Vegan', prices={"S": 10.00})
+        Order.objects.create(customer=user, pizza_flavour=pizza)
+        errors = []
+
+        def run_rebuild():
+            try:
+                rebuild()
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run_rebuild)
+
+        with transaction.atomic():
+            Order.objects.create(customer=user, pizza_flavour=pizza)
+            thread.start()
+            # Let the rebuild block on the rollups this order changed
+            time.sleep(0.5)
+        thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual([row[3:5] for row in rollup_rows()],
+                         [(Order.PENDING, 2)])
+
+
+class SalesApiTests(TestCase):
+    """Test the sales analytics endpoint"""
+
+    def setUp(self):
+        menu_cache.clear()
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@andela.com',
+            'password'
+        )
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        self.vegan = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        self.dessert = Pizza.objects.create(
+            flavour='Dessert',
+            prices={"S": 12.00, "M": 16.00, "L": 22.00}
+        )
+        Order.objects.create(customer=self.user, pizza_flavour=self.vegan,
+                             size='L', quantity=2)
+        Order.objects.create(customer=self.user, pizza_flavour=self.vegan)
+        Order.objects.create(customer=self.user, pizza_flavour=self.dessert,
+                             status=Order.DELIVERED)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_sales_by_day(self):
+        """Test sales are grouped by day by default"""
+
+        res = self.client.get(SALES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{
+            'day': str(timezone.now().date()),
+            'orders': 3,
+            'quantity': 4,
+            'revenue': '62.00',
+        }])
+
+    def test_sales_by_flavour_and_status(self):
+        """Test sales can be grouped by several fields and filtered"""
+
+        res = self.client.get(SALES_URL, {'group_by': 'flavour,status',
+                                          'status': 'P,DL'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted((row['flavour'], row['status'], row['orders'],
+                    row['revenue']) for row in res.data),
+            [('Dessert', 'DL', 1, '12.00'), ('Vegan', 'P', 2, '50.00')]
+        )
+
+    def test_sales_outside_date_range(self):
+        """Test rows outside the requested days are left out"""
+
+        res = self.client.get(SALES_URL, {'from': '2000-01-01',
+                                          'to': '2000-01-31'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_sales_invalid_params(self):
+        """Test unknown groupings and malformed dates are rejected"""
+
+        for params in ({'group_by': 'customer'}, {'from': 'yesterday'}):
+            res = self.client.get(SALES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sales_admin_only(self):
+        """Test non-admin users cannot read the sales report"""
+
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(SALES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from analytics.views import SalesView
+
+app_name = 'analytics'
+
+urlpatterns = [
+    path('sales', SalesView.as_view(), name='sales'),
+]
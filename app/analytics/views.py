@@ -0,0 +1,110 @@
+from django.db.models import Sum
+from django.utils.dateparse import parse_date
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.authentication import CachedTokenAuthentication
+from core.models import OrderRollup
+from core.views import ReplicaReadMixin
+
+from analytics import serializers
+from pizza.cache import menu_cache
+
+
+class SalesView(ReplicaReadMixin, generics.GenericAPIView):
+    """Report order counts, quantities and revenue from the order rollups"""
+
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    queryset = OrderRollup.objects.all()
+    serializer_class = serializers.SalesSerializer
+
+    GROUP_FIELDS = {
+        'day': 'day',
+        'flavour': 'pizza_flavour',
+        'size': 'size',
+        'status': 'status',
+    }
+
+    def _params_to_str(self, query_str):
+        """Convert a comma separated query string to a list of strings"""
+        return [s_str for s_str in query_str.split(',') if s_str]
+
+    def _params_to_date(self, name):
+        value = self.request.query_params.get(name, None)
+
+        if value is None:
+            return None
+
+        day = parse_date(value)
+
+        if day is None:
+            raise ValidationError({
+                'message': '{} must be a date formatted YYYY-MM-DD'.format(
+                    name
+                )
+            })
+
+        return day
+
+    def get_group_fields(self):
+        groups = self._params_to_str(
+            self.request.query_params.get('group_by', 'day')
+        )
+
+        if not groups or not set(groups) <= set(self.GROUP_FIELDS):
+            raise ValidationError({
+                'message': 'group_by must be a list of {}'.format(
+                    ', '.join(self.GROUP_FIELDS)
+                )
+            })
+
+        return [self.GROUP_FIELDS[group] for group in groups]
+
+    def get_queryset(self):
+        """Return the rollup rows matching the filters for admins only"""
+
+        if not self.request.user.is_staff:
+            raise ValidationError({
+                'message': 'Permission Denied'
+            })
+
+        queryset = self.queryset.filter(orders__gt=0)
+        start = self._params_to_date('from')
+        end = self._params_to_date('to')
+
+        if start is not None:
+            queryset = queryset.filter(day__gte=start)
+
+        if end is not None:
+            queryset = queryset.filter(day__lte=end)
+
+        for param in ('status', 'size'):
+            values = self.request.query_params.get(param, None)
+            if values is not None:
+                queryset = queryset.filter(**{
+                    '{}__in'.format(param): self._params_to_str(values)
+                })
+
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        fields = self.get_group_fields()
+        rows = list(
+            self.get_queryset().values(*fields).annotate(
+                total_orders=Sum('orders'),
+                total_quantity=Sum('quantity'),
+                total_revenue=Sum('revenue')
+            ).order_by(*fields)
+        )
+
+        if 'pizza_flavour' in fields:
+            pizzas = menu_cache.get_pizzas()['uuid']
+            for row in rows:
+                pizza = pizzas.get(row['pizza_flavour'])
+                row['flavour'] = pizza.flavour if pizza is not None else None
+
+        serializer = self.get_serializer(rows, many=True)
+        return Response(serializer.data)
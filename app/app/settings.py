@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -42,10 +43,13 @@ INSTALLED_APPS = [
     'core',
     'user',
     'pizza',
-    'order'
+    'order',
+    'analytics'
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,14 +85,166 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PW'),
         'HOST': os.environ.get('DB_HOST'),
+        # Seconds to keep a connection open between requests, 0 closes it
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': bool(int(
+            os.environ.get('DB_CONN_HEALTH_CHECKS', 1)
+        )),
+        # Connections shared by the threads of a process, 0 disables the pool
+        'POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', 0)),
+        'POOL_TIMEOUT': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'POOL_MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
     }
 }
 
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+
+# Aliases of the read replicas listings may read from
+DATABASE_REPLICAS = []
+
+# DB_REPLICA_HOSTS lists the replica hosts, comma separated. Replicas are
+# read only, so the tests read them from the test database of the primary.
+for number, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    alias = 'replica{}'.format(number)
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host,
+                            TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+
+# Without replicas the tests stand in an unreplicated second database for
+# replica1, which is not used otherwise.
+if not DATABASE_REPLICAS and sys.argv[1:2] == ['test']:
+    DATABASES['replica1'] = dict(DATABASES['default'], TEST={
+        'NAME': 'test_{}_replica1'.format(DATABASES['default']['NAME'])
+    })
+
+# Seconds a user's reads stay on the primary after they write
+DB_REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS',
+                                               10))
+
+# Replicas further behind the primary are skipped until they catch up
+DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 5))
+
+DB_REPLICA_LAG_INTERVAL = float(os.environ.get('DB_REPLICA_LAG_INTERVAL', 1))
+
+DB_REPLICA_CACHE_ALIAS = 'replicas'
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'menu': {
+        'BACKEND': os.environ.get(
+            'MENU_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('MENU_CACHE_LOCATION', 'menu'),
+    },
+    # Users kept on the primary after a write, shared between processes
+    # when it is not the local memory backend
+    'replicas': {
+        'BACKEND': os.environ.get(
+            'DB_REPLICA_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('DB_REPLICA_CACHE_LOCATION', 'replicas'),
+    },
+}
+
+MENU_CACHE_ALIAS = 'menu'
+
+MENU_CACHE_TIMEOUT = int(os.environ.get('MENU_CACHE_TIMEOUT', 24 * 60 * 60))
+
+MENU_CACHE_LOCAL_SIZE = int(os.environ.get('MENU_CACHE_LOCAL_SIZE', 256))
+
+
+# Authentication
+
+# Seconds other processes may still accept the token of a deactivated user
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 10))
+
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+
+
+# Metrics
+
+METRICS_SLOW_QUERY_MS = int(os.environ.get('METRICS_SLOW_QUERY_MS', 100))
+
+METRICS_REPEATED_QUERY_THRESHOLD = int(
+    os.environ.get('METRICS_REPEATED_QUERY_THRESHOLD', 10)
+)
+
+
+# Profiling
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+
+# Fraction of all requests to profile, admins can also ask with X-Profile
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'stacks')
+
+PROFILE_SAMPLE_INTERVAL = int(os.environ.get('PROFILE_SAMPLE_INTERVAL', 5))
+
+
+# ASGI
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 8))
+
+ASGI_READ_THREADS = int(os.environ.get('ASGI_READ_THREADS', 8))
+
+
+# Tasks
+
+TASK_PROCESSES = int(os.environ.get('TASK_PROCESSES', 2))
+
+TASK_MAX_ATTEMPTS = int(os.environ.get('TASK_MAX_ATTEMPTS', 5))
+
+# Seconds before the first retry, doubled for every further attempt
+TASK_RETRY_DELAY = int(os.environ.get('TASK_RETRY_DELAY', 10))
+
+TASK_RETRY_MAX_DELAY = int(os.environ.get('TASK_RETRY_MAX_DELAY', 60 * 60))
+
+# Running tasks are run again when no worker finished them in this time
+TASK_TIMEOUT = int(os.environ.get('TASK_TIMEOUT', 5 * 60))
+
+
+# Passwords
+
+# The first hasher hashes new passwords, the others still verify old ones
+PASSWORD_HASHERS = [
+    'core.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER')
+
+if PASSWORD_HASHER:
+    PASSWORD_HASHERS = [PASSWORD_HASHER] + [
+        hasher for hasher in PASSWORD_HASHERS if hasher != PASSWORD_HASHER
+    ]
+
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 19 * 1024))
+
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+
+AUTHENTICATION_BACKENDS = ['core.backends.PasswordBackend']
+
+PASSWORD_VERIFY_PROCESSES = int(os.environ.get('PASSWORD_VERIFY_PROCESSES', 0))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -129,3 +285,29 @@ STATIC_URL = '/static/'
 
 
 AUTH_USER_MODEL = 'core.User'
+
+
+# Orders
+
+ORDER_BULK_MAX_ITEMS = int(os.environ.get('ORDER_BULK_MAX_ITEMS', 500))
+
+ORDER_EXPORT_CHUNK_SIZE = int(os.environ.get('ORDER_EXPORT_CHUNK_SIZE', 2000))
+
+# Queue new orders in a local SQLite file for drain_order_queue to insert
+ORDER_INGEST_QUEUE = bool(int(os.environ.get('ORDER_INGEST_QUEUE', 0)))
+
+ORDER_INGEST_QUEUE_PATH = os.environ.get(
+    'ORDER_INGEST_QUEUE_PATH', os.path.join(BASE_DIR, 'queue', 'orders.db')
+)
+
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+
+# Delivered and cancelled orders older than this are moved by archive_orders
+ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', 90))
+
+ORDER_EVENTS_BROKER = os.environ.get('ORDER_EVENTS_BROKER',
+                                     'order.events.LocalBroker')
+
+ORDER_EVENTS_HEARTBEAT = int(os.environ.get('ORDER_EVENTS_HEARTBEAT', 15))
+
+ORDER_EVENTS_TIMEOUT = int(os.environ.get('ORDER_EVENTS_TIMEOUT', 300))
@@ -16,9 +16,13 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/user/', include('user.urls')),
     path('api/v1/pizza/', include('pizza.urls')),
     path('api/v1/order/', include('order.urls')),
+    path('api/v1/analytics/', include('analytics.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
@@ -0,0 +1,362 @@
+"""Load test the token, menu, order and admin endpoints of a running server
+
+Seeds users, pizzas and priced orders with seed_data into the configured
+Postgres database, the one the server uses, then drives every endpoint
+from concurrent keep-alive clients for a fixed duration: token login,
+menu list, order create, order list, the admin order list and the sales
+report. Throughput, errors, p50/p95/p99 latency and
+the database queries per request, read from the server's /metrics
+endpoint, are written as JSON. Compare two result files, for example from
+two commits, with benchmarks.compare.
+
+Seed first and start the server afterwards, so its menu cache sees the
+seeded pizzas. Serve from a single process so /metrics covers every
+request:
+
+    python -m benchmarks.api_load --seed-only --users 1000 --orders 100000
+    python manage.py runserver 0.0.0.0:2000 --noreload
+
+Usage (from the app directory):
+
+    python -m benchmarks.api_load --url http://127.0.0.1:2000 \\
+        --concurrency 16 --duration 20 --output before.json
+    python -m benchmarks.api_load --url http://127.0.0.1:2000 \\
+        --endpoint menu --endpoint order_list --output after.json
+    python -m benchmarks.compare before.json after.json
+    python -m benchmarks.api_load --cleanup
+"""
+import argparse
+import http.client
+import json
+import random
+import re
+import subprocess
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from benchmarks.common import setup_django, summarize, write_results
+
+setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+
+from analytics import rollups  # noqa: E402
+from benchmarks import order_indexes  # noqa: E402
+from core.models import IdempotencyKey, Order, Pizza  # noqa: E402
+
+
+PASSWORD = 'bench-password'
+ADMIN_EMAIL = order_indexes.BENCH_PREFIX + 'admin@example.com'
+
+TOKEN_PATH = '/api/v1/user/token/'
+PIZZAS_PATH = '/api/v1/pizza/pizzas'
+ORDERS_PATH = '/api/v1/order/orders'
+ADMIN_ORDERS_PATH = '/api/v1/order/admin'
+SALES_PATH = '/api/v1/analytics/sales'
+METRICS_PATH = '/metrics'
+
+# Endpoint name: (view label in /metrics, method, path)
+ENDPOINTS = {
+    'token': ('CreateTokenView', 'POST', TOKEN_PATH),
+    'menu': ('PizzaViewSet.list', 'GET', PIZZAS_PATH),
+    'order_create': ('OrderViewSet.create', 'POST', ORDERS_PATH),
+    'order_list': ('OrderViewSet.list', 'GET', ORDERS_PATH),
+    'admin_list': ('AdminOrderViewSet.list', 'GET', ADMIN_ORDERS_PATH),
+    'sales': ('SalesView', 'GET', SALES_PATH),
+}
+
+QUERY_METRIC = re.compile(
+    r'^db_queries_per_request_(sum|count)'
+    r'\{view="([^"]*)",method="([^"]*)"\} (\S+)$'
+)
+
+
+def seed(args):
+    """Seed bench users, pizzas and orders, and let the users log in
+
+    seed_data prices the orders and rebuilds the rollups, so the sales
+    report reads as many rows as it would in production.
+    """
+    if get_user_model().objects.filter(
+            email__startswith=order_indexes.BENCH_PREFIX).exists():
+        print('Bench rows exist already, run --cleanup to seed again')
+    else:
+        call_command('seed_data', prefix=order_indexes.BENCH_PREFIX,
+                     users=args.users, pizzas=args.pizzas,
+                     orders=args.orders, seed=args.seed,
+                     password=PASSWORD, batch_size=args.batch_size)
+
+    if not get_user_model().objects.filter(email=ADMIN_EMAIL).exists():
+        get_user_model().objects.create_superuser(ADMIN_EMAIL, PASSWORD)
+
+
+def cleanup():
+    users = get_user_model().objects.filter(
+        email__startswith=order_indexes.BENCH_PREFIX
+    )
+    Token.objects.filter(user__in=users).delete()
+    IdempotencyKey.objects.filter(user__in=users).delete()
+    order_indexes.cleanup()
+    # The orders were deleted with raw SQL, which skips the rollups
+    rollups.rebuild()
+
+
+def get_clients(count):
+    """Return the email and token of `count` bench users with orders"""
+    customers = list(get_user_model().objects.filter(
+        email__startswith=order_indexes.BENCH_PREFIX, is_staff=False,
+        orders__isnull=False
+    ).values_list('pk', 'email').distinct()[:count])
+
+    return [(email, Token.objects.get_or_create(user_id=pk)[0].key)
+            for pk, email in customers]
+
+
+class Client:
+    """Keep-alive HTTP client of one simulated user"""
+
+    def __init__(self, url, email, token):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.email = email
+        self.token = token
+        self.connection = None
+
+    def request(self, method, path, body=None, token=None):
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host,
+                                                         self.port)
+
+        headers = {'Accept': 'application/json'}
+        if token is not None:
+            headers['Authorization'] = 'Token ' + token
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+
+        if response.getheader('Connection', '').lower() == 'close':
+            self.close()
+
+        return response.status, content
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+        self.connection = None
+
+
+def build_request(endpoint, client, context):
+    """Return the method, path, body and token of one request"""
+    _, method, path = ENDPOINTS[endpoint]
+
+    if endpoint == 'token':
+        return method, path, {'email': client.email,
+                              'password': PASSWORD}, None
+
+    if endpoint == 'order_create':
+        return method, path, {
+            'pizza_flavour': random.choice(context['flavours']),
+            'size': random.choice('SML'),
+            'quantity': random.randint(1, 4),
+        }, client.token
+
+    if endpoint in ('admin_list', 'sales'):
+        return method, path, None, context['admin_token']
+
+    return method, path, None, client.token
+
+
+def new_results():
+    return {'latency': [], 'status': Counter(), 'errors': Counter()}
+
+
+def merge_results(client_results):
+    """Combine the results each client thread kept on its own"""
+    results = new_results()
+
+    for result in client_results:
+        results['latency'].extend(result['latency'])
+        results['status'].update(result['status'])
+        results['errors'].update(result['errors'])
+
+    return results
+
+
+def run_client(endpoint, client, context, deadline):
+    """Send requests until `deadline` and return this client's results"""
+    results = new_results()
+
+    while time.monotonic() < deadline:
+        method, path, body, token = build_request(endpoint, client, context)
+        start = time.perf_counter()
+
+        try:
+            status, _ = client.request(method, path, body, token)
+        except (OSError, http.client.HTTPException) as exc:
+            results['errors'][type(exc).__name__] += 1
+            continue
+
+        results['latency'].append((time.perf_counter() - start) * 1000)
+        results['status'][status] += 1
+
+    client.close()
+    return results
+
+
+def read_query_metrics(url, admin_token):
+    """Return the (sum, count) of queries per request of every view"""
+    client = Client(url, None, admin_token)
+    try:
+        status, content = client.request('GET', METRICS_PATH,
+                                         token=admin_token)
+    finally:
+        client.close()
+
+    if status != 200:
+        return {}
+
+    metrics = {}
+    for line in content.decode('utf-8').splitlines():
+        match = QUERY_METRIC.match(line)
+        if match is not None:
+            kind, view, method, value = match.groups()
+            metrics.setdefault((view, method), {})[kind] = float(value)
+
+    return metrics
+
+
+def queries_per_request(before, after, view, method):
+    """Return the mean queries per request of a view between two reads"""
+    end = after.get((view, method))
+
+    if end is None:
+        return None
+
+    start = before.get((view, method), {'sum': 0, 'count': 0})
+    count = end['count'] - start['count']
+    return round((end['sum'] - start['sum']) / count, 2) if count else None
+
+
+def load_endpoint(endpoint, clients, context, args):
+    view, method, _ = ENDPOINTS[endpoint]
+
+    # Warm up connections, caches and the server's lazy setup
+    with ThreadPoolExecutor(max_workers=len(clients)) as pool:
+        deadline = time.monotonic() + args.warmup
+        list(pool.map(lambda client: run_client(
+            endpoint, client, context, deadline
+        ), clients))
+
+    before = read_query_metrics(args.url, context['admin_token'])
+    start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=len(clients)) as pool:
+        deadline = start + args.duration
+        results = merge_results(pool.map(lambda client: run_client(
+            endpoint, client, context, deadline
+        ), clients))
+
+    elapsed = time.monotonic() - start
+    after = read_query_metrics(args.url, context['admin_token'])
+
+    return {
+        'requests': len(results['latency']),
+        'requests_per_second': round(len(results['latency']) / elapsed, 1),
+        'status': dict(results['status']),
+        'errors': dict(results['errors']),
+        'latency_ms': summarize(results['latency']),
+        'queries_per_request': queries_per_request(before, after, view,
+                                                   method),
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL
+        ).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--url', default='http://127.0.0.1:2000')
+    parser.add_argument('--endpoint', action='append',
+                        choices=list(ENDPOINTS),
+                        help='endpoint to load, may be given several times;'
+                             ' all endpoints by default')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=2)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--pizzas', type=int, default=20)
+    parser.add_argument('--orders', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=10000,
+                        help='orders per COPY when seeding')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--seed-only', action='store_true',
+                        help='seed the database and exit')
+    parser.add_argument('--skip-seed', action='store_true')
+    parser.add_argument('--cleanup', action='store_true',
+                        help='delete the seeded rows and exit')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+        return
+
+    random.seed(args.seed)
+    if args.seed_only or not args.skip_seed:
+        seed(args)
+    if args.seed_only:
+        return
+
+    users = get_clients(args.concurrency)
+    if not users:
+        parser.error('no seeded orders found, run without --skip-seed')
+
+    admin = get_user_model().objects.get(email=ADMIN_EMAIL)
+    context = {
+        'admin_token': Token.objects.get_or_create(user=admin)[0].key,
+        'flavours': list(Pizza.objects.filter(
+            flavour__startswith=order_indexes.BENCH_PREFIX
+        ).values_list('flavour', flat=True)),
+    }
+    clients = [Client(args.url, *users[index % len(users)])
+               for index in range(args.concurrency)]
+
+    write_results({
+        'commit': get_commit(),
+        'url': args.url,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'rows': {
+            'orders': Order.objects.count(),
+            'pizzas': Pizza.objects.count(),
+            'users': get_user_model().objects.count(),
+        },
+        'endpoints': {
+            endpoint: load_endpoint(endpoint, clients, context, args)
+            for endpoint in args.endpoint or ENDPOINTS
+        },
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Load test the hot read paths through the WSGI and ASGI servers
+
+Opens a number of slow clients that send half a request and hold their
+connection, then has concurrent keep-alive clients read the menu list,
+the order list and one order for a fixed duration. Throughput, errors and
+latency percentiles are written as JSON for every target server. Start
+the servers first, for example:
+
+    python manage.py runserver 0.0.0.0:2000
+    uvicorn app.asgi:application --host 0.0.0.0 --port 2001
+
+Usage (from the app directory):
+
+    python -m benchmarks.asgi_load --token <token> \\
+        --target wsgi=http://127.0.0.1:2000 \\
+        --target asgi=http://127.0.0.1:2001 \\
+        --concurrency 100 --slow-clients 50 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from benchmarks.common import summarize, write_results
+
+
+PIZZAS_PATH = '/api/v1/pizza/pizzas'
+ORDERS_PATH = '/api/v1/order/orders'
+
+
+class Connection:
+    """Minimal HTTP/1.1 keep-alive client connection"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, path, headers):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+
+        lines = ['GET {} HTTP/1.1'.format(path),
+                 'Host: {}:{}'.format(self.host, self.port)]
+        lines += ['{}: {}'.format(name, value)
+                  for name, value in headers.items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed by the server')
+
+        version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+        response_headers = {}
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, value = line.split(':', 1)
+            response_headers[name.strip().lower()] = value.strip()
+
+        body = await self.read_body(response_headers)
+
+        if version == 'HTTP/1.0' or \
+                response_headers.get('connection', '').lower() == 'close':
+            self.close()
+
+        return int(status), body
+
+    async def read_body(self, headers):
+        if 'content-length' in headers:
+            return await self.reader.readexactly(
+                int(headers['content-length'])
+            )
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    return body
+                body += chunk[:-2]
+
+        body = await self.reader.read()
+        self.close()
+        return body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def hold_slow_client(host, port, stop):
+    """Send half a request and keep the connection open until `stop`"""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return
+
+    writer.write('GET {} HTTP/1.1\r\nHost: {}\r\n'.format(
+        PIZZAS_PATH, host
+    ).encode('latin-1'))
+
+    while not stop.is_set():
+        try:
+            await writer.drain()
+            await asyncio.wait_for(stop.wait(), 1)
+        except asyncio.TimeoutError:
+            continue
+        except OSError:
+            break
+
+    writer.close()
+
+
+async def run_client(connection, paths, headers, deadline, results):
+    index = 0
+
+    while time.monotonic() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        start = time.perf_counter()
+
+        try:
+            status, _ = await connection.request(path, headers)
+        except (OSError, ValueError, asyncio.IncompleteReadError) as exc:
+            results['errors'][type(exc).__name__] += 1
+            connection.close()
+            continue
+
+        results['latency'][path].append((time.perf_counter() - start) * 1000)
+        results['status'][status] += 1
+
+    connection.close()
+
+
+async def find_order_path(host, port, headers):
+    """Return the detail path of the first order of the benchmark user"""
+    connection = Connection(host, port)
+    try:
+        status, body = await connection.request(
+            ORDERS_PATH + '?page_size=1', headers
+        )
+    finally:
+        connection.close()
+
+    results = json.loads(body.decode('utf-8')).get('results') \
+        if status == 200 else None
+
+    if not results:
+        return None
+
+    return '{}/{}'.format(ORDERS_PATH, results[0]['id'])
+
+
+async def load_target(url, args):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    headers = {'Authorization': 'Token {}'.format(args.token),
+               'Accept': 'application/json'}
+
+    paths = [PIZZAS_PATH, ORDERS_PATH]
+    order_path = await find_order_path(host, port, headers)
+    if order_path is not None:
+        paths.append(order_path)
+
+    stop = asyncio.Event()
+    slow_clients = [
+        asyncio.ensure_future(hold_slow_client(host, port, stop))
+        for _ in range(args.slow_clients)
+    ]
+    await asyncio.sleep(0.5)
+
+    results = {'latency': {path: [] for path in paths},
+               'status': Counter(), 'errors': Counter()}
+    start = time.monotonic()
+    deadline = start + args.duration
+
+    await asyncio.gather(*(
+        run_client(Connection(host, port), paths, headers, deadline, results)
+        for _ in range(args.concurrency)
+    ))
+    elapsed = time.monotonic() - start
+
+    stop.set()
+    await asyncio.gather(*slow_clients)
+
+    samples = [sample for path_samples in results['latency'].values()
+               for sample in path_samples]
+    return {
+        'url': url,
+        'requests': len(samples),
+        'requests_per_second': round(len(samples) / elapsed, 1),
+        'status': dict(results['status']),
+        'errors': dict(results['errors']),
+        'latency_ms': summarize(samples),
+        'paths': {path: summarize(path_samples)
+                  for path, path_samples in results['latency'].items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--target', action='append', required=True,
+                        metavar='NAME=URL',
+                        help='server to load, may be given several times')
+    parser.add_argument('--token', required=True,
+                        help='API token of the user reading the orders')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--slow-clients', type=int, default=0)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    results = {
+        'concurrency': args.concurrency,
+        'slow_clients': args.slow_clients,
+        'duration': args.duration,
+        'targets': {},
+    }
+
+    for target in args.target:
+        name, url = target.split('=', 1)
+        results['targets'][name] = asyncio.run(load_target(url, args))
+
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
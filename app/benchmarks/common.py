@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+import time
+
+
+def setup_django():
+    """Configure Django so benchmarks can use the ORM outside manage.py"""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+    import django
+    django.setup()
+
+
+def percentile(samples, pct):
+    """Return the nearest-rank percentile of a list of samples"""
+    if not samples:
+        return None
+
+    ordered = sorted(samples)
+    rank = max(int(round(pct / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(samples):
+    """Return latency statistics in milliseconds for a list of samples"""
+    if not samples:
+        return {'count': 0}
+
+    return {
+        'count': len(samples),
+        'mean': round(sum(samples) / len(samples), 3),
+        'min': round(min(samples), 3),
+        'p50': round(percentile(samples, 50), 3),
+        'p95': round(percentile(samples, 95), 3),
+        'p99': round(percentile(samples, 99), 3),
+        'max': round(max(samples), 3),
+    }
+
+
+def time_call(func, *args, **kwargs):
+    """Run `func` and return its elapsed time in milliseconds"""
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000
+
+
+def write_results(results, path=None):
+    """Write results as JSON to `path`, or to stdout when no path is given"""
+    output = json.dumps(results, indent=2, sort_keys=True, default=str)
+
+    if path is None:
+        sys.stdout.write(output + '\n')
+        return
+
+    with open(path, 'w') as results_file:
+        results_file.write(output + '\n')
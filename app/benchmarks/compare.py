@@ -0,0 +1,114 @@
+"""Compare two api_load result files, for example from two commits
+
+Prints the throughput, p50/p95/p99 latency and queries per request of
+every endpoint in both runs with the relative change. With --threshold,
+exits with status 1 when an endpoint's p95 latency or queries per request
+grew, or its throughput dropped, by more than that percentage.
+
+Usage (from the app directory):
+
+    python -m benchmarks.compare before.json after.json
+    python -m benchmarks.compare before.json after.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+# Metric: (label, path in an endpoint result, True when higher is better)
+METRICS = (
+    ('rps', ('requests_per_second',), True),
+    ('p50 ms', ('latency_ms', 'p50'), False),
+    ('p95 ms', ('latency_ms', 'p95'), False),
+    ('p99 ms', ('latency_ms', 'p99'), False),
+    ('queries', ('queries_per_request',), False),
+)
+
+# Metrics checked against --threshold
+GATED = ('rps', 'p95 ms', 'queries')
+
+
+def lookup(result, path):
+    for key in path:
+        if not isinstance(result, dict):
+            return None
+        result = result.get(key)
+    return result
+
+
+def change(before, after):
+    """Return the relative change in percent, or None if unknown"""
+    if before is None or after is None:
+        return None
+    if before == 0:
+        return 0.0 if after == 0 else None
+    return (after - before) * 100.0 / before
+
+
+def compare(before, after, threshold=None):
+    """Return the comparison rows and the regressions beyond `threshold`"""
+    rows = []
+    regressions = []
+    endpoints = list(before['endpoints'])
+    endpoints += [name for name in after['endpoints']
+                  if name not in before['endpoints']]
+
+    for endpoint in endpoints:
+        for label, path, higher_is_better in METRICS:
+            old = lookup(before['endpoints'].get(endpoint), path)
+            new = lookup(after['endpoints'].get(endpoint), path)
+            delta = change(old, new)
+            rows.append((endpoint, label, old, new, delta))
+
+            if threshold is None or delta is None or label not in GATED:
+                continue
+
+            worse = -delta if higher_is_better else delta
+            if worse > threshold:
+                regressions.append((endpoint, label, old, new, delta))
+
+    return rows, regressions
+
+
+def format_rows(rows):
+    lines = ['{:<14} {:<8} {:>12} {:>12} {:>9}'.format(
+        'endpoint', 'metric', 'before', 'after', 'change'
+    )]
+
+    for endpoint, label, old, new, delta in rows:
+        lines.append('{:<14} {:<8} {:>12} {:>12} {:>9}'.format(
+            endpoint, label,
+            '-' if old is None else old,
+            '-' if new is None else new,
+            '-' if delta is None else '{:+.1f}%'.format(delta),
+        ))
+
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float,
+                        help='fail on regressions larger than this percent')
+    args = parser.parse_args()
+
+    with open(args.before) as before, open(args.after) as after:
+        before, after = json.load(before), json.load(after)
+
+    rows, regressions = compare(before, after, args.threshold)
+
+    sys.stdout.write('{} -> {}\n'.format(before.get('commit'),
+                                         after.get('commit')))
+    sys.stdout.write(format_rows(rows) + '\n')
+
+    if regressions:
+        sys.stdout.write('\nRegressions over {}%:\n{}\n'.format(
+            args.threshold, format_rows(regressions)
+        ))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Measure request latency per database connection mode
+
+Sends order list requests through Django's WSGI handler from concurrent
+threads, so connections are opened and closed by the request signals as
+in a server, once per connection mode: a new connection per request,
+persistent connections with and without health checks, and the pool with
+and without health checks. Latency percentiles, requests per second and
+the number of server connections opened are written as JSON.
+
+Usage (from the app directory):
+
+    python -m benchmarks.db_connections --threads 16 --requests 200
+    python -m benchmarks.db_connections --pool-size 4 --output db.json
+"""
+import argparse
+import sys
+import threading
+import time
+from io import BytesIO
+
+from benchmarks.common import setup_django, summarize, time_call, \
+    write_results
+
+setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+
+from core.db.pool import close_pools  # noqa: E402
+from core.models import Order, Pizza  # noqa: E402
+
+
+BENCH_EMAIL = 'bench-connections@example.com'
+BENCH_FLAVOUR = 'bench-connections'
+ORDERS_PATH = '/api/v1/order/orders'
+
+
+def modes(pool_size):
+    return {
+        'per_request': {'CONN_MAX_AGE': 0, 'POOL_SIZE': 0,
+                        'CONN_HEALTH_CHECKS': False},
+        'persistent': {'CONN_MAX_AGE': 600, 'POOL_SIZE': 0,
+                       'CONN_HEALTH_CHECKS': False},
+        'persistent_checked': {'CONN_MAX_AGE': 600, 'POOL_SIZE': 0,
+                               'CONN_HEALTH_CHECKS': True},
+        'pool': {'CONN_MAX_AGE': 0, 'POOL_SIZE': pool_size,
+                 'CONN_HEALTH_CHECKS': False},
+        'pool_checked': {'CONN_MAX_AGE': 0, 'POOL_SIZE': pool_size,
+                         'CONN_HEALTH_CHECKS': True},
+    }
+
+
+def setup(orders):
+    """Create the bench user with orders and return its token"""
+    user = get_user_model().objects.filter(email=BENCH_EMAIL).first() or \
+        get_user_model().objects.create_user(BENCH_EMAIL, 'password')
+    pizza, _ = Pizza.objects.get_or_create(
+        flavour=BENCH_FLAVOUR, defaults={'prices': {'S': 10.0}}
+    )
+    missing = orders - Order.objects.filter(customer=user).count()
+    for _ in range(max(missing, 0)):
+        Order.objects.create(customer=user, pizza_flavour=pizza)
+
+    return Token.objects.get_or_create(user=user)[0].key
+
+
+def cleanup():
+    get_user_model().objects.filter(email=BENCH_EMAIL).delete()
+    Pizza.objects.filter(flavour=BENCH_FLAVOUR).delete()
+
+
+def get(handler, token):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': ORDERS_PATH,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_ACCEPT': 'application/json',
+        'HTTP_AUTHORIZATION': 'Token ' + token,
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+    }
+    status = []
+    result = handler(environ, lambda line, headers, exc_info=None:
+                     status.append(line))
+    try:
+        b''.join(result)
+    finally:
+        # Sends request_finished, which closes or keeps the connection
+        result.close()
+
+    if not status[0].startswith('200'):
+        raise RuntimeError('Request failed: {}'.format(status[0]))
+
+
+def run_mode(handler, token, args):
+    samples = []
+    lock = threading.Lock()
+
+    def worker():
+        thread_samples = [time_call(get, handler, token)
+                          for _ in range(args.requests)]
+        connections.close_all()
+        with lock:
+            samples.extend(thread_samples)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'requests': len(samples),
+        'requests_per_second': round(len(samples) / elapsed, 1),
+        'latency_ms': summarize(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=100,
+                        help='requests per thread and mode')
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--orders', type=int, default=20,
+                        help='orders returned by every request')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    token = setup(args.orders)
+    connections.close_all()
+    handler = WSGIHandler()
+    settings_dict = connections.databases['default']
+    original = dict(settings_dict)
+    backends = set()
+
+    def count_connection(sender, connection, **kwargs):
+        # Pooled connections send the signal again when they are reused
+        backends.add(connection.connection.get_backend_pid())
+
+    connection_created.connect(count_connection)
+    results = {'threads': args.threads, 'pool_size': args.pool_size,
+               'modes': {}}
+
+    try:
+        for name, mode in modes(args.pool_size).items():
+            settings_dict.update(mode)
+            # Warm the token cache and the pool outside the timings
+            get(handler, token)
+            connections.close_all()
+            backends.clear()
+
+            result = run_mode(handler, token, args)
+            result['connections_opened'] = len(backends)
+            results['modes'][name] = result
+            close_pools()
+    finally:
+        connection_created.disconnect(count_connection)
+        settings_dict.update(original)
+        connections.close_all()
+        close_pools()
+        cleanup()
+
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""Measure the order listing queries with and without the order indexes
+
+Seeds synthetic users, pizzas and orders into the configured Postgres
+database, then runs the querysets behind OrderViewSet and AdminOrderViewSet
+twice: once inside a transaction that drops the indexes added by migration
+0011 (rolled back afterwards), and once with them in place. The EXPLAIN
+ANALYZE plan and p50/p99 latency of every query are written as JSON.
+
+Usage (from the app directory):
+
+    python -m benchmarks.order_indexes --orders 2000000 --output indexes.json
+    python -m benchmarks.order_indexes --skip-seed --repeat 200
+    python -m benchmarks.order_indexes --cleanup
+"""
+import argparse
+import random
+
+from benchmarks.common import setup_django, summarize, time_call, \
+    write_results
+
+setup_django()
+
+from django.db import connection, transaction  # noqa: E402
+
+from core.models import Order, Pizza  # noqa: E402
+from core.pagination import KeysetPagination  # noqa: E402
+
+
+BENCH_PREFIX = 'bench-'
+
+SEED_USERS_SQL = """
+    INSERT INTO core_user (password, is_superuser, email, name, is_active,
+                           is_staff)
+    SELECT '!', false, %s || g || '@example.com', 'Bench ' || g, true, false
+    FROM generate_series(1, %s) g
+"""
+
+SEED_PIZZAS_SQL = """
+    INSERT INTO core_pizza (uuid, flavour, prices, created_at, updated_at)
+    SELECT uuid_generate_v4(), %s || g,
+           '{"S": 10.0, "M": 15.0, "L": 20.0}'::jsonb, now(), now()
+    FROM generate_series(1, %s) g
+"""
+
+SEED_ORDERS_SQL = """
+    INSERT INTO core_order (uuid, customer_id, pizza_flavour_id, size,
+                            quantity, status, created_at, updated_at)
+    SELECT uuid_generate_v4(),
+           u.ids[1 + floor(random() * array_length(u.ids, 1))::int],
+           p.ids[1 + floor(random() * array_length(p.ids, 1))::int],
+           (ARRAY['S', 'M', 'L'])[1 + floor(random() * 3)::int],
+           1 + floor(random() * 4)::int,
+           CASE
+               WHEN g.ts > now() - interval '2 hours'
+                   THEN (ARRAY['P', 'I', 'DN'])[1 + floor(random() * 3)::int]
+               WHEN random() < 0.05 THEN 'C'
+               ELSE 'DL'
+           END,
+           g.ts, g.ts
+    FROM (SELECT now() - random() * interval '730 days' AS ts
+          FROM generate_series(1, %s)) g,
+         (SELECT array_agg(id) AS ids FROM core_user
+          WHERE email LIKE %s) u,
+         (SELECT array_agg(uuid) AS ids FROM core_pizza
+          WHERE flavour LIKE %s) p
+"""
+
+
+def build_queries(customer_id, customer_email):
+    """Return the first-page SQL of the querysets behind the order lists"""
+    orders = Order.objects.select_related('customer', 'pizza_flavour')
+    active = ['P', 'I']
+    querysets = {
+        'user_orders': orders.filter(customer=customer_id),
+        'user_active_orders': orders.filter(customer=customer_id,
+                                            status__in=active),
+        'admin_orders': orders.all(),
+        'admin_active_orders': orders.filter(status__in=active),
+        'admin_customer_orders': orders.filter(
+            status__in=active, customer__email=customer_email
+        ),
+    }
+
+    page = KeysetPagination.page_size + 1
+    return {
+        name: queryset.order_by(*KeysetPagination.ordering)[:page]
+        .query.sql_with_params()
+        for name, queryset in querysets.items()
+    }
+
+
+def seed(users, pizzas, orders, batch_size):
+    with connection.cursor() as cursor:
+        print('Seeding {} users and {} pizzas...'.format(users, pizzas))
+        cursor.execute(SEED_USERS_SQL, [BENCH_PREFIX, users])
+        cursor.execute(SEED_PIZZAS_SQL, [BENCH_PREFIX, pizzas])
+
+        seeded = 0
+        while seeded < orders:
+            batch = min(batch_size, orders - seeded)
+            cursor.execute(SEED_ORDERS_SQL, [
+                batch, BENCH_PREFIX + '%', BENCH_PREFIX + '%'
+            ])
+            seeded += batch
+            print('Seeded {}/{} orders'.format(seeded, orders))
+
+        cursor.execute('ANALYZE core_user, core_pizza, core_order')
+
+
+def cleanup():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM core_order WHERE customer_id IN '
+            '(SELECT id FROM core_user WHERE email LIKE %s)',
+            [BENCH_PREFIX + '%']
+        )
+        cursor.execute('DELETE FROM core_user WHERE email LIKE %s',
+                       [BENCH_PREFIX + '%'])
+        cursor.execute('DELETE FROM core_pizza WHERE flavour LIKE %s',
+                       [BENCH_PREFIX + '%'])
+
+
+def measure(customers, repeat):
+    """Return the plan and latency of every order query"""
+    results = {}
+    customer_id, customer_email = customers[0]
+
+    with connection.cursor() as cursor:
+        for name, (sql, params) in build_queries(customer_id,
+                                                 customer_email).items():
+            cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + sql, params)
+            results[name] = {
+                'plan': [row[0] for row in cursor.fetchall()],
+                'samples': []
+            }
+
+        def run(sql, params):
+            cursor.execute(sql, params)
+            cursor.fetchall()
+
+        for _ in range(repeat):
+            customer_id, customer_email = random.choice(customers)
+            for name, (sql, params) in build_queries(customer_id,
+                                                     customer_email).items():
+                results[name]['samples'].append(time_call(run, sql, params))
+
+    for result in results.values():
+        result['latency_ms'] = summarize(result.pop('samples'))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--pizzas', type=int, default=20)
+    parser.add_argument('--orders', type=int, default=2000000)
+    parser.add_argument('--batch-size', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-seed', action='store_true')
+    parser.add_argument('--cleanup', action='store_true',
+                        help='delete the seeded rows and exit')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+        return
+
+    random.seed(args.seed)
+    if not args.skip_seed:
+        seed(args.users, args.pizzas, args.orders, args.batch_size)
+
+    customers = list(Order.objects.filter(
+        customer__email__startswith=BENCH_PREFIX
+    ).values_list('customer_id', 'customer__email').distinct()[:1000])
+    if not customers:
+        parser.error('no seeded orders found, run without --skip-seed')
+
+    indexes = [index.name for index in Order._meta.indexes]
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for name in indexes:
+                cursor.execute('DROP INDEX IF EXISTS {}'.format(
+                    connection.ops.quote_name(name)
+                ))
+        before = measure(customers, args.repeat)
+        transaction.set_rollback(True)
+
+    after = measure(customers, args.repeat)
+
+    write_results({
+        'rows': {
+            'orders': Order.objects.count(),
+            'pizzas': Pizza.objects.count(),
+        },
+        'indexes': indexes,
+        'repeat': args.repeat,
+        'before': before,
+        'after': after,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
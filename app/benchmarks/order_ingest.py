@@ -0,0 +1,172 @@
+"""Compare creating orders directly with queueing them for the drain
+
+Posts orders through Django's WSGI handler from concurrent threads, once
+inserting every order in the request and once with ORDER_INGEST_QUEUE,
+appending it to the local queue. The queued orders are then inserted by
+the drain in batches. Request latency percentiles, requests per second
+and the drain's orders per second are written as JSON.
+
+Usage (from the app directory):
+
+    python -m benchmarks.order_ingest --threads 16 --requests 100
+    python -m benchmarks.order_ingest --batch-size 1000 --output ingest.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+from benchmarks.common import setup_django, summarize, time_call, \
+    write_results
+
+setup_django()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+
+from core.models import Order, Pizza  # noqa: E402
+from order.ingest import drain, get_queue  # noqa: E402
+from pizza.cache import menu_cache  # noqa: E402
+
+
+BENCH_EMAIL = 'bench-ingest@example.com'
+BENCH_FLAVOUR = 'bench-ingest'
+ORDERS_PATH = '/api/v1/order/orders'
+
+
+def setup():
+    """Create the bench user and pizza and return the user's token"""
+    user = get_user_model().objects.filter(email=BENCH_EMAIL).first() or \
+        get_user_model().objects.create_user(BENCH_EMAIL, 'password')
+    Pizza.objects.get_or_create(
+        flavour=BENCH_FLAVOUR, defaults={'prices': {'S': 10.0, 'M': 15.0}}
+    )
+    menu_cache.clear()
+
+    return Token.objects.get_or_create(user=user)[0].key
+
+
+def cleanup():
+    get_user_model().objects.filter(email=BENCH_EMAIL).delete()
+    Pizza.objects.filter(flavour=BENCH_FLAVOUR).delete()
+
+
+def post(handler, token):
+    body = json.dumps({'pizza_flavour': BENCH_FLAVOUR, 'size': 'M',
+                       'quantity': 2}).encode('utf-8')
+    environ = {
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': ORDERS_PATH,
+        'QUERY_STRING': '',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_ACCEPT': 'application/json',
+        'HTTP_AUTHORIZATION': 'Token ' + token,
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+    }
+    status = []
+    result = handler(environ, lambda line, headers, exc_info=None:
+                     status.append(line))
+    try:
+        b''.join(result)
+    finally:
+        result.close()
+
+    if not status[0].startswith(('201', '202')):
+        raise RuntimeError('Request failed: {}'.format(status[0]))
+
+
+def run_mode(handler, token, args):
+    samples = []
+    lock = threading.Lock()
+
+    def worker():
+        thread_samples = [time_call(post, handler, token)
+                          for _ in range(args.requests)]
+        connections.close_all()
+        with lock:
+            samples.extend(thread_samples)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'requests': len(samples),
+        'requests_per_second': round(len(samples) / elapsed, 1),
+        'latency_ms': summarize(samples),
+    }
+
+
+def run_drain(batch_size):
+    queue = get_queue()
+    queued = len(queue)
+    start = time.perf_counter()
+
+    while len(queue):
+        drain(queue, batch_size)
+
+    elapsed = time.perf_counter() - start
+    return {
+        'orders': queued,
+        'orders_per_second': round(queued / elapsed, 1) if elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=100,
+                        help='orders created per thread and mode')
+    parser.add_argument('--batch-size', type=int, default=500,
+                        help='orders inserted per drain transaction')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    token = setup()
+    handler = WSGIHandler()
+    results = {'threads': args.threads}
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'orders.db')
+
+    try:
+        # Warm the token and menu caches outside the timings
+        post(handler, token)
+        results['direct'] = run_mode(handler, token, args)
+
+        with override_settings(ORDER_INGEST_QUEUE=True,
+                               ORDER_INGEST_QUEUE_PATH=path):
+            results['queued'] = run_mode(handler, token, args)
+            results['drain'] = run_drain(args.batch_size)
+
+        results['orders_created'] = Order.objects.filter(
+            customer__email=BENCH_EMAIL
+        ).count()
+    finally:
+        connections.close_all()
+        cleanup()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Measure login password verification throughput per hashing policy
+
+Verifies a password against hashes made by each policy: PBKDF2 as the
+project shipped before, Argon2 with the configured costs, and Argon2
+verified in the password process pool. Every policy is run from one
+thread, giving logins per second per core, and from concurrent threads
+standing in for request threads. Results are written as JSON.
+
+Usage (from the app directory):
+
+    python -m benchmarks.password_hashing --logins 200 --threads 8
+    python -m benchmarks.password_hashing --processes 4 --output hashing.json
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import setup_django, summarize, time_call, \
+    write_results
+
+setup_django()
+
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from core import hashers  # noqa: E402
+
+
+PASSWORD = 'correct horse battery staple'
+
+POLICIES = {
+    'pbkdf2': {
+        'PASSWORD_HASHERS': [
+            'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        ],
+        'PASSWORD_VERIFY_PROCESSES': 0,
+    },
+    'argon2': {
+        'PASSWORD_HASHERS': ['core.hashers.Argon2PasswordHasher'],
+        'PASSWORD_VERIFY_PROCESSES': 0,
+    },
+    'argon2_pool': {
+        'PASSWORD_HASHERS': ['core.hashers.Argon2PasswordHasher'],
+    },
+}
+
+
+def run_logins(encoded, logins, threads):
+    """Verify `logins` passwords from `threads` threads"""
+    def login(_):
+        return time_call(hashers.verify_password, PASSWORD, encoded)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        samples = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'threads': threads,
+        'logins_per_second': round(logins / elapsed, 1),
+        'latency_ms': summarize(samples),
+    }
+
+
+def bench_policy(policy, args):
+    with override_settings(**policy):
+        hashers._pool = None
+        encoded = make_password(PASSWORD)
+        # Start the pool workers before timing
+        hashers.verify_password(PASSWORD, encoded)
+
+        result = {
+            'hash': encoded.split('$', 1)[0],
+            'single': run_logins(encoded, args.logins, 1),
+            'concurrent': run_logins(encoded, args.logins, args.threads),
+        }
+
+        if hashers._pool is not None:
+            hashers._pool.shutdown()
+            hashers._pool = None
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--processes', type=int,
+                        default=os.cpu_count() or 1)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    POLICIES['argon2_pool']['PASSWORD_VERIFY_PROCESSES'] = args.processes
+    results = {
+        'cpus': os.cpu_count(),
+        'processes': args.processes,
+        'policies': {name: bench_policy(policy, args)
+                     for name, policy in POLICIES.items()},
+    }
+
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Compare the ModelSerializer and values serializers of the listings
+
+Loads a page of orders and pizzas from the configured database, once as
+model instances for OrderSerializer and PizzaSerializer and once as
+`.values()` rows for OrderValuesSerializer and PizzaValuesSerializer. It
+checks both render the same JSON, then times serialization alone and
+together with the query and JSON rendering. Rows per second and latency
+percentiles are written as JSON. Seed orders first, e.g. with
+`python manage.py seed_data`.
+
+Usage (from the app directory):
+
+    python -m benchmarks.serializers --rows 500 --repeat 200
+"""
+import argparse
+
+from benchmarks.common import setup_django, summarize, time_call, \
+    write_results
+
+setup_django()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from core.models import Order, Pizza  # noqa: E402
+from order.serializers import OrderSerializer, \
+    OrderValuesSerializer  # noqa: E402
+from pizza.serializers import PizzaSerializer, \
+    PizzaValuesSerializer  # noqa: E402
+
+
+def model_path(queryset, serializer_class):
+    def serialize(rows):
+        return serializer_class(rows, many=True).data
+
+    def load():
+        return list(queryset)
+
+    return load, serialize
+
+
+def values_path(queryset, serializer_class):
+    rows = queryset.values(*serializer_class.columns)
+
+    def serialize(rows):
+        return serializer_class(rows, many=True).data
+
+    def load():
+        return list(rows)
+
+    return load, serialize
+
+
+def bench_path(load, serialize, repeat):
+    rows = load()
+    renderer = JSONRenderer()
+
+    def end_to_end():
+        renderer.render(serialize(load()))
+
+    serialize_samples = [time_call(serialize, rows) for _ in range(repeat)]
+    total_samples = [time_call(end_to_end) for _ in range(repeat)]
+    mean = sum(serialize_samples) / len(serialize_samples)
+
+    return {
+        'rows': len(rows),
+        'serialize_rows_per_second': round(len(rows) * 1000 / mean, 1)
+        if mean else None,
+        'serialize_ms': summarize(serialize_samples),
+        'query_serialize_render_ms': summarize(total_samples),
+    }
+
+
+def bench_listing(queryset, model_serializer, values_serializer, repeat):
+    model_load, model_serialize = model_path(queryset, model_serializer)
+    values_load, values_serialize = values_path(queryset, values_serializer)
+    renderer = JSONRenderer()
+
+    identical = renderer.render(model_serialize(model_load())) == \
+        renderer.render(values_serialize(values_load()))
+    model = bench_path(model_load, model_serialize, repeat)
+    values = bench_path(values_load, values_serialize, repeat)
+
+    model_rate = model['serialize_rows_per_second']
+    values_rate = values['serialize_rows_per_second']
+
+    return {
+        'identical_json': identical,
+        'model_serializer': model,
+        'values_serializer': values,
+        'serialize_speedup': round(values_rate / model_rate, 2)
+        if model_rate and values_rate else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    orders = Order.objects.select_related('customer', 'pizza_flavour') \
+        .order_by('-created_at', '-uuid')[:args.rows]
+    pizzas = Pizza.objects.order_by('-created_at', '-uuid')[:args.rows]
+
+    if not orders.exists():
+        parser.error('no orders found, seed some with seed_data first')
+
+    write_results({
+        'repeat': args.repeat,
+        'orders': bench_listing(orders, OrderSerializer,
+                                OrderValuesSerializer, args.repeat),
+        'pizzas': bench_listing(pizzas, PizzaSerializer,
+                                PizzaValuesSerializer, args.repeat),
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
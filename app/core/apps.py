@@ -1,5 +1,19 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from rest_framework.authtoken.models import Token
+        from core.authentication import invalidate_token, \
+            invalidate_user_tokens
+
+        post_delete.connect(invalidate_token, sender=Token,
+                            dispatch_uid='core.invalidate_token')
+        post_save.connect(invalidate_user_tokens, sender=get_user_model(),
+                          dispatch_uid='core.invalidate_user_tokens.save')
+        post_delete.connect(invalidate_user_tokens, sender=get_user_model(),
+                            dispatch_uid='core.invalidate_user_tokens.delete')
@@ -0,0 +1,224 @@
+import asyncio
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core import signals
+from django.core.handlers import base
+from django.core.handlers.wsgi import WSGIRequest, get_script_name
+from django.db import close_old_connections, connections
+from django.urls import set_script_prefix
+
+
+class ASGIHandler(base.BaseHandler):
+    """ASGI application serving the project through Django's own handler
+
+    Django 2.2 has no async views or ORM, so request bodies are read and
+    responses written on the event loop while the middleware and views
+    run in bounded thread pools. A slow client then only holds a
+    connection, not a thread. GET and HEAD requests to the hot read paths
+    run in a pool of their own, so writes and exports cannot starve them.
+    """
+
+    # Menu list, order list and order retrieve
+    hot_paths = (
+        re.compile(r'^/api/v1/pizza/pizzas/?$'),
+        re.compile(r'^/api/v1/order/orders/?$'),
+        re.compile(r'^/api/v1/order/orders/[0-9a-fA-F-]{32,36}/?$'),
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.load_middleware()
+        self.pool = ThreadPoolExecutor(
+            max_workers=settings.ASGI_THREADS,
+            thread_name_prefix='asgi'
+        )
+        self.read_pool = ThreadPoolExecutor(
+            max_workers=settings.ASGI_READ_THREADS,
+            thread_name_prefix='asgi-read'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] != 'http':
+            raise ValueError(
+                'Django can only handle ASGI/HTTP connections, not {}.'.format(
+                    scope['type']
+                )
+            )
+
+        body = await self.read_body(receive)
+
+        if body is None:
+            return
+
+        environ = self.get_environ(scope, body)
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            self.get_pool(scope), self.handle, environ
+        )
+        await self.send_response(response, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.pool.shutdown(wait=False)
+                self.read_pool.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Return the request body, or None if the client went away"""
+        body = BytesIO()
+
+        while True:
+            message = await receive()
+
+            if message['type'] == 'http.disconnect':
+                return None
+
+            body.write(message.get('body', b''))
+
+            if not message.get('more_body', False):
+                return body.getvalue()
+
+    def get_pool(self, scope):
+        if scope['method'] in ('GET', 'HEAD') and \
+                any(path.match(scope['path']) for path in self.hot_paths):
+            return self.read_pool
+        return self.pool
+
+    def get_environ(self, scope, body):
+        """Return the WSGI environ of an ASGI HTTP request"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'REMOTE_ADDR': str(client[0]),
+            'REMOTE_PORT': str(client[1]),
+            'SERVER_PROTOCOL': 'HTTP/{}'.format(
+                scope.get('http_version', '1.1')
+            ),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = 'HTTP_' + name
+
+            if name in environ:
+                value = environ[name] + ',' + value
+            environ[name] = value
+
+        environ.setdefault('CONTENT_LENGTH', str(len(body)))
+        return environ
+
+    def handle(self, environ):
+        """Run the request through Django, in a pool thread"""
+        set_script_prefix(get_script_name(environ))
+        signals.request_started.send(sender=self.__class__, environ=environ)
+        request = WSGIRequest(environ)
+        response = self.get_response(request)
+
+        if not response.streaming:
+            # Close in this thread, which owns the request's db connection
+            response.close()
+        else:
+            # The stream is read in a thread of its own with its connection
+            close_old_connections()
+
+        return response
+
+    def get_headers(self, response):
+        headers = [(name.encode('latin-1'), value.encode('latin-1'))
+                   for name, value in response.items()]
+
+        for cookie in response.cookies.values():
+            headers.append((b'Set-Cookie',
+                            cookie.output(header='').strip().encode('latin-1')))
+
+        return headers
+
+    async def send_response(self, response, receive, send):
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': self.get_headers(response),
+        })
+
+        if not response.streaming:
+            await send({'type': 'http.response.body',
+                        'body': response.content})
+            return
+
+        await self.send_streaming_body(response, receive, send)
+
+    async def send_streaming_body(self, response, receive, send):
+        """Send a streaming response chunk by chunk until it ends
+
+        Chunks are produced in a thread started for the response, so
+        long-lived streams such as order events do not hold a thread of the
+        bounded pools, and a stream reading a server-side cursor uses one
+        connection from its first chunk until it is closed.
+        """
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=1,
+                                      thread_name_prefix='asgi-stream')
+        chunks = iter(response)
+        disconnected = asyncio.ensure_future(self.wait_disconnect(receive))
+
+        try:
+            while True:
+                chunk = loop.run_in_executor(executor, next, chunks, None)
+                await asyncio.wait((chunk, disconnected),
+                                   return_when=asyncio.FIRST_COMPLETED)
+
+                if disconnected.done():
+                    await chunk
+                    break
+
+                chunk = chunk.result()
+                if chunk is None:
+                    await send({'type': 'http.response.body', 'body': b''})
+                    break
+
+                await send({'type': 'http.response.body', 'body': chunk,
+                            'more_body': True})
+        finally:
+            disconnected.cancel()
+            await loop.run_in_executor(executor, self.close_stream, response)
+            executor.shutdown(wait=False)
+
+    def close_stream(self, response):
+        """Close a streaming response and the connections of its thread"""
+        try:
+            response.close()
+        finally:
+            connections.close_all()
+
+    async def wait_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework.authentication import TokenAuthentication
+
+from core.cache import LocalLRUCache
+
+
+token_cache = LocalLRUCache(maxsize=settings.TOKEN_CACHE_SIZE,
+                            ttl=settings.TOKEN_CACHE_TTL)
+
+
+def freeze(instance):
+    """Return the field values to rebuild a model instance with"""
+    return tuple(getattr(instance, field.attname)
+                 for field in instance._meta.concrete_fields)
+
+
+def thaw(model, db, values):
+    names = [field.attname for field in model._meta.concrete_fields]
+    return model.from_db(db, names, values)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that remembers resolved tokens in-process
+
+    The field values of resolved users and tokens are kept in a bounded LRU
+    for at most TOKEN_CACHE_TTL seconds, and every request gets instances
+    of its own built from them. Entries are dropped as soon as the token is
+    deleted or the user is saved or deleted in this process. Other
+    processes see the change once their entry expires, as does this one
+    for users changed with QuerySet.update(), which sends no signals.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+
+        if entry is None:
+            user, token = super().authenticate_credentials(key)
+            entry = (user.pk, user._state.db, freeze(user), freeze(token))
+            token_cache.set(key, entry)
+            return user, token
+
+        _, db, user_values, token_values = entry
+        user = thaw(get_user_model(), db, user_values)
+        token = thaw(self.get_model(), db, token_values)
+        token.user = user
+        return user, token
+
+
+def invalidate_token(sender, instance, **kwargs):
+    """Signal receiver forgetting a deleted token"""
+    token_cache.delete(instance.key)
+
+
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """Signal receiver forgetting the tokens of a saved or deleted user"""
+    token_cache.delete_where(lambda entry: entry[0] == instance.pk)
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from core.hashers import verify_password
+
+
+class PasswordBackend(ModelBackend):
+    """Model backend verifying passwords through `verify_password`
+
+    Verification runs in the password process pool when
+    PASSWORD_VERIFY_PROCESSES is set, keeping login bursts off the request
+    threads' CPU. Hashes made with an outdated hasher or costs are
+    replaced on a successful login.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+
+        if username is None or password is None:
+            return None
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            verify_password(password, None)
+            return None
+
+        valid, rehashed = verify_password(password, user.password)
+
+        if not valid:
+            return None
+
+        if rehashed is not None:
+            user.password = rehashed
+            user.save(update_fields=['password'])
+
+        if self.user_can_authenticate(user):
+            return user
+
+        return None
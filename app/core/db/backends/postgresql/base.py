@@ -0,0 +1,82 @@
+from django.db.backends.postgresql import base
+
+from core.db.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend with connection health checks and pooling
+
+    Extra settings of the database:
+
+    - CONN_HEALTH_CHECKS: test a persistent connection (CONN_MAX_AGE) with
+      a query the first time it is used in a request, and reconnect if the
+      server closed it.
+    - POOL_SIZE: share at most this many connections between the threads
+      of a process; 0 opens one connection per thread as Django does.
+    - POOL_TIMEOUT: seconds to wait for a pooled connection.
+    - POOL_MAX_LIFETIME: seconds after which a pooled connection is closed
+      instead of reused.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.pool = None
+
+    def get_pool(self, conn_params):
+        size = self.settings_dict.get('POOL_SIZE', 0)
+
+        if not size:
+            return None
+
+        return get_pool(
+            repr(sorted(conn_params.items())), size,
+            self.settings_dict.get('POOL_TIMEOUT', 30),
+            self.settings_dict.get('POOL_MAX_LIFETIME')
+        )
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+
+        if self.pool is None:
+            return super().get_new_connection(conn_params)
+
+        connection = self.pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            ),
+            check=self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+        )
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def connect(self):
+        # A new connection needs no check, set before connect() runs queries
+        self.health_check_done = True
+        super().connect()
+
+    def _close(self):
+        if self.connection is None or self.pool is None:
+            return super()._close()
+
+        # A connection closed inside atomic() stays attached to this
+        # wrapper until the block exits, so it cannot go back to the pool
+        with self.wrap_database_errors:
+            self.pool.release(self.connection,
+                              reuse=not self.in_atomic_block)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if self.connection is not None and not self.health_check_done and \
+                not self.in_atomic_block and \
+                self.settings_dict.get('CONN_HEALTH_CHECKS', False):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+
+        super().ensure_connection()
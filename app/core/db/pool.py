@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class ConnectionPool:
+    """Bounded pool of open psycopg2 connections shared by a process' threads
+
+    At most `size` connections are handed out at once; callers wait up to
+    `timeout` seconds for one to be released, first come first served.
+    Released connections are rolled back and kept open for the next
+    caller, most recently used first, until they are older than
+    `max_lifetime` seconds.
+    """
+
+    def __init__(self, size, timeout, max_lifetime=None):
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self._idle = []
+        self._created = {}
+        self._available = size
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, connect, check=False):
+        """Return an idle connection, or a new one made with `connect`
+
+        With `check`, idle connections are tested with a query before they
+        are handed out. Raises OperationalError when no connection is
+        released within the timeout.
+        """
+        if not self._take_slot():
+            raise psycopg2.OperationalError(
+                'No database connection available in the pool within '
+                '{} seconds'.format(self.timeout)
+            )
+
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    connection = self._idle.pop()
+
+                if self._usable(connection, check):
+                    return connection
+                self._discard(connection)
+
+            connection = connect()
+            self._created[connection] = time.monotonic()
+            return connection
+        except BaseException:
+            self._give_slot()
+            raise
+
+    def release(self, connection, reuse=True):
+        """Give a connection back to the pool, closing it unless reusable"""
+        try:
+            if reuse and self._reset(connection):
+                with self._lock:
+                    self._idle.append(connection)
+            else:
+                self._discard(connection)
+        finally:
+            self._give_slot()
+
+    def close(self):
+        """Close the idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for connection in idle:
+            self._discard(connection)
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def _take_slot(self):
+        with self._lock:
+            if self._available and not self._waiters:
+                self._available -= 1
+                return True
+
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+
+        if waiter.wait(self.timeout):
+            return True
+
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                # Handed a slot just as the wait timed out
+                return True
+
+        return False
+
+    def _give_slot(self):
+        """Hand the slot to the longest waiting caller, or free it"""
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set()
+            else:
+                self._available += 1
+
+    def _expired(self, connection):
+        return self.max_lifetime is not None and \
+            time.monotonic() - self._created.get(connection, 0) > \
+            self.max_lifetime
+
+    def _usable(self, connection, check):
+        if connection.closed or self._expired(connection):
+            return False
+
+        if not check:
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except psycopg2.Error:
+            return False
+
+        return True
+
+    def _reset(self, connection):
+        """Roll back an open transaction, return whether it can be reused"""
+        if connection.closed or self._expired(connection):
+            return False
+
+        status = connection.get_transaction_status()
+
+        if status in (extensions.TRANSACTION_STATUS_UNKNOWN,
+                      extensions.TRANSACTION_STATUS_ACTIVE):
+            return False
+
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                return False
+
+        return True
+
+    def _discard(self, connection):
+        self._created.pop(connection, None)
+
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, size, timeout, max_lifetime=None):
+    """Return this process' pool for the connection parameters `key`
+
+    Pools are per process, so a forked worker never reuses the sockets of
+    connections its parent opened.
+    """
+    key = (os.getpid(), key)
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(size, timeout, max_lifetime)
+
+    return pool
+
+
+def close_pools():
+    """Close the idle connections of every pool of this process"""
+    with _pools_lock:
+        pools = [pool for (pid, _), pool in _pools.items()
+                 if pid == os.getpid()]
+
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,165 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+# Seconds a replica is behind the primary, 0 once it replayed everything
+# it received. Servers not in recovery are not replicas and never lag.
+LAG_SQL = (
+    'SELECT CASE'
+    ' WHEN NOT pg_is_in_recovery() THEN 0'
+    ' WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0'
+    ' ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())'
+    ' END'
+)
+
+_local = threading.local()
+
+
+def sticky_key(key):
+    return 'replicas:sticky:{}'.format(key)
+
+
+def user_key(user):
+    return 'user:{}'.format(user.pk)
+
+
+def stick(key):
+    """Keep the reads of `key` on the primary for the sticky window"""
+    caches[settings.DB_REPLICA_CACHE_ALIAS].set(
+        sticky_key(key), True, settings.DB_REPLICA_STICKY_SECONDS
+    )
+
+
+def is_sticky(*keys):
+    if not keys:
+        return False
+
+    return bool(caches[settings.DB_REPLICA_CACHE_ALIAS].get_many(
+        [sticky_key(key) for key in keys]
+    ))
+
+
+def use_replicas(*keys):
+    """Route the reads of this thread to the replicas
+
+    Reads stay on the primary when no replica is configured or one of
+    `keys` was written to within the sticky window. Returns whether
+    replicas are used.
+    """
+    _local.replicas = bool(settings.DATABASE_REPLICAS) and \
+        not is_sticky(*keys)
+    return _local.replicas
+
+
+def use_primary():
+    """Route the reads of this thread to the primary again"""
+    _local.replicas = False
+
+
+@contextmanager
+def sticky_reads(key):
+    """Read from the primary inside the block while `key` is sticky"""
+    replicas = getattr(_local, 'replicas', False)
+
+    if replicas and is_sticky(key):
+        _local.replicas = False
+
+    try:
+        yield
+    finally:
+        _local.replicas = replicas
+
+
+class ReplicaLag:
+    """Replication lag of the replicas, measured at most once an interval
+
+    Measurements are kept per process. A replica that cannot be reached
+    has an unknown lag, None.
+    """
+
+    def __init__(self):
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    def get(self, alias):
+        now = time.monotonic()
+
+        with self._lock:
+            checked_at, lag = self._checked.get(alias, (None, None))
+
+        if checked_at is not None and \
+                now - checked_at < settings.DB_REPLICA_LAG_INTERVAL:
+            return lag
+
+        lag = self.measure(alias)
+
+        with self._lock:
+            self._checked[alias] = (now, lag)
+
+        return lag
+
+    def measure(self, alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                lag = cursor.fetchone()[0]
+        except DatabaseError:
+            return None
+
+        return None if lag is None else float(lag)
+
+    def clear(self):
+        with self._lock:
+            self._checked.clear()
+
+
+replica_lag = ReplicaLag()
+
+
+def current_replicas():
+    """Return the replicas within DB_REPLICA_MAX_LAG of the primary"""
+    replicas = []
+
+    for alias in settings.DATABASE_REPLICAS:
+        lag = replica_lag.get(alias)
+        if lag is not None and lag <= settings.DB_REPLICA_MAX_LAG:
+            replicas.append(alias)
+
+    return replicas
+
+
+class ReplicaRouter:
+    """Send the reads of listings to read replicas of the default database
+
+    Only threads that called use_replicas(), such as views listing orders,
+    read from a replica, picked at random among the replicas that are at
+    most DB_REPLICA_MAX_LAG seconds behind. Everything else, reads inside
+    a transaction included, goes to the primary, the default database, as
+    do all reads when every replica lags or is down.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not getattr(_local, 'replicas', False) or \
+                connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        replicas = current_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get the schema of the primary through replication. The
+        # unreplicated stand-in of the tests is not one of them.
+        return db == DEFAULT_DB_ALIAS or db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,86 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2 password hasher with its costs read from the settings
+
+    Changing ARGON2_TIME_COST, ARGON2_MEMORY_COST (KiB) or
+    ARGON2_PARALLELISM makes `must_update` true for existing hashes, so
+    they are rehashed with the new costs when their user next logs in.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+def _setup_worker():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+    import django
+    django.setup()
+
+
+def check_password(password, encoded):
+    """Return whether `password` matches `encoded`, and its new hash
+
+    The new hash is None unless the password is correct and `encoded` was
+    made by another hasher or with other costs than the preferred hasher.
+    Without an encoded hash the preferred hasher is still run once, so
+    unknown users take as long to reject as wrong passwords.
+    """
+    if encoded is None:
+        hashers.make_password(password)
+        return False, None
+
+    rehashed = []
+    valid = hashers.check_password(
+        password, encoded,
+        setter=lambda raw: rehashed.append(hashers.make_password(raw))
+    )
+    return valid, rehashed[0] if rehashed else None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process pool verifying passwords, or None if disabled"""
+    global _pool
+
+    if not settings.PASSWORD_VERIFY_PROCESSES:
+        return None
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_VERIFY_PROCESSES,
+                    initializer=_setup_worker
+                )
+
+    return _pool
+
+
+def verify_password(password, encoded):
+    """Run `check_password` in the verification pool when it is enabled"""
+    pool = get_pool()
+
+    if pool is None:
+        return check_password(password, encoded)
+
+    return pool.submit(check_password, password, encoded).result()
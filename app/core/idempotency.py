@@ -0,0 +1,113 @@
+import hashlib
+import json
+from collections import OrderedDict
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.models import IdempotencyKey
+
+
+def fingerprint(request):
+    """Return a digest of the method, path and payload of a request"""
+    payload = json.dumps(request.data, cls=JSONEncoder, sort_keys=True)
+    value = '{} {}\n{}'.format(request.method, request.get_full_path(),
+                               payload)
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+def replay(record, request_fingerprint):
+    """Return the stored response of a repeated request"""
+    if record.fingerprint != request_fingerprint:
+        raise ValidationError({
+            'message': 'This Idempotency-Key was used for another request!'
+        })
+
+    data = json.loads(record.response, object_pairs_hook=OrderedDict)
+    response = Response(data, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def claim(user, key, request_fingerprint, expires):
+    """Store a new key, or lock the existing one until the transaction ends
+
+    A concurrent request holding the same key makes the INSERT wait for
+    its transaction, so the locked record then has its stored response.
+    """
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user, key=key, fingerprint=request_fingerprint
+            )
+    except IntegrityError:
+        record = IdempotencyKey.objects.select_for_update() \
+            .get(user=user, key=key)
+
+    if record.created_at < expires:
+        record.fingerprint = request_fingerprint
+        record.status_code = record.response = None
+        record.created_at = timezone.now()
+        record.save()
+
+    return record
+
+
+def idempotent(view_method):
+    """Make a view replay its response to requests repeating a key
+
+    Requests without an Idempotency-Key header are handled as usual. The
+    first request with a key runs in a transaction with the stored key, so
+    the key and the rows the view writes are committed together. Repeats
+    within IDEMPOTENCY_KEY_TTL seconds get the stored response back from a
+    single lookup; only successful responses are stored.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get('HTTP_IDEMPOTENCY_KEY', None)
+
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+
+        if not key or len(key) > 255:
+            raise ValidationError({
+                'message': 'Idempotency-Key must have 1 to 255 characters!'
+            })
+
+        request_fingerprint = fingerprint(request)
+        expires = timezone.now() - timedelta(
+            seconds=settings.IDEMPOTENCY_KEY_TTL
+        )
+        record = IdempotencyKey.objects.filter(
+            user=request.user, key=key, created_at__gte=expires
+        ).first()
+
+        if record is not None and record.status_code is not None:
+            return replay(record, request_fingerprint)
+
+        with transaction.atomic():
+            record = claim(request.user, key, request_fingerprint, expires)
+
+            if record.status_code is not None:
+                return replay(record, request_fingerprint)
+
+            response = view_method(self, request, *args, **kwargs)
+
+            if 200 <= response.status_code < 300:
+                record.status_code = response.status_code
+                record.response = json.dumps(response.data, cls=JSONEncoder,
+                                             separators=(',', ':'))
+                record.save(update_fields=['status_code', 'response'])
+            else:
+                record.delete()
+
+        return response
+
+    return wrapper
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import ArchivedOrder, Order
+
+
+ARCHIVE_STATUSES = (Order.DELIVERED, Order.CANCELLED)
+
+# Deletes a batch of old closed orders and inserts them into the archive
+ARCHIVE_SQL = (
+	'WITH moved AS ('
+	' DELETE FROM {orders} WHERE uuid IN ('
+	'  SELECT uuid FROM {orders}'
+	'  WHERE status IN %s AND created_at < %s'
+	'  ORDER BY created_at LIMIT %s FOR UPDATE SKIP LOCKED'
+	' ) RETURNING {columns}'
+	') '
+	'INSERT INTO {archive} ({columns}, archived_at) '
+	'SELECT {columns}, %s FROM moved'
+)
+
+
+class Command(BaseCommand):
+	"""Django command to move old delivered and cancelled orders to the
+	archive"""
+
+	help = 'Moves delivered and cancelled orders older than ' \
+		'ORDER_ARCHIVE_AFTER_DAYS to the order archive'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--days', type=int,
+			default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+			help='archive orders created more than this many days ago')
+		parser.add_argument('--batch-size', type=int, default=10000)
+
+	def handle(self, *args, **options):
+		cutoff = timezone.now() - timedelta(days=options['days'])
+		columns = ', '.join(
+			connection.ops.quote_name(field.column)
+			for field in Order._meta.concrete_fields
+		)
+		sql = ARCHIVE_SQL.format(
+			orders=connection.ops.quote_name(Order._meta.db_table),
+			archive=connection.ops.quote_name(ArchivedOrder._meta.db_table),
+			columns=columns
+		)
+		archived = 0
+
+		while True:
+			# One transaction per batch keeps row locks short
+			with transaction.atomic(), connection.cursor() as cursor:
+				cursor.execute(sql, [ARCHIVE_STATUSES, cutoff,
+					options['batch_size'], timezone.now()])
+				moved = cursor.rowcount
+
+			archived += moved
+
+			if moved < options['batch_size']:
+				break
+
+		self.stdout.write(self.style.SUCCESS(
+			'Archived {} orders created before {}'.format(
+				archived, cutoff.date().isoformat()
+			)
+		))
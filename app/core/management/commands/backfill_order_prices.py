@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Order
+
+
+class Command(BaseCommand):
+	"""Django command to store the unit and total price of unpriced orders"""
+
+	help = 'Stores the menu price of orders created before prices were saved'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--batch-size', type=int, default=1000)
+
+	def handle(self, *args, **options):
+		batch_size = options['batch_size']
+		unpriced = Order.objects.filter(total_price__isnull=True) \
+			.select_related('pizza_flavour').order_by('uuid')
+		last_uuid = None
+		priced = skipped = 0
+
+		while True:
+			batch = unpriced
+			if last_uuid is not None:
+				batch = batch.filter(uuid__gt=last_uuid)
+			batch = list(batch[:batch_size])
+
+			if not batch:
+				break
+
+			last_uuid = batch[-1].uuid
+			updates = []
+
+			for order in batch:
+				try:
+					order.unit_price, order.total_price = Order.price_for(
+						order.pizza_flavour, order.size, order.quantity
+					)
+				except (KeyError, TypeError, ValueError, ArithmeticError):
+					skipped += 1
+					continue
+				updates.append(order)
+
+			Order.objects.bulk_update(updates, ['unit_price', 'total_price'])
+			priced += len(updates)
+
+		self.stdout.write(self.style.SUCCESS(
+			'Priced {} orders, skipped {} without a menu price'.format(
+				priced, skipped
+			)
+		))
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from order.ingest import drain, get_queue
+
+
+class Command(BaseCommand):
+	"""Django command to insert the orders queued by the order API"""
+
+	help = 'Inserts the orders queued in ORDER_INGEST_QUEUE_PATH into the ' \
+		'database in batches'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--batch-size', type=int, default=500)
+		parser.add_argument('--interval', type=float, default=0.5,
+			help='seconds to wait when the queue is empty')
+		parser.add_argument('--once', action='store_true',
+			help='exit once the queue is empty')
+
+	def handle(self, *args, **options):
+		queue = get_queue()
+		inserted = failed = 0
+		self.stdout.write('Draining {}'.format(settings.ORDER_INGEST_QUEUE_PATH))
+
+		while True:
+			batch_inserted, batch_failed = drain(queue, options['batch_size'])
+			inserted += batch_inserted
+			failed += batch_failed
+
+			if batch_failed:
+				self.stderr.write('{} orders could not be inserted, see the '
+					'failed table of the queue'.format(batch_failed))
+
+			if not len(queue):
+				if options['once']:
+					break
+				time.sleep(options['interval'])
+
+		self.stdout.write(self.style.SUCCESS(
+			'Inserted {} queued orders, {} failed'.format(inserted, failed)
+		))
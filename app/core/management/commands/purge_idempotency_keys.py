@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+	"""Django command to delete idempotency keys older than their ttl"""
+
+	help = 'Deletes the stored responses of expired idempotency keys'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--batch-size', type=int, default=10000)
+
+	def handle(self, *args, **options):
+		expires = timezone.now() - timedelta(
+			seconds=settings.IDEMPOTENCY_KEY_TTL
+		)
+		expired = IdempotencyKey.objects.filter(created_at__lt=expires)
+		purged = 0
+
+		while True:
+			batch = list(expired.values_list('pk', flat=True)[
+				:options['batch_size']
+			])
+
+			if not batch:
+				break
+
+			purged += IdempotencyKey.objects.filter(pk__in=batch).delete()[0]
+
+		self.stdout.write(self.style.SUCCESS(
+			'Purged {} expired idempotency keys'.format(purged)
+		))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from analytics import rollups
+from core.models import OrderRollup
+
+
+class Command(BaseCommand):
+	"""Django command to recompute the order rollups from the orders table"""
+
+	help = 'Recomputes the sales rollups from every order'
+
+	def handle(self, *args, **options):
+		self.stdout.write('Rebuilding order rollups...')
+		rollups.rebuild()
+
+		self.stdout.write(self.style.SUCCESS(
+			'Rebuilt {} rollup rows'.format(OrderRollup.objects.count())
+		))
@@ -0,0 +1,85 @@
+import multiprocessing
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.utils.module_loading import autodiscover_modules
+
+from core import tasks
+
+
+def init_worker():
+	"""Give a worker process its own db connection"""
+	connections.close_all()
+
+
+def run_task(task_id):
+	# Reconnect after errors and past CONN_MAX_AGE, as between requests
+	close_old_connections()
+	try:
+		return tasks.run(task_id)
+	finally:
+		close_old_connections()
+
+
+class Command(BaseCommand):
+	"""Django command running queued tasks in a pool of processes"""
+
+	help = 'Runs the tasks queued by requests, retrying failed ones'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--processes', type=int,
+			default=settings.TASK_PROCESSES,
+			help='tasks run at once; 1 runs them in this process')
+		parser.add_argument('--interval', type=float, default=1.0,
+			help='seconds to wait when no task is due')
+		parser.add_argument('--timeout', type=int,
+			default=settings.TASK_TIMEOUT,
+			help='seconds after which a running task is run again')
+		parser.add_argument('--once', action='store_true',
+			help='exit once no task is due')
+
+	def handle(self, *args, **options):
+		# Register the tasks of every app before the pool forks
+		autodiscover_modules('tasks')
+
+		if options['processes'] == 1:
+			counts = self.work(None, options)
+		else:
+			connections.close_all()
+			with multiprocessing.Pool(options['processes'],
+					init_worker) as pool:
+				counts = self.work(pool, options)
+
+		self.stdout.write(self.style.SUCCESS(
+			'Ran {} tasks, {} failed'.format(counts[True], counts[False])
+		))
+
+	def work(self, pool, options):
+		counts = Counter()
+		pending = []
+
+		while True:
+			for result in [result for result in pending if result.ready()]:
+				counts[result.get()] += 1
+				pending.remove(result)
+
+			free = options['processes'] - len(pending)
+			task_ids = tasks.claim(free, options['timeout']) if free else []
+
+			for task_id in task_ids:
+				if pool is None:
+					counts[run_task(task_id)] += 1
+				else:
+					pending.append(pool.apply_async(run_task, (task_id,)))
+
+			if task_ids:
+				continue
+
+			if options['once'] and not pending:
+				return counts
+
+			# Poll running tasks more often than the queue
+			time.sleep(0.05 if pending else options['interval'])
@@ -0,0 +1,291 @@
+import io
+import multiprocessing
+import random
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+
+from analytics import rollups
+from core.models import Order, Pizza
+from pizza.cache import menu_cache
+
+
+ORDER_COLUMNS = ('uuid', 'customer_id', 'pizza_flavour_id', 'size',
+	'quantity', 'status', 'unit_price', 'total_price', 'created_at',
+	'updated_at')
+
+SIZES = (Order.SMALL, Order.MEDIUM, Order.LARGE)
+SIZE_WEIGHTS = (30, 45, 25)
+SIZE_FACTORS = {Order.SMALL: 1, Order.MEDIUM: 1.5, Order.LARGE: 2}
+
+QUANTITIES = (1, 2, 3, 4)
+QUANTITY_WEIGHTS = (60, 25, 10, 5)
+
+# Orders by hour of day, peaking at lunch and dinner
+HOUR_WEIGHTS = (1, 1, 0, 0, 0, 0, 1, 2, 3, 4, 6, 10, 16, 14, 8, 5, 6, 10,
+	16, 18, 14, 8, 4, 2)
+
+# Orders older than this have been delivered or cancelled
+OPEN_ORDER_AGE = timedelta(hours=2)
+
+OPEN_STATUSES = (Order.PENDING, Order.IN_PROGRESS, Order.DONE,
+	Order.CANCELLED)
+OPEN_STATUS_WEIGHTS = (40, 30, 25, 5)
+
+CLOSED_STATUSES = (Order.DELIVERED, Order.CANCELLED)
+CLOSED_STATUS_WEIGHTS = (93, 7)
+
+
+def cumulative(weights):
+	total = 0
+	result = []
+
+	for weight in weights:
+		total += weight
+		result.append(total)
+
+	return result
+
+
+def popularity(count):
+	"""Return cumulative Zipf weights, so a few rows get most orders"""
+	return cumulative(1.0 / rank for rank in range(1, count + 1))
+
+
+class OrderGenerator:
+	"""Generates chunks of orders, each from its own seeded generator
+
+	A chunk only depends on the seed, the prefix and its number, so the
+	orders are the same whichever worker process generates them and in
+	whatever order.
+	"""
+
+	def __init__(self, seed, customers, pizzas, start, end):
+		self.seed = seed
+		self.customers = customers
+		self.pizzas = pizzas
+		self.start = start
+		self.end = end
+		self.customer_weights = popularity(len(customers))
+		self.pizza_weights = popularity(len(pizzas))
+		self.size_weights = cumulative(SIZE_WEIGHTS)
+		self.quantity_weights = cumulative(QUANTITY_WEIGHTS)
+		self.hour_weights = cumulative(HOUR_WEIGHTS)
+		self.open_weights = cumulative(OPEN_STATUS_WEIGHTS)
+		self.closed_weights = cumulative(CLOSED_STATUS_WEIGHTS)
+
+	def created_at(self, rng):
+		# Sqrt makes the daily volume grow linearly up to the end date
+		span = (self.end - self.start).total_seconds()
+		day = self.start + timedelta(seconds=span * rng.random() ** 0.5)
+		hour = rng.choices(range(24), cum_weights=self.hour_weights)[0]
+		created_at = day.replace(hour=hour, minute=rng.randrange(60),
+			second=rng.randrange(60), microsecond=rng.randrange(1000000))
+
+		return min(max(created_at, self.start), self.end)
+
+	def rows(self, chunk, count):
+		"""Yield the column values of the orders of one chunk"""
+		rng = random.Random('{}-{}'.format(self.seed, chunk))
+
+		for _ in range(count):
+			customer = rng.choices(self.customers,
+				cum_weights=self.customer_weights)[0]
+			pizza, prices = rng.choices(self.pizzas,
+				cum_weights=self.pizza_weights)[0]
+			size = rng.choices(SIZES, cum_weights=self.size_weights)[0]
+			quantity = rng.choices(QUANTITIES,
+				cum_weights=self.quantity_weights)[0]
+			created_at = self.created_at(rng)
+
+			if self.end - created_at < OPEN_ORDER_AGE:
+				status = rng.choices(OPEN_STATUSES,
+					cum_weights=self.open_weights)[0]
+			else:
+				status = rng.choices(CLOSED_STATUSES,
+					cum_weights=self.closed_weights)[0]
+
+			updated_at = min(
+				created_at + timedelta(minutes=rng.randint(15, 90)),
+				self.end
+			)
+			unit_price, total_price = Order.price_for(
+				Pizza(prices=prices), size, quantity
+			)
+
+			yield (uuid.UUID(int=rng.getrandbits(128), version=4),
+				customer, pizza, size, quantity, status, unit_price,
+				total_price, created_at.isoformat(), updated_at.isoformat())
+
+	def copy_chunk(self, chunk, count):
+		"""Write one chunk of orders with COPY and return its size"""
+		data = io.StringIO()
+
+		for row in self.rows(chunk, count):
+			data.write('\t'.join(str(value) for value in row))
+			data.write('\n')
+
+		data.seek(0)
+		with connection.cursor() as cursor:
+			cursor.copy_expert('COPY {} ({}) FROM STDIN'.format(
+				Order._meta.db_table, ', '.join(ORDER_COLUMNS)
+			), data)
+
+		return count
+
+
+_generator = None
+
+
+def init_worker(generator):
+	"""Give a worker process the generator and its own db connection"""
+	global _generator
+	_generator = generator
+	connections.close_all()
+
+
+def copy_chunk(args):
+	return _generator.copy_chunk(*args)
+
+
+class Command(BaseCommand):
+	"""Django command to generate synthetic users, pizzas and orders"""
+
+	help = 'Seeds the database with synthetic users, pizzas and orders'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--users', type=int, default=1000)
+		parser.add_argument('--pizzas', type=int, default=20)
+		parser.add_argument('--orders', type=int, default=100000)
+		parser.add_argument('--days', type=int, default=365,
+			help='spread the orders over this many days')
+		parser.add_argument('--end', help='date of the newest orders, '
+			'YYYY-MM-DD; now by default')
+		parser.add_argument('--seed', type=int, default=0)
+		parser.add_argument('--prefix', default='seed-',
+			help='prefix of the generated emails and pizza flavours')
+		parser.add_argument('--password', default='password',
+			help='password of every generated user')
+		parser.add_argument('--workers', type=int,
+			default=multiprocessing.cpu_count())
+		parser.add_argument('--batch-size', type=int, default=10000,
+			help='orders per COPY')
+		parser.add_argument('--skip-rollups', action='store_true',
+			help='do not rebuild the sales rollups afterwards')
+
+	def handle(self, *args, **options):
+		prefix = options['prefix']
+		users = get_user_model().objects.filter(email__startswith=prefix)
+		pizzas = Pizza.objects.filter(flavour__startswith=prefix)
+
+		if users.exists() or pizzas.exists():
+			raise CommandError(
+				'Rows prefixed {} exist already, pass another --prefix'
+				.format(prefix)
+			)
+
+		end = timezone.now()
+		if options['end']:
+			end = timezone.make_aware(
+				datetime.strptime(options['end'], '%Y-%m-%d')
+			) + timedelta(days=1) - timedelta(microseconds=1)
+
+		seed = '{}-{}'.format(options['seed'], prefix)
+		rng = random.Random(seed)
+		self.stdout.write('Seeding {} users and {} pizzas...'.format(
+			options['users'], options['pizzas']
+		))
+		customers = self.seed_users(prefix, options)
+		pizzas = self.seed_pizzas(prefix, options['pizzas'], rng)
+
+		generator = OrderGenerator(
+			seed, customers, pizzas,
+			end - timedelta(days=options['days']), end
+		)
+		self.seed_orders(generator, options)
+
+		with connection.cursor() as cursor:
+			cursor.execute('ANALYZE {}, {}, {}'.format(
+				get_user_model()._meta.db_table, Pizza._meta.db_table,
+				Order._meta.db_table
+			))
+
+		if not options['skip_rollups']:
+			self.stdout.write('Rebuilding order rollups...')
+			rollups.rebuild()
+
+		self.stdout.write(self.style.SUCCESS(
+			'Seeded {} users, {} pizzas and {} orders'.format(
+				options['users'], options['pizzas'], options['orders']
+			)
+		))
+
+	def seed_users(self, prefix, options):
+		"""Create the users and return their ids in email order"""
+		User = get_user_model()
+		# One hash for every user, hashing each would take longer than COPY
+		password = make_password(options['password'])
+		emails = ['{}{}@example.com'.format(prefix, number)
+			for number in range(1, options['users'] + 1)]
+
+		User.objects.bulk_create(
+			(User(email=email, name='Customer {}'.format(number),
+				password=password)
+				for number, email in enumerate(emails, 1)),
+			batch_size=options['batch_size']
+		)
+
+		ids = dict(User.objects.filter(email__startswith=prefix).values_list(
+			'email', 'pk'
+		))
+		return [ids[email] for email in emails]
+
+	def seed_pizzas(self, prefix, count, rng):
+		"""Create the pizzas and return their (uuid, prices) pairs"""
+		pizzas = []
+
+		for number in range(1, count + 1):
+			small = rng.randrange(600, 1400) / 100
+			pizzas.append(Pizza(
+				uuid=uuid.UUID(int=rng.getrandbits(128), version=4),
+				flavour='{}pizza-{}'.format(prefix, number),
+				prices={size: float(Decimal(small * factor).quantize(
+					Decimal('.01')))
+					for size, factor in SIZE_FACTORS.items()}
+			))
+
+		Pizza.objects.bulk_create(pizzas)
+		menu_cache.bump()
+		return [(pizza.uuid, pizza.prices) for pizza in pizzas]
+
+	def seed_orders(self, generator, options):
+		total = options['orders']
+		batch_size = options['batch_size']
+		chunks = [(chunk, min(batch_size, total - start))
+			for chunk, start in enumerate(range(0, total, batch_size))]
+		seeded = 0
+
+		if options['workers'] <= 1:
+			for chunk in chunks:
+				seeded += generator.copy_chunk(*chunk)
+				self.stdout.write('Seeded {}/{} orders'.format(seeded, total))
+			return
+
+		# Workers commit their own chunks, so the users and pizzas must be
+		# committed before they start
+		if connection.in_atomic_block:
+			raise CommandError('Cannot seed orders in parallel inside a '
+				'transaction, pass --workers 1')
+
+		connections.close_all()
+		with multiprocessing.Pool(options['workers'], init_worker,
+				(generator,)) as pool:
+			for count in pool.imap_unordered(copy_chunk, chunks):
+				seeded += count
+				self.stdout.write('Seeded {}/{} orders'.format(seeded, total))
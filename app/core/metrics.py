@@ -0,0 +1,259 @@
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                    5.0, 10.0)
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(labelnames, labels, extra=()):
+    pairs = list(zip(labelnames, labels)) + list(extra)
+
+    if not pairs:
+        return ''
+
+    return '{' + ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in pairs
+    ) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label values, in Prometheus terms"""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def get(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+
+        for labels, value in values:
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Bucketed distribution of observed values per label values
+
+    Observations only increment one bucket under a lock; the cumulative
+    counts Prometheus expects are computed when the metrics are read.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [
+                    [0] * (len(self.buckets) + 1), 0
+                ]
+            series[0][index] += 1
+            series[1] += value
+
+    def get_count(self, *labels):
+        series = self._series.get(labels)
+        return sum(series[0]) if series is not None else 0
+
+    def samples(self):
+        with self._lock:
+            series = [(labels, list(counts), total)
+                      for labels, (counts, total) in self._series.items()]
+
+        for labels, counts, total in series:
+            cumulative = 0
+            bounds = [_format_value(float(bound)) for bound in self.buckets]
+
+            for bound, count in zip(bounds + ['+Inf'], counts):
+                cumulative += count
+                yield self.name + '_bucket', _format_labels(
+                    self.labelnames, labels, [('le', bound)]
+                ), cumulative
+
+            label_str = _format_labels(self.labelnames, labels)
+            yield self.name + '_sum', label_str, total
+            yield self.name + '_count', label_str, cumulative
+
+
+class Registry:
+    """Metrics of this process, rendered in the Prometheus text format"""
+
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+
+        for metric in self.metrics:
+            lines.append('# HELP {} {}'.format(metric.name,
+                                               metric.documentation))
+            lines.append('# TYPE {} {}'.format(metric.name, metric.type))
+            lines.extend(
+                '{}{} {}'.format(name, labels, _format_value(value))
+                for name, labels, value in metric.samples()
+            )
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    'http_requests_total', 'Requests by view, method and status code',
+    ('view', 'method', 'status')
+))
+REQUEST_DURATION = registry.register(Histogram(
+    'http_request_duration_seconds', 'Wall time of requests by view',
+    ('view', 'method')
+))
+DB_QUERIES = registry.register(Histogram(
+    'db_queries_per_request', 'Database queries run per request by view',
+    ('view', 'method'), QUERY_COUNT_BUCKETS
+))
+DB_DURATION = registry.register(Histogram(
+    'db_duration_seconds', 'Time spent in database queries per request',
+    ('view', 'method')
+))
+SERIALIZER_DURATION = registry.register(Histogram(
+    'serializer_duration_seconds', 'Time spent serializing per request',
+    ('view', 'method')
+))
+SLOW_QUERIES = registry.register(Counter(
+    'db_slow_queries_total',
+    'Queries slower than METRICS_SLOW_QUERY_MS by view', ('view',)
+))
+REPEATED_QUERIES = registry.register(Counter(
+    'db_repeated_queries_total',
+    'Requests running one query at least METRICS_REPEATED_QUERY_THRESHOLD'
+    ' times, a sign of N+1 queries, by view', ('view',)
+))
+
+
+_local = threading.local()
+
+
+def current():
+    """Return the RequestMetrics of the request handled by this thread"""
+    return getattr(_local, 'request', None)
+
+
+class RequestMetrics:
+    """Measurements of one request, also used as a database execute wrapper
+
+    Queries are grouped by their SQL before parameters are bound, so the
+    same query run once per row of a listing is counted as repeated.
+    """
+
+    def __init__(self):
+        self.view = 'unmatched'
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.query_counts = defaultdict(int)
+        self.slow_queries = []
+
+    def __enter__(self):
+        _local.request = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.request = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            self.query_counts[sql] += 1
+
+            if elapsed * 1000 >= settings.METRICS_SLOW_QUERY_MS:
+                self.slow_queries.append((elapsed, sql))
+
+    def record(self, method, status_code, duration):
+        """Add this request to the process metrics"""
+        REQUESTS.inc(self.view, method, str(status_code))
+        REQUEST_DURATION.observe(duration, self.view, method)
+        DB_QUERIES.observe(self.queries, self.view, method)
+        DB_DURATION.observe(self.db_time, self.view, method)
+        SERIALIZER_DURATION.observe(self.serializer_time, self.view, method)
+
+        for elapsed, sql in self.slow_queries:
+            SLOW_QUERIES.inc(self.view)
+            logger.warning('Slow query in %s (%.1f ms): %s', self.view,
+                           elapsed * 1000, sql[:1000])
+
+        threshold = settings.METRICS_REPEATED_QUERY_THRESHOLD
+        repeated = [(count, sql) for sql, count in self.query_counts.items()
+                    if count >= threshold]
+
+        if repeated:
+            REPEATED_QUERIES.inc(self.view)
+            for count, sql in repeated:
+                logger.warning('Query repeated %d times in %s: %s', count,
+                               self.view, sql[:1000])
+
+
+class TimedSerializerMixin:
+    """Serializer mixin adding its time to the current request's metrics"""
+
+    def to_representation(self, instance):
+        metrics = current()
+
+        if metrics is None or metrics.serializer_depth:
+            return super().to_representation(instance)
+
+        metrics.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+            metrics.serializer_depth -= 1
@@ -0,0 +1,128 @@
+import logging
+import os
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import CachedTokenAuthentication
+from core.metrics import RequestMetrics
+from core.profiling import PROFILERS, profile_path
+
+
+logger = logging.getLogger(__name__)
+
+
+def view_name(request):
+    """Return the view of a request, with its action for DRF viewsets"""
+    match = getattr(request, 'resolver_match', None)
+
+    if match is None:
+        return 'unmatched'
+
+    view = match.func
+    view_class = getattr(view, 'cls', None) or \
+        getattr(view, 'view_class', None)
+
+    if view_class is None:
+        return '{}.{}'.format(view.__module__, view.__name__)
+
+    action = (getattr(view, 'actions', None) or {}).get(
+        request.method.lower()
+    )
+
+    if action is None:
+        return view_class.__name__
+
+    return '{}.{}'.format(view_class.__name__, action)
+
+
+class MetricsMiddleware:
+    """Record the wall, database and serializer time of requests by view
+
+    Every query of the request goes through a database execute wrapper,
+    so query counts, slow queries and repeated queries are measured
+    without DEBUG. The measurements are read from the metrics endpoint.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+
+        with RequestMetrics() as metrics, ExitStack() as wrappers:
+            for connection in connections.all():
+                wrappers.enter_context(connection.execute_wrapper(metrics))
+
+            response = self.get_response(request)
+
+        metrics.view = view_name(request)
+        metrics.record(request.method, response.status_code,
+                       time.perf_counter() - start)
+        return response
+
+
+class ProfilingMiddleware:
+    """Profile single requests into PROFILE_DIR
+
+    Admins profile a request by sending an `X-Profile: cprofile` or
+    `X-Profile: stacks` header with their token, and get the profile file
+    name back in the `X-Profile` response header. PROFILE_SAMPLE_RATE
+    profiles that fraction of all requests with PROFILE_MODE. Other
+    requests only pay for the header lookup and the sampling draw.
+    """
+
+    def __init__(self, get_response):
+        if settings.PROFILE_MODE not in PROFILERS:
+            raise ImproperlyConfigured(
+                'PROFILE_MODE must be one of {}, not {!r}'.format(
+                    ', '.join(sorted(PROFILERS)), settings.PROFILE_MODE
+                )
+            )
+
+        self.get_response = get_response
+        self.mode = settings.PROFILE_MODE
+
+    def __call__(self, request):
+        requested = request.META.get('HTTP_X_PROFILE')
+
+        if requested is not None and self.is_staff(request):
+            mode = requested if requested in PROFILERS else self.mode
+        elif settings.PROFILE_SAMPLE_RATE and \
+                random.random() < settings.PROFILE_SAMPLE_RATE:
+            requested = None
+            mode = self.mode
+        else:
+            return self.get_response(request)
+
+        profiler = PROFILERS[mode]()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+
+        path = profile_path(view_name(request), profiler.extension)
+        try:
+            profiler.save(path)
+        except OSError:
+            logger.exception('Could not save the profile %s', path)
+            return response
+
+        if requested is not None:
+            response['X-Profile'] = os.path.basename(path)
+
+        return response
+
+    def is_staff(self, request):
+        try:
+            credentials = CachedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+
+        return credentials is not None and credentials[0].is_staff
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_order_prices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('pizza_flavour', models.UUIDField()),
+                ('size', models.CharField(choices=[('L', 'Large'), ('M', 'Medium'), ('S', 'small')], max_length=1)),
+                ('status', models.CharField(choices=[('P', 'Pending'), ('I', 'In-progress'), ('C', 'Cancelled'), ('DN', 'Done'), ('DL', 'Delivered')], max_length=2)),
+                ('orders', models.BigIntegerField(default=0)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+            ],
+            options={
+                'unique_together': {('day', 'pizza_flavour', 'size', 'status')},
+            },
+        ),
+    ]
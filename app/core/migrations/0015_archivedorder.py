@@ -0,0 +1,42 @@
+# Generated by Django 2.2.28 on 2026-10-18 21:02
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('size', models.CharField(choices=[('L', 'Large'), ('M', 'Medium'), ('S', 'small')], default='S', max_length=1)),
+                ('quantity', models.PositiveIntegerField(default=1, help_text='number of pizza-box', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(2147483647)])),
+                ('status', models.CharField(choices=[('P', 'Pending'), ('I', 'In-progress'), ('C', 'Cancelled'), ('DN', 'Done'), ('DL', 'Delivered')], default='P', max_length=2)),
+                ('unit_price', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('total_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archivedorders', to=settings.AUTH_USER_MODEL)),
+                ('pizza_flavour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archivedorders', to='core.Pizza')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['customer', '-created_at', '-uuid'], name='archived_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['-created_at', '-uuid'], name='archived_created_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
 import uuid
+from decimal import Decimal
+
 from django.db import models
+from django.utils import timezone
 from django.contrib.postgres.fields import JSONField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
@@ -62,8 +65,8 @@ class Pizza(models.Model):
         return self.flavour
 
 
-class Order(models.Model):
-    """Order model to hold pizza orders from users"""
+class AbstractOrder(models.Model):
+    """Fields of an order, shared by current and archived orders"""
 
     LARGE = 'L'
     MEDIUM = 'M'
@@ -88,11 +91,17 @@ class Order(models.Model):
         (DELIVERED, 'Delivered')
     ]
 
+    STATUS_TRANSITIONS = {
+        PENDING: (IN_PROGRESS, CANCELLED),
+        IN_PROGRESS: (DONE, CANCELLED),
+        DONE: (DELIVERED,),
+    }
+
     uuid = models.UUIDField(primary_key=True, default=uuid.uuid4, unique=True,
                             editable=False)
-    customer = models.ForeignKey(User, related_name='orders',
+    customer = models.ForeignKey(User, related_name='%(class)ss',
                                  on_delete=models.CASCADE)
-    pizza_flavour = models.ForeignKey(Pizza, related_name='orders',
+    pizza_flavour = models.ForeignKey(Pizza, related_name='%(class)ss',
                                       on_delete=models.CASCADE)
     size = models.CharField(max_length=1, choices=PIZZA_SIZE_CHOICES,
                             default=SMALL)
@@ -106,8 +115,161 @@ class Order(models.Model):
     )
     status = models.CharField(max_length=2, choices=STATUS_CHOICES,
                               default=PENDING)
+    unit_price = models.DecimalField(max_digits=8, decimal_places=2,
+                                     null=True, blank=True)
+    total_price = models.DecimalField(max_digits=12, decimal_places=2,
+                                      null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
+    class Meta:
+        abstract = True
+
     def get_total_price(self):
-        return self.pizza_flavour.prices[self.size] * self.quantity
+        if self.total_price is not None:
+            return self.total_price
+
+        # Unpriced orders whose size left the menu have no known total
+        price = self.pizza_flavour.prices.get(self.size)
+        return None if price is None else price * self.quantity
+
+
+class Order(AbstractOrder):
+    """Order model to hold pizza orders from users"""
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', '-created_at', '-uuid'],
+                         name='order_customer_created_idx'),
+            models.Index(fields=['customer', 'status', '-created_at'],
+                         name='order_customer_status_idx'),
+            models.Index(fields=['-created_at', '-uuid'],
+                         name='order_created_idx'),
+            models.Index(fields=['status', '-created_at', '-uuid'],
+                         name='order_status_created_idx'),
+            models.Index(fields=['-created_at', '-uuid'],
+                         name='order_active_idx',
+                         condition=models.Q(status__in=['P', 'I'])),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """remembers the values an order was loaded with"""
+        loaded_values = dict(zip(field_names, values))
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = loaded_values
+        return instance
+
+    @classmethod
+    def statuses_moving_to(cls, status):
+        """returns the statuses an order may move to `status` from"""
+        return [source for source, targets in cls.STATUS_TRANSITIONS.items()
+                if status in targets]
+
+    @staticmethod
+    def price_for(pizza, size, quantity):
+        """returns the unit and total price of an order from the menu"""
+        unit_price = Decimal(str(pizza.prices[size])).quantize(Decimal('.01'))
+
+        return unit_price, unit_price * quantity
+
+    def save(self, *args, **kwargs):
+        """prices an order from the menu the first time it is saved"""
+
+        if self._state.adding and self.total_price is None:
+            self.unit_price, self.total_price = self.price_for(
+                self.pizza_flavour, self.size, self.quantity
+            )
+
+        super().save(*args, **kwargs)
+
+
+class ArchivedOrder(AbstractOrder):
+    """Delivered and cancelled orders moved out of the orders table
+
+    The archive_orders command moves orders here once they are older than
+    ORDER_ARCHIVE_AFTER_DAYS, so queries on orders only scan recent ones.
+    Archived orders are read only and still counted in the rollups.
+    """
+
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', '-created_at', '-uuid'],
+                         name='archived_customer_created_idx'),
+            models.Index(fields=['-created_at', '-uuid'],
+                         name='archived_created_idx'),
+        ]
+
+
+class OrderRollup(models.Model):
+    """Order totals per day, pizza, size and status kept current as orders
+    are created, changed and deleted"""
+
+    day = models.DateField()
+    pizza_flavour = models.UUIDField()
+    size = models.CharField(max_length=1, choices=Order.PIZZA_SIZE_CHOICES)
+    status = models.CharField(max_length=2, choices=Order.STATUS_CHOICES)
+    orders = models.BigIntegerField(default=0)
+    quantity = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=18, decimal_places=2,
+                                  default=0)
+
+    class Meta:
+        unique_together = ('day', 'pizza_flavour', 'size', 'status')
+
+
+class IdempotencyKey(models.Model):
+    """Response of a request made with an Idempotency-Key header, replayed
+    when the user repeats the request with the same key"""
+
+    user = models.ForeignKey(User, related_name='+',
+                             on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.TextField(null=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+
+class Task(models.Model):
+    """Work queued by a request for the run_tasks worker to do later
+
+    `name` is a function registered with core.tasks.task, called with
+    `kwargs`. Failed tasks are retried with a growing delay until they
+    reach `max_attempts`; successful ones are deleted.
+    """
+
+    QUEUED = 'Q'
+    RUNNING = 'R'
+    FAILED = 'F'
+
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=255)
+    kwargs = JSONField(default=dict)
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES,
+                              default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='task_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,131 @@
+import json
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Paginate newest first on (created_at, uuid) using opaque cursors
+
+    Each page is fetched with a WHERE clause on the last row seen instead of
+    an OFFSET, so deep pages cost the same as the first one.
+    """
+
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-uuid')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        self.reverse = cursor is not None and cursor['r']
+
+        if cursor is not None:
+            queryset = queryset.filter(self.get_boundary(cursor))
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self._invert(field) for field in ordering]
+
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size < 1:
+            return self.page_size
+
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_boundary(self, cursor):
+        """Return the filter selecting rows past the cursor position"""
+        created_at, key = (field.lstrip('-') for field in self.ordering)
+        descending = self.ordering[0].startswith('-') != cursor['r']
+        lookup = 'lt' if descending else 'gt'
+
+        return Q(**{'{}__{}'.format(created_at, lookup): cursor['c']}) | Q(**{
+            created_at: cursor['c'],
+            '{}__{}'.format(key, lookup): cursor['u']
+        })
+
+    def encode_cursor(self, row, reverse):
+        created_at, key = (field.lstrip('-') for field in self.ordering)
+        position = json.dumps({
+            'c': self._value(row, created_at).isoformat(),
+            'u': str(self._value(row, key)),
+            'r': int(reverse)
+        }, separators=(',', ':'))
+        encoded = urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            cursor = {
+                'c': parse_datetime(cursor['c']),
+                'u': uuid.UUID(cursor['u']),
+                'r': bool(cursor['r'])
+            }
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if cursor['c'] is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        return cursor
+
+    def _invert(self, field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+    def _value(self, row, field):
+        if isinstance(row, dict):
+            return row[field]
+        return getattr(row, field)
@@ -0,0 +1,93 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+
+
+def profile_path(view, extension):
+    """Return a new file path in PROFILE_DIR for a profile of `view`"""
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    name = '{}-{}-{}.{}'.format(time.strftime('%Y%m%dT%H%M%S'), view,
+                                uuid.uuid4().hex[:8], extension)
+    return os.path.join(settings.PROFILE_DIR, name)
+
+
+class CProfiler:
+    """Deterministic profile of the current thread, saved as pstats"""
+
+    extension = 'pstats'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def save(self, path):
+        self.profile.dump_stats(path)
+
+
+class StackSampler:
+    """Statistical profile of the current thread, saved as collapsed stacks
+
+    A background thread records the stack of the profiled thread every
+    PROFILE_SAMPLE_INTERVAL milliseconds. The profiled code runs without
+    any hooks, so timings stay close to those of unprofiled requests. The
+    output has one `frame;frame;... count` line per stack, as read by
+    flame graph tools.
+    """
+
+    extension = 'collapsed'
+
+    def __init__(self, interval=None):
+        if interval is None:
+            interval = settings.PROFILE_SAMPLE_INTERVAL
+        self.interval = interval / 1000
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._sample, args=(threading.get_ident(),),
+            name='profile-sampler', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _sample(self, thread_id):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{} ({}:{})'.format(
+                    code.co_name, code.co_filename, code.co_firstlineno
+                ))
+                frame = frame.f_back
+
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def save(self, path):
+        with open(path, 'w') as output:
+            for stack, count in self.stacks.most_common():
+                output.write('{} {}\n'.format(stack, count))
+
+
+PROFILERS = {
+    'cprofile': CProfiler,
+    'stacks': StackSampler,
+}
@@ -0,0 +1,45 @@
+from collections import OrderedDict
+
+
+class ValuesSerializer:
+    """Read-only serializer building its output from `.values()` rows
+
+    Subclasses list their output `fields` as (name, columns, convert)
+    triples, where `convert` gets the values of `columns` from the row and
+    returns the output value, or is None to output the single column as
+    is. The columns to select are compiled once per class, so a row costs
+    a few dict lookups and calls instead of DRF's per-field machinery.
+    """
+
+    fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        columns = []
+
+        for _, field_columns, _ in cls.fields:
+            columns.extend(column for column in field_columns
+                           if column not in columns)
+
+        cls.columns = tuple(columns)
+
+    def __init__(self, instance, many=False):
+        self.instance = instance
+        self.many = many
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(row) for row in self.instance]
+        return self.to_representation(self.instance)
+
+    def to_representation(self, row):
+        data = OrderedDict()
+
+        for name, columns, convert in self.fields:
+            if convert is None:
+                data[name] = row[columns[0]]
+            else:
+                data[name] = convert(*[row[column] for column in columns])
+
+        return data
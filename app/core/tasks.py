@@ -0,0 +1,141 @@
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Task
+
+
+_registry = {}
+
+
+def task(name, max_attempts=None):
+    """Register a function the run_tasks worker can call by `name`
+
+    The function is called with the keyword arguments it was queued with,
+    which must be JSON serializable. A task may run more than once, when
+    it fails or the worker stops while running it, so it must be safe to
+    repeat.
+    """
+    def register(func):
+        _registry[name] = func
+        func.task_name = name
+        func.max_attempts = max_attempts
+        return func
+
+    return register
+
+
+def get_task(name):
+    return _registry[name]
+
+
+def enqueue(name, kwargs=None, delay=0):
+    """Queue a call of the task `name`, in `delay` seconds
+
+    The task is saved in the current transaction, so it only runs if the
+    transaction commits.
+    """
+    return enqueue_many(name, [kwargs or {}], delay)[0]
+
+
+def enqueue_many(name, kwargs_list, delay=0):
+    """Queue one call of the task `name` per kwargs in a single INSERT"""
+    func = get_task(name)
+    run_at = timezone.now() + timedelta(seconds=delay)
+
+    return Task.objects.bulk_create(
+        Task(name=name, kwargs=kwargs, run_at=run_at,
+             max_attempts=func.max_attempts or settings.TASK_MAX_ATTEMPTS)
+        for kwargs in kwargs_list
+    )
+
+
+def claim(limit, timeout):
+    """Mark up to `limit` due tasks as running and return their ids
+
+    Tasks left running for more than `timeout` seconds, by a worker that
+    stopped, are claimed again, or marked failed when that was their last
+    attempt, so a task that kills its worker is not retried forever.
+    Tasks locked by another worker are skipped, so several workers can
+    share the queue.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=timeout)
+    table = connection.ops.quote_name(Task._meta.db_table)
+    fail_sql = (
+        'UPDATE {table} SET status = %s, locked_at = NULL, last_error = %s '
+        'WHERE id IN ('
+        ' SELECT id FROM {table}'
+        ' WHERE status = %s AND locked_at < %s'
+        ' AND attempts >= max_attempts'
+        ' FOR UPDATE SKIP LOCKED'
+        ')'
+    ).replace('{table}', table)
+    claim_sql = (
+        'UPDATE {table} SET status = %s, locked_at = %s,'
+        ' attempts = attempts + 1 '
+        'WHERE id IN ('
+        ' SELECT id FROM {table}'
+        ' WHERE (status = %s AND run_at <= %s)'
+        ' OR (status = %s AND locked_at < %s'
+        ' AND attempts < max_attempts)'
+        ' ORDER BY run_at LIMIT %s FOR UPDATE SKIP LOCKED'
+        ') RETURNING id'
+    ).replace('{table}', table)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(fail_sql, [
+            Task.FAILED, 'Timed out after {} seconds'.format(timeout),
+            Task.RUNNING, stale
+        ])
+        cursor.execute(claim_sql, [
+            Task.RUNNING, now, Task.QUEUED, now, Task.RUNNING, stale, limit
+        ])
+        return [pk for pk, in cursor.fetchall()]
+
+
+def backoff(attempts):
+    """Return the seconds to wait before retrying after `attempts` runs"""
+    delay = min(settings.TASK_RETRY_DELAY * 2 ** (attempts - 1),
+                settings.TASK_RETRY_MAX_DELAY)
+    # Spread out retries of tasks that failed together
+    return delay * random.uniform(1, 1.5)
+
+
+def run(task_id):
+    """Run a claimed task, then delete it or schedule its retry
+
+    Returns True when the task succeeded. The task is only changed if it
+    is still under this claim, not claimed again by another worker after
+    it timed out.
+    """
+    task = Task.objects.filter(pk=task_id, status=Task.RUNNING).first()
+
+    if task is None:
+        return False
+
+    claimed = Task.objects.filter(pk=task.pk, status=Task.RUNNING,
+                                  locked_at=task.locked_at)
+
+    try:
+        func = get_task(task.name)
+        func(**task.kwargs)
+    except Exception:
+        if task.attempts >= task.max_attempts:
+            status, run_at = Task.FAILED, task.run_at
+        else:
+            status = Task.QUEUED
+            run_at = timezone.now() + timedelta(
+                seconds=backoff(task.attempts)
+            )
+
+        claimed.update(status=status, run_at=run_at, locked_at=None,
+                       last_error=traceback.format_exc())
+        return False
+
+    claimed.delete()
+    return True
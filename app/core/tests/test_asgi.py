@@ -0,0 +1,203 @@
+import asyncio
+import json
+import threading
+
+from django.http import StreamingHttpResponse
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from rest_framework.authtoken.models import Token
+from core.asgi import ASGIHandler
+from core.models import Pizza, Order
+from pizza.cache import menu_cache
+
+
+PIZZAS_URL = reverse('pizza:pizza-list')
+ORDER_URL = reverse('order:order-list')
+EXPORT_URL = reverse('order:adminOrders-export')
+
+
+def order_url(order_uuid, suffix=''):
+	return reverse('order:order-detail', args=[order_uuid]) + suffix
+
+
+class ASGIHandlerTests(TransactionTestCase):
+	"""Test serving requests through the ASGI handler"""
+
+	def setUp(self):
+		menu_cache.clear()
+		self.user = get_user_model().objects.create_user(
+			email='johnny@andela.com',
+			password='password'
+		)
+		self.token = Token.objects.create(user=self.user)
+		self.pizza = Pizza.objects.create(
+			flavour='Vegan',
+			prices={"S": 10.00, "M": 15.00, "L": 20.00}
+		)
+		self.handler = ASGIHandler()
+
+	def tearDown(self):
+		self.handler.pool.shutdown()
+		self.handler.read_pool.shutdown()
+
+	def request(self, method, path, body=b'', token=True, headers=()):
+		"""Run one request through the handler and return what it sent"""
+		headers = list(headers)
+		if token:
+			headers.append((b'authorization',
+							'Token {}'.format(self.token.key).encode()))
+		if body:
+			headers.append((b'content-type', b'application/json'))
+
+		scope = {
+			'type': 'http', 'method': method, 'path': path,
+			'query_string': b'', 'headers': headers,
+			'server': ('testserver', 80), 'http_version': '1.1',
+		}
+
+		async def run():
+			sent = []
+			bodies = [{'type': 'http.request', 'body': body}]
+
+			async def receive():
+				if bodies:
+					return bodies.pop()
+				await asyncio.Event().wait()
+
+			async def send(message):
+				sent.append(message)
+
+			await self.handler(scope, receive, send)
+			return sent
+
+		sent = asyncio.run(run())
+		return sent[0]['status'], \
+			b''.join(message.get('body', b'') for message in sent[1:]), sent
+
+	def test_list_pizzas(self):
+		"""Test the menu is served with the token authentication"""
+
+		status, body, _ = self.request('GET', PIZZAS_URL)
+
+		self.assertEqual(status, 200)
+		self.assertEqual(json.loads(body)['results'][0]['flavour'], 'Vegan')
+
+	def test_login_required(self):
+		"""Test requests without a valid token are still rejected"""
+
+		status, _, _ = self.request('GET', ORDER_URL, token=False)
+
+		self.assertEqual(status, 401)
+
+	def test_create_and_retrieve_order(self):
+		"""Test request bodies reach the views and reads see the writes"""
+
+		status, _, _ = self.request('POST', ORDER_URL,
+									body=b'{"pizza_flavour": "Vegan"}')
+		order = Order.objects.get(customer=self.user)
+
+		self.assertEqual(status, 201)
+		status, body, _ = self.request('GET', order_url(order.uuid))
+		self.assertEqual(status, 200)
+		self.assertEqual(json.loads(body)['id'], str(order.uuid))
+
+	def test_hot_reads_use_read_pool(self):
+		"""Test menu and order reads run apart from other requests"""
+
+		for method, path, pool in (
+			('GET', PIZZAS_URL, self.handler.read_pool),
+			('GET', ORDER_URL, self.handler.read_pool),
+			('GET', order_url(self.pizza.uuid), self.handler.read_pool),
+			('POST', ORDER_URL, self.handler.pool),
+			('GET', order_url(self.pizza.uuid, '/events'), self.handler.pool),
+		):
+			scope = {'method': method, 'path': path}
+			self.assertIs(self.handler.get_pool(scope), pool)
+
+	@override_settings(ORDER_EVENTS_TIMEOUT=0)
+	def test_streaming_response(self):
+		"""Test streaming responses are sent chunk by chunk"""
+
+		order = Order.objects.create(
+			customer=self.user, pizza_flavour=self.pizza
+		)
+
+		status, body, sent = self.request(
+			'GET', order_url(order.uuid, '/events')
+		)
+
+		self.assertEqual(status, 200)
+		self.assertTrue(body.startswith(b'id: '))
+		self.assertTrue(sent[1]['more_body'])
+		self.assertFalse(sent[-1].get('more_body', False))
+
+	def test_stream_read_in_one_thread(self):
+		"""Test every chunk of a stream is produced by the same thread"""
+
+		threads = []
+
+		def chunks():
+			for chunk in (b'a', b'b', b'c'):
+				threads.append(threading.current_thread().name)
+				yield chunk
+
+		response = StreamingHttpResponse(chunks())
+		response.close = lambda: threads.append(
+			threading.current_thread().name
+		)
+		sent = []
+
+		async def receive():
+			await asyncio.Event().wait()
+
+		async def send(message):
+			sent.append(message)
+
+		asyncio.run(self.handler.send_streaming_body(response, receive, send))
+
+		self.assertEqual(b''.join(message['body'] for message in sent),
+						b'abc')
+		self.assertEqual(len(threads), 4)
+		self.assertEqual(len(set(threads)), 1)
+		self.assertTrue(threads[0].startswith('asgi-stream'))
+
+	@override_settings(ORDER_EXPORT_CHUNK_SIZE=1)
+	def test_streaming_export(self):
+		"""Test an export's cursor is read from one thread to the end"""
+
+		admin = get_user_model().objects.create_superuser(
+			'admin@andela.com',
+			'password'
+		)
+		token = Token.objects.create(user=admin)
+		for _ in range(3):
+			Order.objects.create(customer=self.user, pizza_flavour=self.pizza)
+
+		status, body, _ = self.request(
+			'GET', EXPORT_URL, token=False,
+			headers=[(b'authorization',
+					'Token {}'.format(token.key).encode())]
+		)
+
+		self.assertEqual(status, 200)
+		self.assertEqual(len(body.splitlines()), 3)
+
+	def test_lifespan(self):
+		"""Test the handler completes the lifespan protocol"""
+
+		messages = [{'type': 'lifespan.shutdown'},
+					{'type': 'lifespan.startup'}]
+		sent = []
+
+		async def receive():
+			return messages.pop()
+
+		async def send(message):
+			sent.append(message['type'])
+
+		asyncio.run(self.handler({'type': 'lifespan'}, receive, send))
+
+		self.assertEqual(sent, ['lifespan.startup.complete',
+								'lifespan.shutdown.complete'])
@@ -0,0 +1,96 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from rest_framework.authtoken.models import Token
+from core.authentication import CachedTokenAuthentication
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Pizza
+from pizza.cache import menu_cache
+
+
+PIZZAS_URL = reverse('pizza:pizza-list')
+ADMIN_ORDER_URL = reverse('order:adminOrders-list')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+	"""Test token authentication through the token cache"""
+
+	def setUp(self):
+		menu_cache.clear()
+		self.user = get_user_model().objects.create_user(
+			email='johnny@andela.com',
+			password='password'
+		)
+		self.token = Token.objects.create(user=self.user)
+		Pizza.objects.create(flavour='Vegan', prices={"S": 10.00})
+		self.client = APIClient()
+		self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+	def test_warm_menu_request_runs_no_queries(self):
+		"""Test a cached token and menu serve the menu without the db"""
+
+		self.client.get(PIZZAS_URL)
+
+		with self.assertNumQueries(0):
+			res = self.client.get(PIZZAS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+	def test_invalid_token(self):
+		"""Test an unknown token is still rejected"""
+
+		self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+		res = self.client.get(PIZZAS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_deleted_token_is_forgotten(self):
+		"""Test deleting a cached token logs the client out"""
+
+		self.client.get(PIZZAS_URL)
+		self.token.delete()
+
+		res = self.client.get(PIZZAS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_deactivated_user_is_forgotten(self):
+		"""Test deactivating a user rejects their cached token"""
+
+		self.client.get(PIZZAS_URL)
+		self.user.is_active = False
+		self.user.save()
+
+		res = self.client.get(PIZZAS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_staff_change_is_picked_up(self):
+		"""Test promoting a user to staff applies to their cached token"""
+
+		res = self.client.get(ADMIN_ORDER_URL)
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+		self.user.is_staff = True
+		self.user.save()
+
+		res = self.client.get(ADMIN_ORDER_URL)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+	def test_cached_user_is_not_shared(self):
+		"""Test each request gets its own user and token instances"""
+
+		authentication = CachedTokenAuthentication()
+		authentication.authenticate_credentials(self.token.key)
+		user, token = authentication.authenticate_credentials(self.token.key)
+		user.name = 'Changed'
+
+		other, _ = authentication.authenticate_credentials(self.token.key)
+
+		self.assertEqual(user, self.user)
+		self.assertIs(token.user, user)
+		self.assertIsNot(other, user)
+		self.assertEqual(other.name, self.user.name)
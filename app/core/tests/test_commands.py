@@ -1,7 +1,15 @@
+from datetime import timedelta
+from io import StringIO
 from unittest.mock import patch
-from django.core.management import call_command
+from django.core.management import call_command, CommandError
+from django.db.models import Sum
 from django.db.utils import OperationalError
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from analytics import rollups
+from core.models import Pizza, Order, IdempotencyKey, OrderRollup, \
+	ArchivedOrder
 
 
 class CommandTests(TestCase):
@@ -22,3 +30,128 @@ class CommandTests(TestCase):
 			gi.side_effect = [OperationalError] * 5 + [True]
 			call_command('wait_for_db')
 			self.assertEqual(gi.call_count, 6)
+
+	def test_backfill_order_prices(self):
+		"""Test unpriced orders are priced from the menu"""
+
+		user = get_user_model().objects.create_user('test@andela.com',
+													'Test123')
+		pizza = Pizza.objects.create(flavour='Vegan',
+									prices={"S": 10.00, "M": 15.50})
+		priced = Order.objects.create(customer=user, pizza_flavour=pizza,
+									size='M', quantity=2)
+		unpriceable = Order.objects.create(customer=user,
+										pizza_flavour=pizza, size='S')
+		Order.objects.update(unit_price=None, total_price=None)
+		pizza.prices = {"M": 15.50}
+		pizza.save()
+
+		call_command('backfill_order_prices', batch_size=1, stdout=StringIO())
+
+		priced.refresh_from_db()
+		unpriceable.refresh_from_db()
+		self.assertEqual(str(priced.unit_price), '15.50')
+		self.assertEqual(str(priced.total_price), '31.00')
+		self.assertIsNone(unpriceable.total_price)
+
+	def test_purge_idempotency_keys(self):
+		"""Test only idempotency keys past their ttl are deleted"""
+
+		user = get_user_model().objects.create_user(
+			email='johnny@andela.com',
+			password='password'
+		)
+		old = IdempotencyKey.objects.create(
+			user=user, key='old', fingerprint='f'
+		)
+		old.created_at -= timedelta(days=2)
+		old.save()
+		IdempotencyKey.objects.create(user=user, key='new', fingerprint='f')
+
+		call_command('purge_idempotency_keys', stdout=StringIO())
+
+		self.assertEqual(
+			list(IdempotencyKey.objects.values_list('key', flat=True)),
+			['new']
+		)
+
+	def test_archive_orders(self):
+		"""Test only old delivered and cancelled orders are archived"""
+
+		user = get_user_model().objects.create_user(
+			email='johnny@andela.com',
+			password='password'
+		)
+		pizza = Pizza.objects.create(flavour='Vegan', prices={'S': 10.00})
+		orders = {status: Order.objects.create(customer=user,
+					pizza_flavour=pizza, status=status, quantity=2)
+			for status in (Order.DELIVERED, Order.CANCELLED, Order.PENDING)}
+		recent = Order.objects.create(customer=user, pizza_flavour=pizza,
+					status=Order.DELIVERED)
+		Order.objects.exclude(pk=recent.pk).update(
+			created_at=recent.created_at - timedelta(days=100)
+		)
+		rollups.rebuild()
+		totals = list(OrderRollup.objects.values_list(
+			'day', 'status', 'orders', 'quantity', 'revenue'
+		).order_by('day', 'status'))
+
+		call_command('archive_orders', days=90, batch_size=1,
+					stdout=StringIO())
+
+		self.assertEqual(
+			set(Order.objects.values_list('pk', flat=True)),
+			{orders[Order.PENDING].pk, recent.pk}
+		)
+		archived = ArchivedOrder.objects.get(pk=orders[Order.DELIVERED].pk)
+		self.assertEqual(str(archived.total_price), '20.00')
+		self.assertEqual(archived.customer, user)
+		self.assertTrue(
+			ArchivedOrder.objects.filter(pk=orders[Order.CANCELLED].pk)
+			.exists()
+		)
+
+		rollups.rebuild()
+		self.assertEqual(list(OrderRollup.objects.values_list(
+			'day', 'status', 'orders', 'quantity', 'revenue'
+		).order_by('day', 'status')), totals)
+
+	def seed_data(self, **options):
+		call_command('seed_data', users=20, pizzas=3, orders=500,
+					batch_size=150, workers=1, end='2026-01-31',
+					stdout=StringIO(), **options)
+
+		return list(Order.objects.order_by('uuid').values_list(
+			'uuid', 'customer__email', 'pizza_flavour__flavour', 'size',
+			'quantity', 'status', 'total_price', 'created_at'
+		))
+
+	def test_seed_data(self):
+		"""Test seeded orders are priced and counted in the rollups"""
+
+		self.seed_data()
+
+		self.assertEqual(get_user_model().objects.count(), 20)
+		self.assertEqual(Pizza.objects.count(), 3)
+		self.assertEqual(Order.objects.count(), 500)
+		self.assertFalse(Order.objects.filter(total_price=None).exists())
+		self.assertEqual(
+			OrderRollup.objects.aggregate(orders=Sum('orders'))['orders'],
+			500
+		)
+		self.assertEqual(
+			Order.objects.latest('created_at').created_at.date().isoformat(),
+			'2026-01-31'
+		)
+
+	def test_seed_data_is_deterministic(self):
+		"""Test the same seed generates the same rows"""
+
+		seeded = self.seed_data(seed=7)
+		Order.objects.all().delete()
+		get_user_model().objects.all().delete()
+		Pizza.objects.all().delete()
+
+		self.assertEqual(self.seed_data(seed=7), seeded)
+		with self.assertRaises(CommandError):
+			self.seed_data(seed=7)
@@ -0,0 +1,123 @@
+import psycopg2
+from django.db import connection
+from django.test import TestCase
+
+from core.db.backends.postgresql.base import DatabaseWrapper
+from core.db.pool import ConnectionPool, close_pools
+
+
+def terminate(conn):
+	"""Close the server side of a psycopg2 connection"""
+	with connection.cursor() as cursor:
+		cursor.execute('SELECT pg_terminate_backend(%s)',
+					[conn.get_backend_pid()])
+
+
+class ConnectionPoolTests(TestCase):
+	"""Test the connection pool"""
+
+	def setUp(self):
+		params = connection.get_connection_params()
+		self.connect = lambda: psycopg2.connect(**params)
+		self.pool = ConnectionPool(size=2, timeout=0)
+
+	def tearDown(self):
+		self.pool.close()
+
+	def test_connections_are_reused(self):
+		"""Test a released connection is handed out again"""
+
+		conn = self.pool.acquire(self.connect)
+		self.pool.release(conn)
+
+		self.assertIs(self.pool.acquire(self.connect), conn)
+
+	def test_pool_size_is_bounded(self):
+		"""Test no more than `size` connections are handed out"""
+
+		first = self.pool.acquire(self.connect)
+		self.pool.acquire(self.connect)
+
+		with self.assertRaises(psycopg2.OperationalError):
+			self.pool.acquire(self.connect)
+
+		self.pool.release(first)
+		self.assertIs(self.pool.acquire(self.connect), first)
+
+	def test_release_rolls_back(self):
+		"""Test open transactions are rolled back on release"""
+
+		conn = self.pool.acquire(self.connect)
+		with conn.cursor() as cursor:
+			cursor.execute('SELECT 1')
+		self.pool.release(conn)
+
+		self.assertEqual(conn.get_transaction_status(),
+						psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+		self.assertEqual(self.pool.idle, 1)
+
+	def test_max_lifetime(self):
+		"""Test connections older than their lifetime are closed"""
+
+		pool = ConnectionPool(size=1, timeout=0, max_lifetime=0)
+		conn = pool.acquire(self.connect)
+		pool.release(conn)
+
+		self.assertTrue(conn.closed)
+		self.assertEqual(pool.idle, 0)
+
+	def test_health_check(self):
+		"""Test checked connections closed by the server are replaced"""
+
+		conn = self.pool.acquire(self.connect)
+		self.pool.release(conn)
+		terminate(conn)
+
+		fresh = self.pool.acquire(self.connect, check=True)
+
+		self.assertIsNot(fresh, conn)
+		with fresh.cursor() as cursor:
+			cursor.execute('SELECT 1')
+		self.pool.release(fresh)
+
+
+class DatabaseWrapperTests(TestCase):
+	"""Test the persistent and pooled connection modes"""
+
+	def wrapper(self, **settings):
+		return DatabaseWrapper(dict(connection.settings_dict, **settings))
+
+	def tearDown(self):
+		close_pools()
+
+	def test_persistent_connection_health_check(self):
+		"""Test a persistent connection closed by the server is reopened"""
+
+		db = self.wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+		db.ensure_connection()
+		terminate(db.connection)
+
+		# As at the start of a request
+		db.close_if_unusable_or_obsolete()
+		with db.cursor() as cursor:
+			cursor.execute('SELECT 1')
+			self.assertEqual(cursor.fetchone(), (1,))
+		db.close()
+
+	def test_pooled_connections_are_shared(self):
+		"""Test closing a pooled connection hands it to the next wrapper"""
+
+		first = self.wrapper(POOL_SIZE=1, POOL_TIMEOUT=0)
+		second = self.wrapper(POOL_SIZE=1, POOL_TIMEOUT=0)
+		first.ensure_connection()
+		conn = first.connection
+
+		with self.assertRaises(psycopg2.OperationalError):
+			second.get_new_connection(second.get_connection_params())
+
+		first.close()
+		second.ensure_connection()
+
+		self.assertIs(second.connection, conn)
+		self.assertFalse(conn.closed)
+		second.close()
@@ -0,0 +1,93 @@
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import authenticate, get_user_model
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import hashers
+
+
+TOKEN_URL = reverse('user:token')
+
+
+class PasswordHashingTests(TestCase):
+	"""Test the password hashing policy and login rehashing"""
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(
+			email='johnny@andela.com',
+			password='password'
+		)
+		self.client = APIClient()
+
+	def login(self, password='password'):
+		return self.client.post(TOKEN_URL, {'email': self.user.email,
+											'password': password})
+
+	def test_new_password_uses_argon2(self):
+		"""Test new passwords are hashed with the configured Argon2 costs"""
+
+		self.assertTrue(self.user.password.startswith('argon2$'))
+		self.assertIn('m=19456,t=2,p=1', self.user.password)
+
+	def test_login_rehashes_old_hasher(self):
+		"""Test a PBKDF2 password is moved to Argon2 on login"""
+
+		self.user.password = make_password('password', hasher='pbkdf2_sha256')
+		self.user.save()
+
+		res = self.login()
+
+		self.user.refresh_from_db()
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertTrue(self.user.password.startswith('argon2$'))
+		self.assertTrue(self.user.check_password('password'))
+
+	def test_login_rehashes_changed_costs(self):
+		"""Test changing the Argon2 costs rehashes passwords on login"""
+
+		with override_settings(ARGON2_TIME_COST=3):
+			res = self.login()
+
+		self.user.refresh_from_db()
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertIn('t=3', self.user.password)
+
+	def test_wrong_password_is_not_rehashed(self):
+		"""Test a failed login leaves the stored hash alone"""
+
+		encoded = make_password('password', hasher='pbkdf2_sha256')
+		self.user.password = encoded
+		self.user.save()
+
+		res = self.login('wrong')
+
+		self.user.refresh_from_db()
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(self.user.password, encoded)
+
+	def test_unknown_user(self):
+		"""Test an unknown email cannot log in"""
+
+		self.assertIsNone(
+			authenticate(username='nobody@andela.com', password='password')
+		)
+
+	@override_settings(PASSWORD_VERIFY_PROCESSES=1)
+	def test_verify_in_process_pool(self):
+		"""Test passwords can be verified in the process pool"""
+
+		hashers._pool = None
+		try:
+			self.assertEqual(
+				authenticate(username=self.user.email, password='password'),
+				self.user
+			)
+			self.assertIsNotNone(hashers._pool)
+			self.assertIsNone(
+				authenticate(username=self.user.email, password='wrong')
+			)
+		finally:
+			hashers._pool.shutdown()
+			hashers._pool = None
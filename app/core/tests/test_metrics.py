@@ -0,0 +1,130 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import metrics
+from core.models import Pizza, Order
+from pizza.cache import menu_cache
+
+
+METRICS_URL = reverse('metrics')
+ORDER_URL = reverse('order:order-list')
+
+
+class HistogramTests(TestCase):
+	"""Test the in-memory metrics"""
+
+	def test_histogram_buckets_are_cumulative(self):
+		"""Test observations are rendered as cumulative buckets"""
+
+		histogram = metrics.Histogram('test_seconds', 'Test', ('view',),
+									buckets=(0.1, 1))
+		for value in (0.05, 0.5, 5):
+			histogram.observe(value, 'A')
+
+		self.assertEqual(list(histogram.samples()), [
+			('test_seconds_bucket', '{view="A",le="0.1"}', 1),
+			('test_seconds_bucket', '{view="A",le="1.0"}', 2),
+			('test_seconds_bucket', '{view="A",le="+Inf"}', 3),
+			('test_seconds_sum', '{view="A"}', 5.55),
+			('test_seconds_count', '{view="A"}', 3),
+		])
+
+
+class MetricsMiddlewareTests(TestCase):
+	"""Test requests are measured by view"""
+
+	def setUp(self):
+		menu_cache.clear()
+		self.admin = get_user_model().objects.create_superuser(
+			'admin@andela.com',
+			'password'
+		)
+		self.user = get_user_model().objects.create_user(
+			email='johnny@andela.com',
+			password='password'
+		)
+		self.pizza = Pizza.objects.create(flavour='Vegan',
+										prices={"S": 10.00})
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def test_request_metrics_by_view(self):
+		"""Test wall, db and serializer time are recorded per view"""
+
+		Order.objects.create(customer=self.user, pizza_flavour=self.pizza)
+		labels = ('OrderViewSet.list', 'GET')
+		requests = metrics.REQUEST_DURATION.get_count(*labels)
+		serialized = metrics.SERIALIZER_DURATION.get_count(*labels)
+
+		self.client.get(ORDER_URL)
+
+		self.assertEqual(metrics.REQUEST_DURATION.get_count(*labels),
+						requests + 1)
+		self.assertEqual(metrics.SERIALIZER_DURATION.get_count(*labels),
+						serialized + 1)
+		self.assertGreaterEqual(
+			metrics.REQUESTS.get('OrderViewSet.list', 'GET', '200'), 1
+		)
+
+	def test_metrics_endpoint(self):
+		"""Test admins can read the metrics in the Prometheus format"""
+
+		self.client.get(ORDER_URL)
+		self.client.force_authenticate(self.admin)
+
+		res = self.client.get(METRICS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertTrue(res['Content-Type'].startswith('text/plain'))
+		self.assertIn(
+			b'db_queries_per_request_count{view="OrderViewSet.list",'
+			b'method="GET"}',
+			res.content
+		)
+		self.assertIn(b'# TYPE http_request_duration_seconds histogram',
+					res.content)
+
+	def test_metrics_admin_only(self):
+		"""Test non-admin users cannot read the metrics"""
+
+		res = self.client.get(METRICS_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+	@override_settings(METRICS_SLOW_QUERY_MS=0)
+	def test_slow_queries_are_reported(self):
+		"""Test queries over the threshold are counted and logged"""
+
+		slow = metrics.SLOW_QUERIES.get('OrderViewSet.list')
+
+		with self.assertLogs('core.metrics', 'WARNING') as logs:
+			self.client.get(ORDER_URL)
+
+		self.assertGreater(metrics.SLOW_QUERIES.get('OrderViewSet.list'),
+						slow)
+		self.assertIn('Slow query in OrderViewSet.list', logs.output[0])
+
+	@override_settings(METRICS_REPEATED_QUERY_THRESHOLD=3)
+	def test_repeated_queries_are_reported(self):
+		"""Test one query run once per row is reported as N+1"""
+
+		request_metrics = metrics.RequestMetrics()
+		request_metrics.view = 'TestView'
+		repeated = metrics.REPEATED_QUERIES.get('TestView')
+
+		with connection.execute_wrapper(request_metrics):
+			for pizza in Pizza.objects.all()[:1]:
+				for _ in range(3):
+					Order.objects.filter(pizza_flavour=pizza).count()
+
+		with self.assertLogs('core.metrics', 'WARNING') as logs:
+			request_metrics.record('GET', 200, 0.1)
+
+		self.assertEqual(request_metrics.queries, 4)
+		self.assertEqual(metrics.REPEATED_QUERIES.get('TestView'),
+						repeated + 1)
+		self.assertIn('Query repeated 3 times in TestView', logs.output[0])
@@ -0,0 +1,109 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Pizza, Order
+from core.pagination import KeysetPagination
+
+
+ORDER_URL = reverse('order:order-list')
+ADMIN_ORDER_URL = reverse('order:adminOrders-list')
+
+
+class KeysetPaginationTests(TestCase):
+	"""Test cursor pagination of the list endpoints"""
+
+	def setUp(self):
+		self.user = get_user_model().objects.create_superuser(
+			'admin@andela.com',
+			'password'
+		)
+		self.pizza = Pizza.objects.create(
+			flavour='Vegan',
+			prices={"S": 10.00, "M": 15.00, "L": 20.00}
+		)
+		self.orders = [
+			Order.objects.create(customer=self.user, pizza_flavour=self.pizza)
+			for _ in range(7)
+		]
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def walk(self, url, **params):
+		"""Follow next links from `url` and return the ids of every page"""
+		pages = []
+		res = self.client.get(url, params)
+
+		while True:
+			self.assertEqual(res.status_code, status.HTTP_200_OK)
+			pages.append([row['id'] for row in res.data['results']])
+			if res.data['next'] is None:
+				return pages
+			res = self.client.get(res.data['next'])
+
+	def test_pages_are_newest_first_and_complete(self):
+		"""Test walking all pages returns every order once, newest first"""
+
+		pages = self.walk(ORDER_URL, page_size=3)
+
+		expected = list(Order.objects.order_by('-created_at', '-uuid')
+						.values_list('uuid', flat=True))
+		self.assertEqual([len(page) for page in pages], [3, 3, 1])
+		self.assertEqual(sum(pages, []), expected)
+
+	def test_stable_order_for_equal_timestamps(self):
+		"""Test rows sharing a created_at are split by uuid without gaps"""
+
+		Order.objects.update(created_at=self.orders[0].created_at)
+
+		pages = self.walk(ADMIN_ORDER_URL, page_size=2)
+
+		ids = sum(pages, [])
+		self.assertEqual(len(ids), len(self.orders))
+		self.assertEqual(ids, sorted(ids, reverse=True))
+
+	def test_previous_link(self):
+		"""Test the previous link returns the page before the cursor"""
+
+		first = self.client.get(ORDER_URL, {'page_size': 3})
+		second = self.client.get(first.data['next'])
+		back = self.client.get(second.data['previous'])
+
+		self.assertIsNone(first.data['previous'])
+		self.assertEqual(back.data['results'], first.data['results'])
+		self.assertIsNone(back.data['previous'])
+		self.assertEqual(back.data['next'], first.data['next'])
+
+	def test_deep_page_query_count(self):
+		"""Test a page deep into the list costs the same as the first"""
+
+		first = self.client.get(ORDER_URL, {'page_size': 1})
+		url = first.data['next']
+		for _ in range(4):
+			url = self.client.get(url).data['next']
+
+		with self.assertNumQueries(2):
+			res = self.client.get(url)
+
+		self.assertEqual(len(res.data['results']), 1)
+
+	def test_page_size_is_capped(self):
+		"""Test the page size is limited to the maximum allowed"""
+
+		with mock.patch.object(KeysetPagination, 'max_page_size', 5):
+			res = self.client.get(ORDER_URL, {'page_size': 100000})
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(len(res.data['results']), 5)
+		self.assertIsNotNone(res.data['next'])
+
+	def test_invalid_cursor(self):
+		"""Test a tampered cursor is rejected"""
+
+		res = self.client.get(ORDER_URL, {'cursor': 'not-a-cursor'})
+
+		self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
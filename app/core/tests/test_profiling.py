@@ -0,0 +1,145 @@
+import os
+import pstats
+import tempfile
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.middleware import ProfilingMiddleware
+from core.models import Pizza
+from core.profiling import StackSampler
+from pizza.cache import menu_cache
+
+
+PIZZAS_URL = reverse('pizza:pizza-list')
+
+
+class StackSamplerTests(TestCase):
+	"""Test the stack sampling profiler"""
+
+	def busy(self, seconds):
+		deadline = time.perf_counter() + seconds
+		while time.perf_counter() < deadline:
+			pass
+
+	def test_collapsed_stacks(self):
+		"""Test sampled stacks are saved one line per stack with counts"""
+
+		sampler = StackSampler(interval=1)
+		sampler.start()
+		self.busy(0.1)
+		sampler.stop()
+
+		with tempfile.TemporaryDirectory() as profile_dir:
+			path = os.path.join(profile_dir, 'profile.collapsed')
+			sampler.save(path)
+			with open(path) as profile:
+				lines = profile.read().splitlines()
+
+		self.assertTrue(lines)
+		stack, count = lines[0].rsplit(' ', 1)
+		self.assertGreater(int(count), 0)
+		self.assertIn('busy (', stack.split(';')[-1])
+
+
+class ProfilingMiddlewareTests(TestCase):
+	"""Test requests are profiled on demand"""
+
+	def setUp(self):
+		menu_cache.clear()
+		self.profile_dir = tempfile.TemporaryDirectory()
+		self.settings = override_settings(PROFILE_DIR=self.profile_dir.name)
+		self.settings.enable()
+		self.admin = get_user_model().objects.create_superuser(
+			'admin@andela.com',
+			'password'
+		)
+		self.user = get_user_model().objects.create_user(
+			email='johnny@andela.com',
+			password='password'
+		)
+		Pizza.objects.create(flavour='Vegan', prices={"S": 10.00})
+		self.client = APIClient()
+
+	def tearDown(self):
+		self.settings.disable()
+		self.profile_dir.cleanup()
+
+	def authenticate(self, user):
+		token = Token.objects.create(user=user)
+		self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+	def profiles(self):
+		return os.listdir(self.profile_dir.name)
+
+	def test_admin_cprofile(self):
+		"""Test admins get a pstats profile of their request"""
+
+		self.authenticate(self.admin)
+
+		res = self.client.get(PIZZAS_URL, HTTP_X_PROFILE='cprofile')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(self.profiles(), [res['X-Profile']])
+		self.assertIn('-PizzaViewSet.list-', res['X-Profile'])
+		self.assertTrue(res['X-Profile'].endswith('.pstats'))
+		stats = pstats.Stats(
+			os.path.join(self.profile_dir.name, res['X-Profile'])
+		)
+		self.assertGreater(stats.total_calls, 0)
+
+	def test_admin_stacks(self):
+		"""Test admins can ask for a collapsed stacks profile"""
+
+		self.authenticate(self.admin)
+
+		res = self.client.get(PIZZAS_URL, HTTP_X_PROFILE='stacks')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertTrue(res['X-Profile'].endswith('.collapsed'))
+		self.assertEqual(self.profiles(), [res['X-Profile']])
+
+	def test_user_cannot_profile(self):
+		"""Test the profile header is ignored for non-admin users"""
+
+		self.authenticate(self.user)
+
+		res = self.client.get(PIZZAS_URL, HTTP_X_PROFILE='cprofile')
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertNotIn('X-Profile', res)
+		self.assertEqual(self.profiles(), [])
+
+	def test_requests_not_profiled_by_default(self):
+		"""Test requests are not profiled without a header or sampling"""
+
+		self.authenticate(self.user)
+
+		self.client.get(PIZZAS_URL)
+
+		self.assertEqual(self.profiles(), [])
+
+	@override_settings(PROFILE_SAMPLE_RATE=1, PROFILE_MODE='cprofile')
+	def test_sampled_requests(self):
+		"""Test sampled requests are profiled without telling the client"""
+
+		self.authenticate(self.user)
+
+		res = self.client.get(PIZZAS_URL)
+
+		self.assertNotIn('X-Profile', res)
+		self.assertEqual(len(self.profiles()), 1)
+		self.assertTrue(self.profiles()[0].endswith('.pstats'))
+
+	@override_settings(PROFILE_MODE='yappi')
+	def test_unknown_profile_mode(self):
+		"""Test an unknown PROFILE_MODE is refused on startup"""
+
+		with self.assertRaises(ImproperlyConfigured):
+			ProfilingMiddleware(lambda request: None)
@@ -0,0 +1,152 @@
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase, \
+	override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db import routers
+from core.models import Order, Pizza
+from pizza.cache import menu_cache
+
+
+ORDER_URL = reverse('order:order-list')
+PIZZAS_URL = reverse('pizza:pizza-list')
+
+
+class ReplicaMigrationTests(SimpleTestCase):
+	"""Test migrations only run on the primary"""
+
+	@override_settings(DATABASE_REPLICAS=['replica1'])
+	def test_allow_migrate(self):
+		"""Test replicas are left to replication"""
+
+		router = routers.ReplicaRouter()
+
+		self.assertTrue(router.allow_migrate('default', 'core'))
+		self.assertFalse(router.allow_migrate('replica1', 'core'))
+
+@skipIf(settings.DATABASE_REPLICAS,
+		'replica1 mirrors the test database when DB_REPLICA_HOSTS is set')
+@override_settings(DATABASE_REPLICAS=['replica1'], DB_REPLICA_LAG_INTERVAL=0)
+class ReplicaRouterTests(TransactionTestCase):
+	"""Test listings read from the replica, an unreplicated second database"""
+
+	databases = {'default', 'replica1'}
+
+	def setUp(self):
+		caches['replicas'].clear()
+		routers.replica_lag.clear()
+		self.user = get_user_model().objects.create_user(
+			email='johnny@andela.com',
+			password='password'
+		)
+		self.pizza = Pizza.objects.create(
+			flavour='Vegan',
+			prices={"S": 10.00, "M": 15.00, "L": 20.00}
+		)
+		self.order = Order.objects.create(customer=self.user,
+					pizza_flavour=self.pizza)
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		# Let the writes above leave the sticky window
+		menu_cache.clear()
+		caches['replicas'].clear()
+
+	def test_list_reads_replica(self):
+		"""Test the order list is read from the replica"""
+
+		res = self.client.get(ORDER_URL)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(res.data['results'], [])
+
+	def test_retrieve_reads_primary(self):
+		"""Test other actions keep reading from the primary"""
+
+		res = self.client.get(
+			reverse('order:order-detail', args=[self.order.uuid])
+		)
+
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+	def test_write_sticks_user_to_primary(self):
+		"""Test a user reads their own writes from the primary"""
+
+		res = self.client.post(ORDER_URL, {'pizza_flavour': 'Vegan'})
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+		res = self.client.get(ORDER_URL)
+		self.assertEqual(len(res.data['results']), 2)
+
+		other = APIClient()
+		other.force_authenticate(get_user_model().objects.create_user(
+			email='jane@andela.com',
+			password='password'
+		))
+		res = other.get(ORDER_URL)
+		self.assertEqual(res.data['results'], [])
+
+	def test_lagging_replica_falls_back_to_primary(self):
+		"""Test replicas too far behind the primary are skipped"""
+
+		with mock.patch.object(routers.ReplicaLag, 'measure',
+					return_value=60.0):
+			res = self.client.get(ORDER_URL)
+
+		self.assertEqual(len(res.data['results']), 1)
+
+	def test_unreachable_replica_falls_back_to_primary(self):
+		"""Test replicas of unknown lag are skipped"""
+
+		with mock.patch.object(routers.ReplicaLag, 'measure',
+					return_value=None):
+			res = self.client.get(ORDER_URL)
+
+		self.assertEqual(len(res.data['results']), 1)
+
+	def test_measure_lag(self):
+		"""Test a database that is not replicating has no lag"""
+
+		self.assertEqual(routers.replica_lag.measure('replica1'), 0)
+
+	def test_menu_change_reloads_from_primary(self):
+		"""Test the menu is reloaded from the primary after a change"""
+
+		Pizza.objects.create(flavour='Hawaiian', prices={"S": 12.00})
+		res = self.client.get(PIZZAS_URL)
+
+		self.assertEqual(len(res.data['results']), 2)
+
+		caches['replicas'].clear()
+		menu_cache.local.clear()
+		caches['menu'].clear()
+		res = self.client.get(PIZZAS_URL)
+
+		self.assertEqual(res.data['results'], [])
+
+	def test_transactions_read_primary(self):
+		"""Test reads inside a transaction stay on the primary"""
+
+		router = routers.ReplicaRouter()
+		routers.use_replicas()
+
+		try:
+			self.assertEqual(router.db_for_read(Order), 'replica1')
+			with transaction.atomic():
+				self.assertEqual(router.db_for_read(Order), 'default')
+		finally:
+			routers.use_primary()
+
+	@override_settings(DATABASE_REPLICAS=[])
+	def test_no_replicas(self):
+		"""Test reads stay on the primary without replicas"""
+
+		self.assertFalse(routers.use_replicas())
+		self.assertEqual(routers.ReplicaRouter().db_for_read(Order),
+					'default')
@@ -0,0 +1,153 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+
+calls = []
+
+
+@tasks.task('tests.record')
+def record(**kwargs):
+	calls.append(kwargs)
+
+
+@tasks.task('tests.fail', max_attempts=2)
+def fail():
+	raise ValueError('task failed')
+
+
+@tasks.task('tests.reclaimed')
+def reclaimed():
+	# Another worker claims the task again while this one still runs it
+	Task.objects.update(locked_at=timezone.now() + timedelta(seconds=1))
+	raise ValueError('task failed')
+
+
+class TaskTests(TestCase):
+	"""Test queueing, claiming and running tasks"""
+
+	def setUp(self):
+		calls.clear()
+
+	def test_run_task(self):
+		"""Test a due task is claimed, run with its kwargs and deleted"""
+
+		task = tasks.enqueue('tests.record', {'value': 1})
+
+		self.assertEqual(tasks.claim(10, 300), [task.pk])
+		self.assertEqual(tasks.claim(10, 300), [])
+		self.assertTrue(tasks.run(task.pk))
+		self.assertEqual(calls, [{'value': 1}])
+		self.assertFalse(Task.objects.exists())
+
+	def test_delayed_task_is_not_claimed(self):
+		"""Test tasks are only claimed once they are due"""
+
+		tasks.enqueue('tests.record', delay=60)
+
+		self.assertEqual(tasks.claim(10, 300), [])
+
+	@override_settings(TASK_RETRY_DELAY=10)
+	def test_failed_task_is_retried(self):
+		"""Test a failed task is retried later until its last attempt"""
+
+		task = tasks.enqueue('tests.fail')
+		tasks.claim(10, 300)
+
+		self.assertFalse(tasks.run(task.pk))
+		task.refresh_from_db()
+		self.assertEqual(task.status, Task.QUEUED)
+		self.assertEqual(task.attempts, 1)
+		self.assertGreaterEqual(task.run_at,
+					timezone.now() + timedelta(seconds=9))
+		self.assertIn('task failed', task.last_error)
+		self.assertEqual(tasks.claim(10, 300), [])
+
+		Task.objects.update(run_at=timezone.now())
+		tasks.claim(10, 300)
+		self.assertFalse(tasks.run(task.pk))
+		task.refresh_from_db()
+		self.assertEqual(task.status, Task.FAILED)
+		self.assertEqual(task.attempts, 2)
+
+	def test_stale_task_is_claimed_again(self):
+		"""Test a task left running by a stopped worker runs again"""
+
+		task = tasks.enqueue('tests.record')
+		tasks.claim(10, 300)
+		Task.objects.update(locked_at=timezone.now() - timedelta(minutes=10))
+
+		self.assertEqual(tasks.claim(10, 300), [task.pk])
+		task.refresh_from_db()
+		self.assertEqual(task.attempts, 2)
+
+	def test_stale_task_on_last_attempt_fails(self):
+		"""Test a task that stopped its worker on every attempt gives up"""
+
+		task = tasks.enqueue('tests.fail')
+		tasks.claim(10, 300)
+		Task.objects.update(attempts=2,
+							locked_at=timezone.now() - timedelta(minutes=10))
+
+		self.assertEqual(tasks.claim(10, 300), [])
+		task.refresh_from_db()
+		self.assertEqual(task.status, Task.FAILED)
+		self.assertEqual(task.attempts, 2)
+		self.assertIn('Timed out', task.last_error)
+
+	def test_failure_after_new_claim_is_ignored(self):
+		"""Test a worker finishing late does not undo another one's claim"""
+
+		task = tasks.enqueue('tests.reclaimed')
+		tasks.claim(10, 300)
+
+		self.assertFalse(tasks.run(task.pk))
+		task.refresh_from_db()
+		self.assertEqual(task.status, Task.RUNNING)
+		self.assertEqual(task.last_error, '')
+
+	@override_settings(TASK_RETRY_DELAY=10, TASK_RETRY_MAX_DELAY=60)
+	def test_backoff(self):
+		"""Test retries wait twice as long each time, up to a maximum"""
+
+		self.assertTrue(10 <= tasks.backoff(1) <= 15)
+		self.assertTrue(40 <= tasks.backoff(3) <= 60)
+		self.assertTrue(60 <= tasks.backoff(10) <= 90)
+
+
+class RunTasksCommandTests(TransactionTestCase):
+	"""Test the run_tasks worker"""
+
+	def run_tasks(self, processes):
+		succeeded = tasks.enqueue_many('tests.record', [{}, {}])
+		failed = tasks.enqueue('tests.fail')
+
+		call_command('run_tasks', processes=processes, once=True,
+					stdout=StringIO())
+
+		self.assertFalse(
+			Task.objects.filter(pk__in=[task.pk for task in succeeded])
+			.exists()
+		)
+		failed.refresh_from_db()
+		self.assertEqual(failed.status, Task.QUEUED)
+		self.assertEqual(failed.attempts, 1)
+
+	def test_run_tasks_in_process(self):
+		"""Test tasks are run in the command's process"""
+
+		calls.clear()
+		self.run_tasks(processes=1)
+
+		self.assertEqual(calls, [{}, {}])
+
+	def test_run_tasks_in_pool(self):
+		"""Test tasks are run by a pool of processes"""
+
+		self.run_tasks(processes=2)
@@ -0,0 +1,78 @@
+from django.http import HttpResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication
+from core.db import routers
+from core.metrics import registry
+
+
+class MetricsView(APIView):
+    """Expose the request metrics of this process to Prometheus"""
+
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        """Return the metrics in the Prometheus text format for admins only"""
+
+        if not request.user.is_staff:
+            raise ValidationError({
+                'message': 'Permission Denied'
+            })
+
+        return HttpResponse(registry.render(),
+                            content_type=registry.content_type)
+
+
+class ValuesListMixin:
+    """List with a ValuesSerializer reading `.values()` rows
+
+    Listing skips model instances and DRF fields altogether; the other
+    actions keep using `serializer_class`. `list_serializer_class` must
+    produce the same output as `serializer_class`.
+    """
+
+    list_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.list_serializer_class
+        rows = self.filter_queryset(self.get_queryset()) \
+            .values(*serializer_class.columns)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer_class(page, many=True).data
+            )
+
+        return Response(serializer_class(rows, many=True).data)
+
+
+class ReplicaReadMixin:
+    """Read the data of `replica_actions` from a read replica
+
+    The queries of the view run on a replica once the user is
+    authenticated, except for a while after the user last wrote through
+    a view with this mixin, so they always read their own writes. Views
+    without actions read from a replica on every safe request.
+    """
+
+    replica_actions = ('list',)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        if request.method not in SAFE_METHODS:
+            routers.stick(routers.user_key(request.user))
+        elif getattr(self, 'action', None) in self.replica_actions or \
+                not hasattr(self, 'action'):
+            routers.use_replicas(routers.user_key(request.user))
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            routers.use_primary()
@@ -0,0 +1,149 @@
+import json
+import queue
+import threading
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework.fields import DateTimeField
+from rest_framework.renderers import BaseRenderer
+
+from core.models import Order
+
+
+# Statuses an order never leaves, shown as in the order API
+FINAL_STATUSES = {label for code, label in Order.STATUS_CHOICES
+                  if code not in Order.STATUS_TRANSITIONS}
+
+
+class BaseBroker:
+    """Interface of the pub/sub brokers delivering order events
+
+    `subscribe` returns a subscription with `get(timeout)`, returning the
+    next message or None once `timeout` seconds pass, and `close()`.
+    """
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+
+class LocalSubscription:
+    """Subscription to a LocalBroker channel, buffering unread messages"""
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.messages = queue.Queue()
+
+    def get(self, timeout=None):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker(BaseBroker):
+    """In-process broker, only reaching subscribers of the same process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._channels.get(channel, ()))
+
+        for subscription in subscriptions:
+            subscription.messages.put(message)
+
+        return len(subscriptions)
+
+    def subscribe(self, channel):
+        subscription = LocalSubscription(self, channel)
+
+        with self._lock:
+            self._channels[channel].add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._channels.get(subscription.channel, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._channels.pop(subscription.channel, None)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the broker named by the ORDER_EVENTS_BROKER setting"""
+    global _broker
+
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.ORDER_EVENTS_BROKER)()
+
+    return _broker
+
+
+def order_channel(order_uuid):
+    return 'order:{}'.format(order_uuid)
+
+
+def order_event(order_uuid, order_status, size, quantity, total_price,
+                updated_at):
+    """Return the event sent to subscribers when an order changes"""
+    return {
+        'id': str(order_uuid),
+        'status': dict(Order.STATUS_CHOICES).get(order_status, order_status),
+        'size': size,
+        'quantity': quantity,
+        'total_price': None if total_price is None else str(total_price),
+        'updated_at': DateTimeField().to_representation(updated_at),
+    }
+
+
+def publish_order(order_uuid, *args):
+    """Publish an order event once the current transaction commits"""
+    transaction.on_commit(partial(
+        get_broker().publish, order_channel(order_uuid),
+        order_event(order_uuid, *args)
+    ))
+
+
+def format_event(data, event='order', event_id=None):
+    """Return `data` as a Server-Sent Events message"""
+    lines = []
+
+    if event_id is not None:
+        lines.append('id: {}'.format(event_id))
+
+    lines.append('event: {}'.format(event))
+    lines.append('data: {}'.format(json.dumps(data, separators=(',', ':'))))
+    return '\n'.join(lines) + '\n\n'
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Renderer accepting text/event-stream, sending errors as an event"""
+
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return format_event(data, event='error').encode(self.charset)
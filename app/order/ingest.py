@@ -0,0 +1,196 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, connection, transaction
+
+from analytics.rollups import record_orders
+from core.models import Order
+from order.tasks import queue_created
+
+
+def encode(value):
+    """Encode uuids, decimals and datetimes without losing precision"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    return str(value)
+
+
+class OrderQueue:
+    """Durable queue of new orders kept in a local SQLite database
+
+    Web processes append orders and drain_order_queue removes them once
+    they are inserted into the orders table. Appends are synced to disk
+    before they return, so queued orders survive a crash. Orders that
+    cannot be inserted are moved to the `failed` table with the error.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        """Return this thread's connection, creating the queue if needed"""
+        conn = getattr(self._local, 'connection', None)
+
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            with conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS orders ('
+                             'id INTEGER PRIMARY KEY AUTOINCREMENT,'
+                             ' payload TEXT NOT NULL)')
+                conn.execute('CREATE TABLE IF NOT EXISTS failed ('
+                             'id INTEGER PRIMARY KEY, payload TEXT NOT NULL,'
+                             ' error TEXT NOT NULL)')
+            self._local.connection = conn
+
+        return conn
+
+    def put(self, order):
+        """Append an unsaved order to the queue"""
+        payload = json.dumps({
+            field.attname: getattr(order, field.attname)
+            for field in Order._meta.concrete_fields
+        }, default=encode)
+
+        with self.connection as conn:
+            conn.execute('INSERT INTO orders (payload) VALUES (?)',
+                         (payload,))
+
+    def take(self, limit):
+        """Return up to `limit` (id, order) pairs, oldest first
+
+        Orders stay queued until they are acknowledged.
+        """
+        rows = self.connection.execute(
+            'SELECT id, payload FROM orders ORDER BY id LIMIT ?', (limit,)
+        ).fetchall()
+
+        return [(item_id, self.load(payload)) for item_id, payload in rows]
+
+    def load(self, payload):
+        values = json.loads(payload)
+        order = Order()
+
+        for field in Order._meta.concrete_fields:
+            setattr(order, field.attname,
+                    field.to_python(values[field.attname]))
+
+        return order
+
+    def ack(self, ids):
+        """Remove orders that were inserted from the queue"""
+        with self.connection as conn:
+            conn.executemany('DELETE FROM orders WHERE id = ?',
+                             [(item_id,) for item_id in ids])
+
+    def fail(self, item_id, error):
+        """Move an order that cannot be inserted to the failed table"""
+        with self.connection as conn:
+            conn.execute('INSERT INTO failed (id, payload, error) '
+                         'SELECT id, payload, ? FROM orders WHERE id = ?',
+                         (error, item_id))
+            conn.execute('DELETE FROM orders WHERE id = ?', (item_id,))
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM orders'
+        ).fetchone()[0]
+
+    def failed(self):
+        """Return the (id, order, error) of the orders that failed"""
+        rows = self.connection.execute(
+            'SELECT id, payload, error FROM failed ORDER BY id'
+        ).fetchall()
+
+        return [(item_id, self.load(payload), error)
+                for item_id, payload, error in rows]
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """Return the queue at the ORDER_INGEST_QUEUE_PATH setting"""
+    global _queue
+    path = settings.ORDER_INGEST_QUEUE_PATH
+
+    if _queue is None or _queue.path != path:
+        with _queue_lock:
+            if _queue is None or _queue.path != path:
+                _queue = OrderQueue(path)
+
+    return _queue
+
+
+def insert_orders(orders):
+    """Insert the orders missing from the orders table in one statement
+
+    Orders already inserted, by an earlier drain that stopped before it
+    acknowledged them, are skipped. The new ones are added to the
+    rollups. Returns the uuids of the inserted orders.
+    """
+    fields = Order._meta.concrete_fields
+    columns = ', '.join(connection.ops.quote_name(field.column)
+                        for field in fields)
+    row = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    sql = (
+        'INSERT INTO {table} ({columns}) VALUES {rows} '
+        'ON CONFLICT (uuid) DO NOTHING RETURNING uuid'
+    ).format(table=connection.ops.quote_name(Order._meta.db_table),
+             columns=columns, rows=', '.join([row] * len(orders)))
+    params = [field.get_db_prep_save(getattr(order, field.attname),
+                                     connection)
+              for order in orders for field in fields]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        inserted = {pk for pk, in cursor.fetchall()}
+
+    # Foreign keys are checked at commit, check them before
+    connection.check_constraints()
+
+    record_orders(order for order in orders if order.uuid in inserted)
+    queue_created(inserted)
+    return inserted
+
+
+def drain(queue, batch_size):
+    """Insert the next batch of queued orders in one transaction
+
+    When the batch fails, for example because a pizza was deleted in the
+    meantime, its orders are inserted one at a time and the failing ones
+    moved aside. Returns the number of orders inserted and failed.
+    """
+    items = queue.take(batch_size)
+    inserted = failed = 0
+
+    if not items:
+        return inserted, failed
+
+    try:
+        with transaction.atomic():
+            inserted = len(insert_orders([order for _, order in items]))
+    except (DataError, IntegrityError):
+        for item_id, order in items:
+            try:
+                with transaction.atomic():
+                    inserted += len(insert_orders([order]))
+            except (DataError, IntegrityError) as exc:
+                queue.fail(item_id, str(exc))
+                failed += 1
+
+    queue.ack([item_id for item_id, _ in items])
+    return inserted, failed
@@ -1,8 +1,38 @@
+from decimal import Decimal
+
 from rest_framework import serializers
-from core.models import Order
+from core.metrics import TimedSerializerMixin
+from core.models import Pizza, Order
+from core.serializers import ValuesSerializer
+
+from pizza.cache import menu_cache
+
+
+PRICE_FIELDS = {'pizza_flavour', 'size', 'quantity'}
+
+# Totals from this on do not fit the total_price column
+_total_price_column = Order._meta.get_field('total_price')
+MAX_TOTAL_PRICE = Decimal(10) ** (
+    _total_price_column.max_digits - _total_price_column.decimal_places
+)
+
+
+class MenuPizzaField(serializers.PrimaryKeyRelatedField):
+    """Pizza field resolving uuids from the menu cache"""
 
+    def to_internal_value(self, data):
+        try:
+            pizza = menu_cache.get_pizza(data)
+        except (TypeError, ValueError, AttributeError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
 
-class OrderSerializer(serializers.ModelSerializer):
+        if pizza is None:
+            self.fail('does_not_exist', pk_value=data)
+
+        return pizza
+
+
+class OrderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for the Order model"""
 
     id = serializers.SerializerMethodField('get_id')
@@ -10,6 +40,7 @@ class OrderSerializer(serializers.ModelSerializer):
         max_digits=8, decimal_places=2,
         source='get_total_price', read_only=True
     )
+    pizza_flavour = MenuPizzaField(queryset=Pizza.objects.all())
     status = serializers.SerializerMethodField()
     customer = serializers.SerializerMethodField()
 
@@ -19,6 +50,35 @@ class OrderSerializer(serializers.ModelSerializer):
                   'size', 'quantity', 'status', 'created_at')
         read_only_Fields = ('id', 'status', 'customer', 'created_at')
 
+    def validate(self, attrs):
+        """Price the order when its pizza, size or quantity change"""
+
+        if self.instance is not None and \
+                not PRICE_FIELDS.intersection(attrs):
+            return attrs
+
+        pizza = attrs.get('pizza_flavour',
+                          getattr(self.instance, 'pizza_flavour', None))
+        size = attrs.get('size', getattr(self.instance, 'size', Order.SMALL))
+        quantity = attrs.get('quantity',
+                             getattr(self.instance, 'quantity', 1))
+
+        try:
+            attrs['unit_price'], attrs['total_price'] = Order.price_for(
+                pizza, size, quantity
+            )
+        except (KeyError, TypeError, ValueError, ArithmeticError):
+            raise serializers.ValidationError({
+                'size': 'This pizza has no price for this size.'
+            })
+
+        if attrs['total_price'] >= MAX_TOTAL_PRICE:
+            raise serializers.ValidationError({
+                'quantity': 'The total price of this order is too large.'
+            })
+
+        return attrs
+
     def get_id(self, obj):
         return obj.uuid
 
@@ -28,3 +88,39 @@ class OrderSerializer(serializers.ModelSerializer):
     def get_customer(self, obj):
         return obj.customer.name if obj.customer.name is not None \
             else obj.customer.email
+
+
+STATUS_LABELS = dict(Order.STATUS_CHOICES)
+
+# The fields OrderSerializer formats its values with
+total_price_field = serializers.DecimalField(max_digits=8, decimal_places=2,
+                                             read_only=True)
+created_at_field = serializers.DateTimeField(read_only=True)
+
+
+def order_total_price(total_price, pizza, size, quantity):
+    if total_price is None:
+        price = menu_cache.get_pizza(pizza).prices.get(size)
+        if price is None:
+            return None
+        total_price = price * quantity
+
+    return total_price_field.to_representation(total_price)
+
+
+class OrderValuesSerializer(TimedSerializerMixin, ValuesSerializer):
+    """OrderSerializer output for order listings, from `.values()` rows"""
+
+    fields = (
+        ('id', ('uuid',), None),
+        ('total_price', ('total_price', 'pizza_flavour', 'size', 'quantity'),
+         order_total_price),
+        ('pizza_flavour', ('pizza_flavour',), None),
+        ('customer', ('customer__name', 'customer__email'),
+         lambda name, email: name if name is not None else email),
+        ('size', ('size',), None),
+        ('quantity', ('quantity',), None),
+        ('status', ('status',),
+         lambda status: STATUS_LABELS.get(status, status)),
+        ('created_at', ('created_at',), created_at_field.to_representation),
+    )
@@ -0,0 +1,52 @@
+from django.dispatch import Signal
+
+from core import tasks
+from core.models import Order
+
+
+# Sent by the task worker once an order was created or updated, for work
+# that should not slow down the request. Receivers get the order and are
+# all run again when one of them raises, so they must be safe to repeat.
+# Connect them in an AppConfig.ready() so the web processes see them too:
+# tasks are only queued while a signal has receivers.
+order_created = Signal(providing_args=['order'])
+order_updated = Signal(providing_args=['order'])
+
+
+def send_order_signal(signal, order):
+    instance = Order.objects.select_related('customer', 'pizza_flavour') \
+        .filter(uuid=order).first()
+
+    # The order was deleted or archived in the meantime
+    if instance is None:
+        return
+
+    signal.send(sender=Order, order=instance)
+
+
+@tasks.task('order.created')
+def send_order_created(order):
+    send_order_signal(order_created, order)
+
+
+@tasks.task('order.updated')
+def send_order_updated(order):
+    send_order_signal(order_updated, order)
+
+
+def queue_created(order_uuids):
+    """Queue the order_created signal of new orders"""
+    if not order_created.has_listeners(Order):
+        return
+
+    tasks.enqueue_many('order.created',
+                       [{'order': str(pk)} for pk in order_uuids])
+
+
+def queue_updated(order_uuids):
+    """Queue the order_updated signal of changed orders"""
+    if not order_updated.has_listeners(Order):
+        return
+
+    tasks.enqueue_many('order.updated',
+                       [{'order': str(pk)} for pk in order_uuids])
@@ -1,11 +1,28 @@
-from django.test import TestCase
+import csv
+import json
+import tempfile
+import uuid
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
 from django.contrib.auth import get_user_model
 
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 from rest_framework import status
-from core.models import Pizza, Order
-from order.serializers import OrderSerializer
+from core import tasks
+from core.models import ArchivedOrder, OrderRollup, Pizza, Order, Task
+from order.events import LocalBroker, get_broker
+from order.ingest import drain, get_queue
+from order.serializers import OrderSerializer, OrderValuesSerializer
+from order.tasks import order_created, order_updated
+from pizza.cache import menu_cache
 
 
 ORDER_URL = reverse('order:order-list')
@@ -59,9 +76,9 @@ class PrivateOrderApiTests(TestCase):
 
         res = self.client.get(ORDER_URL)
 
-        serializer = OrderSerializer(orders, many=True)
+        serializer = OrderSerializer(reversed(orders), many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_orders_limited_to_user(self):
         """Test that orders returned are for authenticated user"""
@@ -86,8 +103,9 @@ class PrivateOrderApiTests(TestCase):
         res = self.client.get(ORDER_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['pizza_flavour'], order.pizza_flavour.uuid)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['pizza_flavour'],
+                         order.pizza_flavour.uuid)
 
     def test_create_order_successful(self):
         """Test creating a new Pizza Order"""
@@ -105,6 +123,112 @@ class PrivateOrderApiTests(TestCase):
         ).exists()
         self.assertTrue(exists)
 
+    def test_create_order_stores_price(self):
+        """Test the unit and total price are stored when ordering"""
+
+        pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.50, "L": 20.00}
+        )
+
+        payload = {'pizza_flavour': pizza.flavour, 'size': 'M',
+                   'quantity': 3}
+        res = self.client.post(ORDER_URL, payload)
+
+        order = Order.objects.get(uuid=res.data['id'])
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(str(order.unit_price), '15.50')
+        self.assertEqual(str(order.total_price), '46.50')
+        self.assertEqual(res.data['total_price'], '46.50')
+
+    def test_create_order_without_menu_price(self):
+        """Test ordering a size the pizza has no price for fails"""
+
+        pizza = Pizza.objects.create(flavour='Vegan', prices={"S": 10.00})
+
+        payload = {'pizza_flavour': pizza.flavour, 'size': 'L'}
+        res = self.client.post(ORDER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+
+    def test_create_order_total_too_large(self):
+        """Test an order whose total does not fit the price column fails"""
+
+        Pizza.objects.create(flavour='Vegan', prices={"S": 10.00})
+
+        res = self.client.post(ORDER_URL, {'pizza_flavour': 'Vegan',
+                                           'quantity': 2147483647})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('quantity', res.data)
+        self.assertFalse(Order.objects.exists())
+
+    def test_create_order_non_string_flavour(self):
+        """Test a flavour that is not a string is not found"""
+
+        Pizza.objects.create(flavour='Vegan', prices={"S": 10.00})
+
+        for flavour in (['Vegan'], {'flavour': 'Vegan'}, 1):
+            res = self.client.post(ORDER_URL, {'pizza_flavour': flavour},
+                                   format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.assertFalse(Order.objects.exists())
+
+    def test_order_price_is_frozen(self):
+        """Test menu price changes do not reprice existing orders"""
+
+        pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        order = Order.objects.create(customer=self.user, pizza_flavour=pizza)
+
+        pizza.prices = {"S": 12.00, "M": 17.00, "L": 22.00}
+        pizza.save()
+        self.client.patch(detail_url(order.uuid), {'status': 'I'})
+
+        order.refresh_from_db()
+        self.assertEqual(str(order.total_price), '10.00')
+
+    def test_update_unpriced_legacy_order(self):
+        """Test saving an unpriced order whose size left the menu"""
+
+        pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        order = Order.objects.create(customer=self.user, pizza_flavour=pizza)
+        Order.objects.update(unit_price=None, total_price=None)
+        pizza.prices = {"M": 15.00, "L": 20.00}
+        pizza.save()
+
+        res = self.client.patch(detail_url(order.uuid), {'status': 'I'})
+
+        order.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['total_price'])
+        self.assertIsNone(order.total_price)
+
+    def test_partial_update_order_reprices(self):
+        """Test changing the size or quantity of an order reprices it"""
+
+        pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        order = Order.objects.create(customer=self.user, pizza_flavour=pizza)
+
+        res = self.client.patch(detail_url(order.uuid),
+                                {'size': 'L', 'quantity': 2})
+
+        order.refresh_from_db()
+        self.assertEqual(str(order.unit_price), '20.00')
+        self.assertEqual(str(order.total_price), '40.00')
+        self.assertEqual(res.data['total_price'], '40.00')
+
     def test_create_order_invalid(self):
         """Test creating a new pizza order with invalid payload"""
         payload = {'flavour': '', 'size': ''}
@@ -248,7 +372,1032 @@ class PrivateOrderApiTests(TestCase):
         res = self.client.get(ORDER_URL, {'status': 'I,P'})
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(order_serializer1.data[0], res.data)
-        self.assertIn(order_serializer1.data[1], res.data)
-        self.assertIn(order_serializer2.data[0], res.data)
-        self.assertIn(order_serializer2.data[1], res.data)
+        self.assertIn(order_serializer1.data[0], res.data['results'])
+        self.assertIn(order_serializer1.data[1], res.data['results'])
+        self.assertIn(order_serializer2.data[0], res.data['results'])
+        self.assertIn(order_serializer2.data[1], res.data['results'])
+
+
+ADMIN_ORDER_URL = reverse('order:adminOrders-list')
+
+
+class OrderQueryCountTests(TestCase):
+    """Test the order listing queries do not grow with the number of rows"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@andela.com',
+            'password'
+        )
+        self.pizzas = [
+            Pizza.objects.create(flavour=flavour,
+                                 prices={"S": 10.00, "M": 15.00, "L": 20.00})
+            for flavour in ('Vegan', 'Dessert', 'Ankara')
+        ]
+        self.client = APIClient()
+
+    def add_orders(self, count, **kwargs):
+        """Create `count` orders for the user spread across all pizzas"""
+        for i in range(count):
+            Order.objects.create(customer=self.user,
+                                 pizza_flavour=self.pizzas[i % 3], **kwargs)
+
+    def assertConstantQueries(self, url, num, params=None,
+                              sizes=(1, 5, 20), **kwargs):
+        """Assert `url` runs `num` queries however many orders it returns"""
+        total = 0
+        for size in sizes:
+            self.add_orders(size, **kwargs)
+            total += size
+
+            with self.assertNumQueries(num):
+                res = self.client.get(url, params)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data['results']), total)
+
+    def test_list_orders_query_count(self):
+        """Test listing orders runs a fixed number of queries"""
+        self.client.force_authenticate(self.user)
+
+        self.assertConstantQueries(ORDER_URL, 2)
+
+    def test_list_orders_by_status_query_count(self):
+        """Test filtering orders by status runs a fixed number of queries"""
+        self.client.force_authenticate(self.user)
+
+        self.assertConstantQueries(ORDER_URL, 2, {'status': 'I,P'},
+                                   status='I')
+
+    def test_admin_list_orders_query_count(self):
+        """Test the admin order listing runs a fixed number of queries"""
+        self.client.force_authenticate(self.admin)
+
+        self.assertConstantQueries(ADMIN_ORDER_URL, 1)
+
+    def test_admin_filter_orders_query_count(self):
+        """Test the filtered admin listing runs a fixed number of queries"""
+        self.client.force_authenticate(self.admin)
+
+        self.assertConstantQueries(
+            ADMIN_ORDER_URL, 1,
+            {'status': 'P', 'customer': self.user.email}
+        )
+
+    def test_view_order_detail_query_count(self):
+        """Test retrieving an order loads its customer and pizza together"""
+        self.client.force_authenticate(self.user)
+        order = Order.objects.create(customer=self.user,
+                                     pizza_flavour=self.pizzas[0])
+
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(order.uuid))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['customer'], '')
+
+
+class OrderValuesSerializerTests(TestCase):
+    """Test the order listing serializer matches OrderSerializer"""
+
+    def setUp(self):
+        menu_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password',
+            name='Johnny'
+        )
+        self.unnamed = get_user_model().objects.create_user(
+            email='jane@andela.com',
+            password='password'
+        )
+        self.pizza = Pizza.objects.create(
+            flavour='Vegan', prices={"S": 10.00, "M": 15.25, "L": 20}
+        )
+
+    def test_output_matches_model_serializer(self):
+        """Test both serializers render the same JSON bytes"""
+
+        for user, size, quantity, order_status in (
+                (self.user, 'S', 1, 'P'), (self.unnamed, 'M', 3, 'DL'),
+                (self.user, 'L', 2, 'C')):
+            Order.objects.create(customer=user, pizza_flavour=self.pizza,
+                                 size=size, quantity=quantity,
+                                 status=order_status)
+        Order.objects.filter(size='M').update(unit_price=None,
+                                              total_price=None)
+        orders = Order.objects.select_related('customer', 'pizza_flavour') \
+            .order_by('-created_at')
+
+        expected = JSONRenderer().render(
+            OrderSerializer(orders, many=True).data
+        )
+        rows = orders.values(*OrderValuesSerializer.columns)
+
+        self.assertEqual(
+            JSONRenderer().render(OrderValuesSerializer(rows, many=True).data),
+            expected
+        )
+        self.assertIn(b'"total_price":"45.75"', expected)
+
+    def test_list_orders_uses_values(self):
+        """Test the listing serializes rows without model instances"""
+
+        order = Order.objects.create(customer=self.user,
+                                     pizza_flavour=self.pizza)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = client.get(ORDER_URL)
+
+        self.assertEqual(res.data['results'],
+                         [OrderSerializer(order).data])
+        self.assertNotIn('"core_pizza"', queries[-1]['sql'])
+
+
+class OrderConditionalGetTests(TestCase):
+    """Test order reads are answered with 304 when nothing changed"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        self.pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        self.order = Order.objects.create(customer=self.user,
+                                          pizza_flavour=self.pizza)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_orders_not_modified(self):
+        """Test an unchanged order listing is not sent again"""
+
+        res = self.client.get(ORDER_URL)
+        self.assertIn('ETag', res)
+        self.assertNotIn('Last-Modified', res)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ORDER_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_list_orders_modified(self):
+        """Test updating, adding or deleting an order changes the ETag"""
+
+        etags = [self.client.get(ORDER_URL)['ETag']]
+
+        self.order.status = Order.IN_PROGRESS
+        self.order.save()
+        etags.append(self.client.get(ORDER_URL)['ETag'])
+
+        Order.objects.create(customer=self.user, pizza_flavour=self.pizza)
+        etags.append(self.client.get(ORDER_URL)['ETag'])
+
+        self.order.delete()
+        res = self.client.get(ORDER_URL, HTTP_IF_NONE_MATCH=etags[-1])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(set(etags + [res['ETag']])), 4)
+
+    def test_list_orders_ignore_if_modified_since(self):
+        """Test a deleted order is not hidden by If-Modified-Since"""
+
+        latest = Order.objects.create(customer=self.user,
+                                      pizza_flavour=self.pizza)
+        since = http_date(latest.updated_at.timestamp())
+        self.order.delete()
+
+        res = self.client.get(ORDER_URL, HTTP_IF_MODIFIED_SINCE=since)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_orders_etag_per_filter(self):
+        """Test an ETag only matches the listing it was sent with"""
+
+        etag = self.client.get(ORDER_URL)['ETag']
+
+        res = self.client.get(ORDER_URL, {'status': 'I'},
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_view_order_detail_ignore_if_modified_since(self):
+        """Test a change within the second is not hidden by its timestamp"""
+
+        since = http_date(self.order.updated_at.timestamp())
+        etag = self.client.get(detail_url(self.order.uuid))['ETag']
+        self.order.quantity = 2
+        self.order.save()
+
+        res = self.client.get(detail_url(self.order.uuid),
+                              HTTP_IF_MODIFIED_SINCE=since)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Last-Modified', res)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_view_order_detail_modified(self):
+        """Test a changed order is sent again"""
+
+        etag = self.client.get(detail_url(self.order.uuid))['ETag']
+        self.client.patch(detail_url(self.order.uuid), {'quantity': 2})
+
+        res = self.client.get(detail_url(self.order.uuid),
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['quantity'], 2)
+
+
+BULK_ORDER_URL = reverse('order:order-bulk-create')
+
+
+class BulkOrderApiTests(TestCase):
+    """Test placing many orders in one request"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        self.pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_orders(self):
+        """Test every valid order in the batch is created"""
+
+        payload = [
+            {'pizza_flavour': 'Vegan', 'size': 'L', 'quantity': 2},
+            {'pizza_flavour': 'Vegan'},
+        ]
+        res = self.client.post(BULK_ORDER_URL, payload, format='json')
+
+        orders = Order.objects.filter(customer=self.user)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['created']), 2)
+        self.assertEqual(res.data['errors'], [])
+        self.assertEqual(orders.count(), 2)
+        self.assertEqual(res.data['created'][0]['total_price'], '40.00')
+        self.assertEqual(str(orders.get(size='S').total_price), '10.00')
+
+    def test_bulk_create_reports_invalid_items(self):
+        """Test invalid items are reported without aborting valid ones"""
+
+        payload = {'orders': [
+            {'pizza_flavour': 'Vegan', 'size': 'M'},
+            {'pizza_flavour': 'Unknown'},
+            {'pizza_flavour': 'Vegan', 'size': 'X'},
+            {'pizza_flavour': 'Vegan', 'quantity': 0},
+            'Vegan',
+            {'pizza_flavour': 'Vegan', 'quantity': 2147483647},
+        ]}
+        res = self.client.post(BULK_ORDER_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['created']), 1)
+        self.assertEqual([error['index'] for error in res.data['errors']],
+                         [1, 2, 3, 4, 5])
+        self.assertIn('pizza_flavour', res.data['errors'][0]['errors'])
+        self.assertIn('size', res.data['errors'][1]['errors'])
+        self.assertIn('quantity', res.data['errors'][2]['errors'])
+        self.assertIn('quantity', res.data['errors'][4]['errors'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_bulk_create_all_invalid(self):
+        """Test a batch without any valid order fails"""
+
+        payload = [{'pizza_flavour': 'Unknown'}]
+        res = self.client.post(BULK_ORDER_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+
+    def test_bulk_create_empty(self):
+        """Test an empty or malformed batch is rejected"""
+
+        for payload in ([], {'orders': 'Vegan'}):
+            res = self.client.post(BULK_ORDER_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_query_count(self):
+        """Test the number of queries does not grow with the batch size"""
+
+        self.client.post(BULK_ORDER_URL, [{'pizza_flavour': 'Vegan'}],
+                         format='json')
+
+        counts = []
+        for size in (2, 50):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(BULK_ORDER_URL,
+                                 [{'pizza_flavour': 'Vegan'}] * size,
+                                 format='json')
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(Order.objects.count(), 53)
+
+
+class IdempotentOrderApiTests(TestCase):
+    """Test repeated order requests with an Idempotency-Key"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        self.pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, url, payload, key='order-1'):
+        return self.client.post(url, payload, format='json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_created_order(self):
+        """Test a retried order is not created twice"""
+
+        payload = {'pizza_flavour': 'Vegan', 'size': 'M'}
+        first = self.post(ORDER_URL, payload)
+
+        with self.assertNumQueries(1):
+            retry = self.post(ORDER_URL, payload)
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_new_key_creates_order(self):
+        """Test requests with other keys or users are not replayed"""
+
+        payload = {'pizza_flavour': 'Vegan'}
+        self.post(ORDER_URL, payload)
+        self.post(ORDER_URL, payload, key='order-2')
+
+        other = get_user_model().objects.create_user(
+            'other@andela.com',
+            'testpass'
+        )
+        self.client.force_authenticate(other)
+        self.post(ORDER_URL, payload)
+
+        self.assertEqual(Order.objects.count(), 3)
+
+    def test_key_reused_for_other_payload(self):
+        """Test a key cannot be reused for a different order"""
+
+        self.post(ORDER_URL, {'pizza_flavour': 'Vegan'})
+
+        res = self.post(ORDER_URL, {'pizza_flavour': 'Vegan', 'size': 'L'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_failed_request_is_not_stored(self):
+        """Test a key is free again after its request failed"""
+
+        res = self.post(ORDER_URL, {'pizza_flavour': 'Unknown'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        res = self.post(ORDER_URL, {'pizza_flavour': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_KEY_TTL=0)
+    def test_expired_key_is_reused(self):
+        """Test a key is handled as new once its ttl has passed"""
+
+        payload = {'pizza_flavour': 'Vegan'}
+        self.post(ORDER_URL, payload)
+
+        res = self.post(ORDER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', res)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_retry_replays_bulk_orders(self):
+        """Test a retried batch of orders is not created twice"""
+
+        payload = [{'pizza_flavour': 'Vegan'}, {'pizza_flavour': 'Unknown'}]
+        first = self.post(BULK_ORDER_URL, payload)
+
+        retry = self.post(BULK_ORDER_URL, payload)
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_invalid_key(self):
+        """Test an empty or overlong key is rejected"""
+
+        for key in ('', 'k' * 256):
+            res = self.post(ORDER_URL, {'pizza_flavour': 'Vegan'}, key=key)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertFalse(Order.objects.exists())
+
+
+TRANSITION_URL = reverse('order:adminOrders-transition')
+
+
+class AdminOrderTransitionApiTests(TestCase):
+    """Test moving many orders to a new status at once"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@andela.com',
+            'password'
+        )
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        self.pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_order(self, order_status, customer=None):
+        return Order.objects.create(customer=customer or self.user,
+                                    pizza_flavour=self.pizza,
+                                    status=order_status)
+
+    def test_transition_orders_by_uuid(self):
+        """Test allowed orders move and the others are reported"""
+
+        pending = self.create_order(Order.PENDING)
+        delivered = self.create_order(Order.DELIVERED)
+        missing = uuid.uuid4()
+
+        payload = {'status': 'I',
+                   'orders': [str(pending.uuid), str(delivered.uuid),
+                              str(missing)]}
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(TRANSITION_URL, payload, format='json')
+
+        pending.refresh_from_db()
+        delivered.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['updated'], [pending.uuid])
+        self.assertEqual(res.data['skipped'],
+                         [{'id': delivered.uuid, 'status': 'DL'}])
+        self.assertEqual(res.data['not_found'], [missing])
+        self.assertEqual(len([query for query in queries
+                              if 'UPDATE "core_order"' in query['sql']]), 1)
+        self.assertEqual(pending.status, Order.IN_PROGRESS)
+        self.assertEqual(delivered.status, Order.DELIVERED)
+
+    def test_transition_orders_by_filter(self):
+        """Test orders matching the admin filters are moved"""
+
+        other = get_user_model().objects.create_user('other@andela.com',
+                                                     'testpass')
+        mine = [self.create_order(Order.DONE) for _ in range(3)]
+        theirs = self.create_order(Order.DONE, customer=other)
+
+        res = self.client.post(
+            '{}?customer={}'.format(TRANSITION_URL, self.user.email),
+            {'status': 'DL'}, format='json'
+        )
+
+        theirs.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(res.data['updated']),
+                         sorted(order.uuid for order in mine))
+        self.assertEqual(Order.objects.filter(status='DL').count(), 3)
+        self.assertEqual(theirs.status, Order.DONE)
+
+    def test_transition_requires_orders_or_filter(self):
+        """Test a transition without orders or filters is rejected"""
+
+        self.create_order(Order.PENDING)
+
+        res = self.client.post(TRANSITION_URL, {'status': 'I'},
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.filter(status='I').exists())
+
+    def test_transition_invalid_payload(self):
+        """Test unknown statuses and malformed order ids are rejected"""
+
+        order = self.create_order(Order.PENDING)
+
+        for payload in ({'status': 'P', 'orders': [str(order.uuid)]},
+                        {'status': 'I', 'orders': ['not-a-uuid']},
+                        {'status': 'I', 'orders': []}):
+            res = self.client.post(TRANSITION_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_transition_admin_only(self):
+        """Test customers cannot move orders in bulk"""
+
+        order = self.create_order(Order.PENDING)
+        self.client.force_authenticate(self.user)
+
+        res = self.client.post(TRANSITION_URL,
+                               {'status': 'C', 'orders': [str(order.uuid)]},
+                               format='json')
+
+        order.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(order.status, Order.PENDING)
+
+
+EXPORT_URL = reverse('order:adminOrders-export')
+
+
+class AdminOrderExportApiTests(TestCase):
+    """Test streaming the order history to admins"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@andela.com',
+            'password'
+        )
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password',
+            name='Johnny'
+        )
+        self.pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        self.orders = [
+            Order.objects.create(customer=self.user, pizza_flavour=self.pizza,
+                                 size='M', quantity=2),
+            Order.objects.create(customer=self.admin, pizza_flavour=self.pizza,
+                                 status='DL'),
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_export_ndjson(self):
+        """Test orders stream as one JSON document per line"""
+
+        res = self.client.get(EXPORT_URL)
+
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        expected = OrderSerializer(self.orders[0]).data
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['id'], str(expected['id']))
+        self.assertEqual(rows[0]['total_price'], expected['total_price'])
+        self.assertEqual(rows[0]['customer'], 'Johnny')
+        self.assertEqual(rows[0]['flavour'], 'Vegan')
+        self.assertEqual(rows[0]['status'], 'Pending')
+        self.assertEqual(rows[0]['created_at'], expected['created_at'])
+
+    def test_export_csv_filtered(self):
+        """Test the CSV export applies the admin listing filters"""
+
+        res = self.client.get(EXPORT_URL, {'type': 'csv', 'status': 'DL'})
+
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.reader(content.splitlines()))
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        self.assertEqual(rows[0][:2], ['id', 'total_price'])
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][0], str(self.orders[1].uuid))
+        self.assertEqual(rows[1][7], 'Delivered')
+
+    def test_export_unpriced_order(self):
+        """Test unpriced orders export the total the API shows"""
+
+        Order.objects.update(unit_price=None, total_price=None)
+
+        res = self.client.get(EXPORT_URL)
+
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        expected = OrderSerializer(Order.objects.get(size='M')).data
+        self.assertEqual(rows[0]['total_price'], '30.00')
+        self.assertEqual(rows[0]['total_price'], expected['total_price'])
+
+    def test_export_invalid_type(self):
+        """Test unknown export types are rejected"""
+
+        res = self.client.get(EXPORT_URL, {'type': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_admin_only(self):
+        """Test customers cannot export the order history"""
+
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AdminOrderExportCursorTests(TransactionTestCase):
+    """Test the export streams rows as the query produces them"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@andela.com',
+            'password'
+        )
+        pizza = Pizza.objects.create(flavour='Vegan', prices={"S": 10.00})
+        create_orders([pizza, pizza], self.admin)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_export_cursor_is_not_held(self):
+        """Test rows are read in a transaction, not a WITH HOLD cursor"""
+
+        res = self.client.get(EXPORT_URL)
+        stream = iter(res.streaming_content)
+        next(stream)
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT is_holdable FROM pg_cursors')
+            holdable = [row[0] for row in cursor.fetchall()]
+
+        self.assertEqual(len(list(stream)), 1)
+        self.assertEqual(holdable, [False])
+        self.assertFalse(connection.in_atomic_block)
+
+
+def events_url(order_uuid):
+    """Return order events URL"""
+    return reverse('order:order-events', args=[order_uuid])
+
+
+class ArchivedOrderApiTests(TestCase):
+    """Test archived orders can be read but not changed"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@andela.com',
+            'password'
+        )
+        self.pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        self.order = Order.objects.create(customer=self.user,
+                                          pizza_flavour=self.pizza)
+        self.archived = ArchivedOrder.objects.create(
+            customer=self.user, pizza_flavour=self.pizza,
+            status=Order.DELIVERED, unit_price=10, total_price=10
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_archived_orders(self):
+        """Test ?archived=true lists the archived orders only"""
+
+        res = self.client.get(ORDER_URL, {'archived': 'true'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([str(order['id']) for order in res.data['results']],
+                         [str(self.archived.uuid)])
+        self.assertEqual(res.data['results'][0]['status'], 'Delivered')
+        self.assertEqual(res.data['results'][0]['total_price'], '10.00')
+
+    def test_list_current_orders(self):
+        """Test archived orders are left out of the order list"""
+
+        res = self.client.get(ORDER_URL)
+
+        self.assertEqual([str(order['id']) for order in res.data['results']],
+                         [str(self.order.uuid)])
+
+    def test_retrieve_archived_order(self):
+        """Test an archived order can be retrieved"""
+
+        res = self.client.get(detail_url(self.archived.uuid),
+                              {'archived': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], self.archived.uuid)
+
+    def test_update_archived_order_fails(self):
+        """Test archived orders cannot be changed"""
+
+        res = self.client.patch(
+            detail_url(self.archived.uuid) + '?archived=true',
+            {'quantity': 2}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.archived.refresh_from_db()
+        self.assertEqual(self.archived.quantity, 1)
+
+    def test_admin_list_archived_orders(self):
+        """Test admins list the archived orders of every user"""
+
+        self.client.force_authenticate(self.admin)
+        res = self.client.get(ADMIN_ORDER_URL, {'archived': 'true',
+                                                'customer': self.user.email})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([str(order['id']) for order in res.data['results']],
+                         [str(self.archived.uuid)])
+
+
+class OrderIngestQueueTests(TestCase):
+    """Test orders queued at creation are inserted by the queue drain"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        queue_settings = override_settings(
+            ORDER_INGEST_QUEUE=True,
+            ORDER_INGEST_QUEUE_PATH=directory.name + '/orders.db'
+        )
+        queue_settings.enable()
+        self.addCleanup(queue_settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        self.pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.queue = get_queue()
+
+    def queued_order(self, pizza):
+        now = timezone.now()
+        order = Order(customer=self.user, pizza_flavour=pizza, quantity=2,
+                      created_at=now, updated_at=now)
+        order.unit_price, order.total_price = Order.price_for(pizza, 'S', 2)
+        return order
+
+    def test_create_queues_order(self):
+        """Test a created order is queued, then inserted as it was shown"""
+
+        res = self.client.post(ORDER_URL, {'pizza_flavour': 'Vegan',
+                                           'size': 'M', 'quantity': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(len(self.queue), 1)
+
+        call_command('drain_order_queue', once=True, stdout=StringIO())
+
+        order = Order.objects.get(uuid=res.data['id'])
+        self.assertEqual(OrderSerializer(order).data, res.data)
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(
+            OrderRollup.objects.get(status=Order.PENDING).revenue, 30
+        )
+
+        res = self.client.get(detail_url(order.uuid))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_drain_skips_inserted_orders(self):
+        """Test an order queued again is inserted and counted once"""
+
+        order = self.queued_order(self.pizza)
+        self.queue.put(order)
+        drain(self.queue, 10)
+        self.queue.put(order)
+
+        self.assertEqual(drain(self.queue, 10), (0, 0))
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderRollup.objects.get().orders, 1)
+
+    def test_drain_moves_failing_orders_aside(self):
+        """Test orders that cannot be inserted do not hold up the others"""
+
+        pizza = Pizza.objects.create(flavour='Hawaiian', prices={'S': 8.00})
+        failing = self.queued_order(pizza)
+        self.queue.put(failing)
+        self.queue.put(self.queued_order(self.pizza))
+        pizza.delete()
+
+        self.assertEqual(drain(self.queue, 10), (1, 1))
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(Order.objects.get().pizza_flavour, self.pizza)
+        [(_, order, error)] = self.queue.failed()
+        self.assertEqual(order.uuid, failing.uuid)
+        self.assertIn('pizza_flavour_id', error)
+
+
+class LocalBrokerTests(TestCase):
+    """Test the in-process order event broker"""
+
+    def test_publish_reaches_channel_subscribers(self):
+        """Test messages only reach subscribers of their channel"""
+
+        broker = LocalBroker()
+        first = broker.subscribe('order:1')
+        other = broker.subscribe('order:2')
+
+        self.assertEqual(broker.publish('order:1', 'moved'), 1)
+
+        self.assertEqual(first.get(0), 'moved')
+        self.assertIsNone(other.get(0))
+
+    def test_closed_subscription_is_dropped(self):
+        """Test a closed subscription no longer receives messages"""
+
+        broker = LocalBroker()
+        broker.subscribe('order:1').close()
+
+        self.assertEqual(broker.publish('order:1', 'moved'), 0)
+
+
+class OrderEventsApiTests(TransactionTestCase):
+    """Test order changes are pushed to the order event stream"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@andela.com',
+            'password'
+        )
+        self.pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        self.order = Order.objects.create(customer=self.user,
+                                          pizza_flavour=self.pizza)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def read_event(self, stream):
+        """Return the data of the next event of `stream`"""
+        message = next(stream).decode('utf-8')
+        data = message.split('data: ', 1)[1]
+        return json.loads(data)
+
+    def test_stream_order_changes(self):
+        """Test updates and transitions are pushed until the order ends"""
+
+        res = self.client.get(events_url(self.order.uuid),
+                              HTTP_ACCEPT='text/event-stream')
+        stream = iter(res.streaming_content)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/event-stream')
+        self.assertEqual(self.read_event(stream)['status'], 'Pending')
+
+        self.client.patch(detail_url(self.order.uuid), {'quantity': 2})
+        event = self.read_event(stream)
+        self.assertEqual(event['quantity'], 2)
+        self.assertEqual(event['total_price'], '20.00')
+
+        admin = APIClient()
+        admin.force_authenticate(self.admin)
+        admin.post(reverse('order:adminOrders-transition'),
+                   {'status': 'C', 'orders': [str(self.order.uuid)]},
+                   format='json')
+        self.assertEqual(self.read_event(stream)['status'], 'Cancelled')
+
+        self.assertEqual(list(stream), [])
+
+    @override_settings(ORDER_EVENTS_HEARTBEAT=0)
+    def test_stream_sends_heartbeats(self):
+        """Test an idle stream sends comments to keep the connection open"""
+
+        res = self.client.get(events_url(self.order.uuid))
+        stream = iter(res.streaming_content)
+        next(stream)
+
+        self.assertEqual(next(stream), b': keep-alive\n\n')
+        res.close()
+
+    @override_settings(ORDER_EVENTS_TIMEOUT=0)
+    def test_stream_ends_after_timeout(self):
+        """Test the stream is closed for the client to reconnect"""
+
+        res = self.client.get(events_url(self.order.uuid))
+
+        self.assertEqual(len(list(res.streaming_content)), 1)
+
+    def test_stream_limited_to_user(self):
+        """Test other users cannot follow an order"""
+
+        other = get_user_model().objects.create_user(
+            'other@andela.com',
+            'testpass'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(events_url(self.order.uuid),
+                              HTTP_ACCEPT='text/event-stream')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(res.content.startswith(b'event: error'))
+        self.assertEqual(get_broker().publish(
+            'order:{}'.format(self.order.uuid), 'moved'
+        ), 0)
+
+
+class OrderTaskTests(TestCase):
+    """Test order signals are queued as tasks and sent by the worker"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        Pizza.objects.create(flavour='Vegan',
+                             prices={"S": 10.00, "M": 15.00, "L": 20.00})
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def listen(self, signal):
+        received = []
+
+        def receiver(sender, order, **kwargs):
+            received.append(order)
+
+        signal.connect(receiver)
+        self.addCleanup(signal.disconnect, receiver)
+        return received
+
+    def run_tasks(self):
+        for task_id in tasks.claim(10, 300):
+            self.assertTrue(tasks.run(task_id))
+
+    def test_create_order_queues_created_task(self):
+        """Test creating an order sends order_created from the worker"""
+
+        received = self.listen(order_created)
+        res = self.client.post(ORDER_URL, {'pizza_flavour': 'Vegan',
+                                           'size': 'M', 'quantity': 2})
+
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'order.created')
+        self.assertEqual(task.kwargs, {'order': str(res.data['id'])})
+
+        self.run_tasks()
+        self.assertEqual([str(order.uuid) for order in received],
+                         [str(res.data['id'])])
+        self.assertFalse(Task.objects.exists())
+
+    def test_update_order_queues_updated_task(self):
+        """Test updating an order sends order_updated from the worker"""
+
+        received = self.listen(order_updated)
+        order = create_orders(Pizza.objects.all(), self.user)[0]
+
+        self.client.patch(detail_url(order.uuid), {'size': 'L'})
+
+        self.assertEqual(Task.objects.get().name, 'order.updated')
+        self.run_tasks()
+        self.assertEqual(received, [order])
+        self.assertEqual(received[0].size, 'L')
+
+    def test_no_task_without_receivers(self):
+        """Test nothing is queued while no receiver is connected"""
+
+        res = self.client.post(ORDER_URL, {'pizza_flavour': 'Vegan'})
+        self.client.patch(detail_url(res.data['id']), {'size': 'L'})
+
+        self.assertFalse(Task.objects.exists())
+
+    def test_deleted_order_task_succeeds(self):
+        """Test the task of an order deleted since is dropped"""
+
+        order = create_orders(Pizza.objects.all(), self.user)[0]
+        received = self.listen(order_updated)
+        tasks.enqueue('order.updated', {'order': str(order.uuid)})
+        order.delete()
+
+        self.run_tasks()
+        self.assertEqual(received, [])
+        self.assertFalse(Task.objects.exists())
@@ -1,23 +1,69 @@
+import csv
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, mixins
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.generics import get_object_or_404
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 
-from core.models import Pizza, Order
+from core.authentication import CachedTokenAuthentication
+from core.conditional import ConditionalGetMixin
+from core.idempotency import idempotent
+from analytics.rollups import RollupDelta, record_orders
+from core.models import ArchivedOrder, Order
+from core.pagination import KeysetPagination
+from core.views import ReplicaReadMixin, ValuesListMixin
 
-from order import serializers
+from order import serializers, tasks
+from order.events import EventStreamRenderer, FINAL_STATUSES, format_event, \
+    get_broker, order_channel, order_event, publish_order
+from order.ingest import get_queue
+from pizza.cache import menu_cache
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class ArchivedOrdersMixin:
+    """Read archived orders instead of current ones with ?archived=true"""
+
+    archived_queryset = ArchivedOrder.objects.select_related(
+        'customer', 'pizza_flavour'
+    )
+
+    def get_orders(self):
+        """Return the current or archived orders to filter"""
+
+        archived = self.request.query_params.get('archived', '')
+
+        if archived.lower() not in ('1', 'true'):
+            return self.queryset.all()
+
+        if self.request.method not in SAFE_METHODS:
+            raise ValidationError({
+                'message': 'Archived orders cannot be changed!'
+            })
+
+        return self.archived_queryset.all()
+
+
+class OrderViewSet(ReplicaReadMixin, ArchivedOrdersMixin, ConditionalGetMixin,
+                   ValuesListMixin, viewsets.ModelViewSet):
     """Manage pizza in the database"""
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-    queryset = Order.objects.all()
+    queryset = Order.objects.select_related('customer', 'pizza_flavour')
     serializer_class = serializers.OrderSerializer
+    list_serializer_class = serializers.OrderValuesSerializer
+    pagination_class = KeysetPagination
 
     def _params_to_str(self, query_str):
         """Convert a list of string STATUS to a list of strings"""
@@ -28,7 +74,7 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         status_params = self.request.query_params.get('status', None)
 
-        queryset = self.queryset.filter(customer=self.request.user.id)
+        queryset = self.get_orders().filter(customer=self.request.user.id)
 
         if status_params is not None:
             status_ids = self._params_to_str(status_params)
@@ -36,6 +82,47 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """Return a page of orders unless the client's copy is current
+
+        The ETag covers the number of matching orders and their latest
+        update, read in one aggregate query before anything is serialized,
+        so deleting or archiving an order changes it too.
+        """
+
+        queryset = self.filter_queryset(self.get_queryset())
+        state = queryset.select_related(None).order_by().aggregate(
+            count=Count('uuid'), modified=Max('updated_at')
+        )
+        not_modified = self.check_not_modified(
+            request,
+            etag=self.make_etag(request, request.user.name,
+                                request.user.email, state['count'],
+                                state['modified'])
+        )
+
+        if not_modified is not None:
+            return not_modified
+
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return an order unless the client's copy is current"""
+
+        instance = self.get_object()
+        not_modified = self.check_not_modified(
+            request,
+            etag=self.make_etag(request, request.user.name,
+                                request.user.email, instance.updated_at)
+        )
+
+        if not_modified is not None:
+            return not_modified
+
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    @idempotent
     def create(self, request, *args, **kwargs):
         """prepares the request payload and creates a new pizza order"""
 
@@ -46,8 +133,12 @@ class OrderViewSet(viewsets.ModelViewSet):
                 'message': 'This field cannot be empty!'
             })
 
-        flavour = get_object_or_404(Pizza.objects.all(),
-                                    flavour=flavour_payload)
+        flavour = None
+        if isinstance(flavour_payload, str):
+            flavour = menu_cache.get_pizza_by_flavour(flavour_payload)
+
+        if flavour is None:
+            raise Http404
 
         size = request.data.get('size', 'S')
 
@@ -72,6 +163,12 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         serializer = self.get_serializer(data=payload)
         serializer.is_valid(raise_exception=True)
+
+        if settings.ORDER_INGEST_QUEUE:
+            order = self.perform_enqueue(serializer)
+            return Response(self.get_serializer(order).data,
+                            status=status.HTTP_202_ACCEPTED)
+
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED,
@@ -79,10 +176,175 @@ class OrderViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Saves an order to the db"""
-        serializer.save(customer=self.request.user)
+        with transaction.atomic():
+            order = serializer.save(customer=self.request.user)
+            tasks.queue_created([order.uuid])
+
+    def perform_enqueue(self, serializer):
+        """Queues an order for drain_order_queue to save to the db"""
+        now = timezone.now()
+        order = Order(customer=self.request.user, created_at=now,
+                      updated_at=now, **serializer.validated_data)
+        get_queue().put(order)
+        return order
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    @idempotent
+    def bulk_create(self, request, *args, **kwargs):
+        """creates many pizza orders, reporting the invalid ones by index"""
+
+        items = request.data
+        if isinstance(items, dict):
+            items = items.get('orders', None)
+
+        if not isinstance(items, list) or not items:
+            raise ValidationError({
+                'message': 'Provide a non-empty list of orders!'
+            })
+
+        if len(items) > settings.ORDER_BULK_MAX_ITEMS:
+            raise ValidationError({
+                'message': 'At most {} orders can be placed at once!'.format(
+                    settings.ORDER_BULK_MAX_ITEMS
+                )
+            })
+
+        validator = self.get_serializer()
+        orders, errors = [], []
+
+        for index, item in enumerate(items):
+            try:
+                validated_data = validator.run_validation(
+                    self._bulk_payload(item)
+                )
+            except ValidationError as exc:
+                errors.append({'index': index, 'errors': exc.detail})
+                continue
+
+            orders.append(Order(customer=request.user, **validated_data))
+
+        if orders:
+            with transaction.atomic():
+                self.perform_bulk_create(orders)
+
+        response_status = status.HTTP_201_CREATED if orders \
+            else status.HTTP_400_BAD_REQUEST
+        serializer = self.get_serializer(orders, many=True)
+        return Response({
+            'created': serializer.data,
+            'errors': errors
+        }, status=response_status)
+
+    def _bulk_payload(self, item):
+        """Resolve the flavour of one bulk order item from the menu"""
+
+        if not isinstance(item, dict):
+            raise ValidationError({
+                'message': 'Each order must be an object!'
+            })
+
+        flavour_payload = item.get('pizza_flavour', None)
+
+        if not flavour_payload:
+            raise ValidationError({
+                'pizza_flavour': ['This field cannot be empty!']
+            })
+
+        flavour = None
+        if isinstance(flavour_payload, str):
+            flavour = menu_cache.get_pizza_by_flavour(flavour_payload)
+
+        if flavour is None:
+            raise ValidationError({
+                'pizza_flavour': ['Pizza not found.']
+            })
+
+        return {
+            'pizza_flavour': flavour.uuid,
+            'size': item.get('size', 'S'),
+            'quantity': item.get('quantity', 1)
+        }
+
+    def perform_bulk_create(self, orders):
+        """Saves a batch of orders to the db in one INSERT"""
+        Order.objects.bulk_create(orders)
+        record_orders(orders)
+        tasks.queue_created([order.uuid for order in orders])
 
     def perform_update(self, serializer):
-        serializer.save()
+        with transaction.atomic():
+            order = serializer.save()
+            publish_order(order.uuid, order.status, order.size,
+                          order.quantity, order.total_price,
+                          order.updated_at)
+            tasks.queue_updated([order.uuid])
+
+    @action(detail=True, methods=['get'], url_path='events',
+            renderer_classes=(JSONRenderer, EventStreamRenderer))
+    def events(self, request, *args, **kwargs):
+        """streams changes to an order as Server-Sent Events
+
+        The order is loaded once to check it belongs to the user. The client
+        then holds the connection open and gets an `order` event whenever
+        the order is updated or moves to a new status, until it is
+        delivered or cancelled.
+        """
+
+        try:
+            channel = order_channel(uuid.UUID(kwargs[self.lookup_field]))
+        except ValueError:
+            raise Http404
+
+        # Subscribe before loading the order so no change is missed
+        subscription = get_broker().subscribe(channel)
+
+        try:
+            instance = self.get_object()
+        except Exception:
+            subscription.close()
+            raise
+
+        event = order_event(instance.uuid, instance.status, instance.size,
+                            instance.quantity, instance.total_price,
+                            instance.updated_at)
+        response = StreamingHttpResponse(
+            self._event_stream(event, subscription),
+            content_type=EventStreamRenderer.media_type
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def _event_stream(self, event, subscription):
+        heartbeat = settings.ORDER_EVENTS_HEARTBEAT
+        deadline = time.monotonic() + settings.ORDER_EVENTS_TIMEOUT
+
+        try:
+            # Nothing else is read from the database while streaming
+            if not connection.in_atomic_block:
+                connection.close()
+
+            while True:
+                yield format_event(event, event_id=event['updated_at'])
+
+                if event['status'] in FINAL_STATUSES:
+                    return
+
+                event = None
+                while event is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+
+                    event = subscription.get(min(heartbeat, remaining))
+                    if event is None:
+                        yield ': keep-alive\n\n'
+        finally:
+            subscription.close()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
 
     def partial_update(self, request, *args, **kwargs):
         kwargs['partial'] = True
@@ -105,11 +367,18 @@ class OrderViewSet(viewsets.ModelViewSet):
                         headers=headers)
 
 
-class AdminOrderViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
-    authentication_classes = (TokenAuthentication,)
+class AdminOrderViewSet(ReplicaReadMixin, ArchivedOrdersMixin, ValuesListMixin,
+                        mixins.ListModelMixin, viewsets.GenericViewSet):
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-    queryset = Order.objects.all()
+    queryset = Order.objects.select_related('customer', 'pizza_flavour')
     serializer_class = serializers.OrderSerializer
+    list_serializer_class = serializers.OrderValuesSerializer
+    pagination_class = KeysetPagination
+
+    def _params_to_str(self, query_str):
+        """Convert a list of string STATUS to a list of strings"""
+        return [s_str for s_str in query_str.split(',')]
 
     def get_queryset(self):
         """Return all objects for only an admin user """
@@ -122,7 +391,7 @@ class AdminOrderViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
         status_params = self.request.query_params.get('status', None)
         customer = self.request.query_params.get('customer', None)
 
-        queryset = self.queryset
+        queryset = self.get_orders()
 
         if status_params is not None:
             status_ids = self._params_to_str(status_params)
@@ -132,3 +401,218 @@ class AdminOrderViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
             queryset = queryset.filter(customer__email=customer)
 
         return queryset
+
+    EXPORT_FIELDS = ('uuid', 'total_price', 'pizza_flavour',
+                     'pizza_flavour__flavour', 'customer__name',
+                     'customer__email', 'size', 'quantity', 'status',
+                     'created_at')
+
+    EXPORT_COLUMNS = ('id', 'total_price', 'pizza_flavour', 'flavour',
+                      'customer', 'size', 'quantity', 'status', 'created_at')
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request, *args, **kwargs):
+        """streams every order matching the admin filters as CSV or NDJSON
+
+        Rows are read through a server-side cursor and written out as they
+        arrive, so memory stays flat however many orders are exported.
+        """
+
+        export_type = request.query_params.get('type', 'ndjson')
+
+        if export_type not in ('csv', 'ndjson'):
+            raise ValidationError({
+                'message': 'Export type must be csv or ndjson!'
+            })
+
+        rows = self._export_cursor(
+            self.get_queryset().order_by('created_at', 'uuid')
+            .values_list(*self.EXPORT_FIELDS)
+        )
+
+        if export_type == 'csv':
+            content, content_type = self._export_csv(rows), 'text/csv'
+        else:
+            content = self._export_ndjson(rows)
+            content_type = 'application/x-ndjson'
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = \
+            'attachment; filename="orders.{}"'.format(export_type)
+        return response
+
+    def _export_cursor(self, queryset):
+        """Yield the rows of `queryset` as Postgres sends them
+
+        Outside a transaction the server-side cursor is declared WITH HOLD,
+        which makes Postgres run the whole query before the first row is
+        fetched, so the rows are read in a transaction.
+        """
+
+        with transaction.atomic(using=queryset.db):
+            yield from queryset.iterator(
+                chunk_size=settings.ORDER_EXPORT_CHUNK_SIZE
+            )
+
+    def _export_rows(self, rows):
+        """Convert exported rows to the values shown by OrderSerializer"""
+
+        statuses = dict(Order.STATUS_CHOICES)
+
+        for (pk, total_price, pizza, flavour, name, email, size, quantity,
+             order_status, created_at) in rows:
+            created_at = created_at.isoformat()
+            if created_at.endswith('+00:00'):
+                created_at = created_at[:-6] + 'Z'
+
+            yield (
+                str(pk),
+                serializers.order_total_price(total_price, pizza, size,
+                                              quantity),
+                str(pizza),
+                flavour,
+                name if name is not None else email,
+                size,
+                quantity,
+                statuses.get(order_status, order_status),
+                created_at
+            )
+
+    def _export_csv(self, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(self.EXPORT_COLUMNS)
+
+        for row in self._export_rows(rows):
+            yield writer.writerow(row)
+
+    def _export_ndjson(self, rows):
+        for row in self._export_rows(rows):
+            yield json.dumps(dict(zip(self.EXPORT_COLUMNS, row)),
+                             separators=(',', ':')) + '\n'
+
+    @action(detail=False, methods=['post'], url_path='transition')
+    @idempotent
+    def transition(self, request, *args, **kwargs):
+        """moves many orders to a new status in a single UPDATE
+
+        Orders are picked by the uuids in `orders`, by the `status` and
+        `customer` query filters of the admin listing, or both. Orders
+        whose current status cannot move to the new one are skipped.
+        """
+
+        queryset = self.get_queryset()
+        target = request.data.get('status', None)
+        sources = Order.statuses_moving_to(target)
+
+        if not sources:
+            raise ValidationError({
+                'message': 'Orders cannot be moved to this status!'
+            })
+
+        requested = self._transition_uuids(request.data.get('orders', None))
+
+        if requested is not None:
+            queryset = queryset.filter(uuid__in=requested)
+        elif not {'status', 'customer'}.intersection(request.query_params):
+            raise ValidationError({
+                'message': 'Provide a list of orders or a filter!'
+            })
+
+        with transaction.atomic():
+            rows = self.perform_transition(queryset, target, sources)
+
+        moved = [row[0] for row in rows if row[2]]
+        skipped = [{'id': row[0], 'status': row[1]}
+                   for row in rows if not row[2]]
+        found = {row[0] for row in rows}
+        not_found = [pk for pk in requested or [] if pk not in found]
+
+        return Response({
+            'status': target,
+            'updated': moved,
+            'skipped': skipped,
+            'not_found': not_found
+        }, status=status.HTTP_200_OK)
+
+    def _transition_uuids(self, orders):
+        """Parse the list of order uuids of a transition request"""
+
+        if orders is None:
+            return None
+
+        if not isinstance(orders, list) or not orders or \
+                len(orders) > settings.ORDER_BULK_MAX_ITEMS:
+            raise ValidationError({
+                'message': 'Provide a list of at most {} orders!'.format(
+                    settings.ORDER_BULK_MAX_ITEMS
+                )
+            })
+
+        try:
+            return list(dict.fromkeys(uuid.UUID(str(pk)) for pk in orders))
+        except ValueError:
+            raise ValidationError({
+                'message': 'Orders must be a list of order ids!'
+            })
+
+    def perform_transition(self, queryset, target, sources):
+        """Move the orders of `queryset` from `sources` to `target`
+
+        Returns (uuid, previous status, moved) for every matched order. The
+        matched orders are locked as they are read, so the previous status
+        is the one the UPDATE replaces even when another request moved the
+        order meanwhile. The allowed sources are checked again by the
+        UPDATE itself, so orders changed concurrently are skipped rather
+        than moved illegally. The order rollups are moved along with the
+        orders.
+        """
+
+        table = connection.ops.quote_name(Order._meta.db_table)
+        select_sql, select_params = queryset.values(
+            'uuid', 'status', 'created_at', 'pizza_flavour', 'size',
+            'quantity', 'total_price'
+        ).query.sql_with_params()
+        select_sql += ' FOR UPDATE OF ' + table
+
+        update_sql = (
+            'WITH target (uuid, status, created_at, pizza_flavour_id, size,'
+            ' quantity, total_price) AS (' + select_sql + '), '
+            'moved AS ('
+            ' UPDATE {table} SET status = %s, updated_at = %s'
+            ' FROM target WHERE {table}.uuid = target.uuid'
+            ' AND {table}.status IN %s'
+            ' RETURNING {table}.uuid'
+            ') '
+            'SELECT target.uuid, target.status, moved.uuid IS NOT NULL,'
+            ' target.created_at, target.pizza_flavour_id, target.size,'
+            ' target.quantity, target.total_price '
+            'FROM target LEFT JOIN moved ON moved.uuid = target.uuid'
+        ).replace('{table}', table)
+        now = timezone.now()
+        params = list(select_params) + [target, now, tuple(sources)]
+
+        with connection.cursor() as cursor:
+            cursor.execute(update_sql, params)
+            rows = cursor.fetchall()
+
+        delta = RollupDelta()
+        for (order_uuid, previous, moved, created_at, pizza, size, quantity,
+             total_price) in rows:
+            if moved:
+                delta.add(created_at, pizza, size, previous, quantity,
+                          total_price, sign=-1)
+                delta.add(created_at, pizza, size, target, quantity,
+                          total_price)
+                publish_order(order_uuid, target, size, quantity,
+                              total_price, now)
+        delta.apply()
+        tasks.queue_updated([row[0] for row in rows if row[2]])
+
+        return rows
+
+
+class _Echo:
+    """File-like object handing back what the csv writer writes to it"""
+
+    def write(self, value):
+        return value
@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class PizzaConfig(AppConfig):
     name = 'pizza'
+
+    def ready(self):
+        from core.models import Pizza
+        from pizza.cache import invalidate_menu
+
+        post_save.connect(invalidate_menu, sender=Pizza,
+                          dispatch_uid='pizza.invalidate_menu.save')
+        post_delete.connect(invalidate_menu, sender=Pizza,
+                            dispatch_uid='pizza.invalidate_menu.delete')
@@ -0,0 +1,147 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from core.cache import LocalLRUCache
+from core.db import routers
+from core.models import Pizza
+
+
+_MISSING = object()
+
+
+class MenuCache:
+    """Cache for menu reads, invalidated whenever a pizza changes
+
+    Values are looked up in a per-process LRU first, then in the shared
+    Django cache named by MENU_CACHE_ALIAS. Every key is prefixed with a
+    version counter kept in the shared cache, so bumping the version on a
+    pizza save or delete makes every process miss and reload the menu.
+    Until replicas have caught up with the change, the menu is reloaded
+    from the primary, or the stale menu would be cached under the new
+    version.
+    """
+
+    version_key = 'menu:version'
+    sticky_key = 'menu'
+
+    def __init__(self, alias=None, local_size=None, timeout=None):
+        self.alias = alias or settings.MENU_CACHE_ALIAS
+        self.timeout = settings.MENU_CACHE_TIMEOUT if timeout is None \
+            else timeout
+        self.local = LocalLRUCache(
+            local_size or settings.MENU_CACHE_LOCAL_SIZE
+        )
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def get_version(self):
+        version = self.shared.get(self.version_key)
+
+        if version is None:
+            self.shared.add(self.version_key, 1, None)
+            version = self.shared.get(self.version_key, 1)
+
+        return version
+
+    def bump(self):
+        """Invalidate every cached menu entry in all processes"""
+        routers.stick(self.sticky_key)
+
+        try:
+            return self.shared.incr(self.version_key)
+        except ValueError:
+            self.shared.add(self.version_key, 1, None)
+            return self.shared.incr(self.version_key)
+
+    def make_key(self, key, version):
+        return 'menu:{}:{}'.format(version, key)
+
+    def get(self, key, default=None, version=None):
+        if version is None:
+            version = self.get_version()
+
+        versioned_key = self.make_key(key, version)
+        value = self.local.get(versioned_key, _MISSING)
+
+        if value is _MISSING:
+            value = self.shared.get(versioned_key, _MISSING)
+            if value is _MISSING:
+                return default
+            self.local.set(versioned_key, value)
+
+        return value
+
+    def set(self, key, value, version=None):
+        """Cache `value` under `version`, the current one by default
+
+        Pass the version read before loading the value, so a value loaded
+        while a pizza changed is cached under the version it was loaded
+        at, which the change already made stale.
+        """
+        if version is None:
+            version = self.get_version()
+
+        versioned_key = self.make_key(key, version)
+        self.shared.set(versioned_key, value, self.timeout)
+        self.local.set(versioned_key, value)
+
+    def get_or_set(self, key, load):
+        version = self.get_version()
+        value = self.get(key, _MISSING, version)
+
+        if value is _MISSING:
+            with routers.sticky_reads(self.sticky_key):
+                value = load()
+            self.set(key, value, version)
+
+        return value
+
+    def clear(self):
+        self.local.clear()
+        self.bump()
+
+    def get_pizzas(self):
+        """Return the menu as dicts of pizzas by uuid and by flavour"""
+        def load():
+            pizzas = list(Pizza.objects.all())
+            return {
+                'uuid': {pizza.uuid: pizza for pizza in pizzas},
+                'flavour': {pizza.flavour: pizza for pizza in pizzas},
+            }
+
+        return self.get_or_set('pizzas', load)
+
+    def get_pizza(self, pk):
+        """Return the pizza with the uuid `pk`, or None if there is none"""
+        if not isinstance(pk, uuid.UUID):
+            pk = uuid.UUID(str(pk))
+
+        return self.get_pizzas()['uuid'].get(pk)
+
+    def get_pizza_by_flavour(self, flavour):
+        return self.get_pizzas()['flavour'].get(flavour)
+
+    def request_key(self, request):
+        """Return a cache key for the response to a menu read request"""
+        uri = request.build_absolute_uri().encode('utf-8')
+        return 'response:' + hashlib.md5(uri).hexdigest()
+
+
+menu_cache = MenuCache()
+
+
+def invalidate_menu(**kwargs):
+    """Signal receiver bumping the menu version when a pizza changes
+
+    The version is bumped straight away so this process reads its own
+    write, and again on commit so readers that cached the old row while
+    the transaction was open are invalidated too.
+    """
+    menu_cache.bump()
+    transaction.on_commit(menu_cache.bump)
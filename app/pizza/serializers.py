@@ -1,9 +1,11 @@
 from rest_framework import serializers
 
+from core.metrics import TimedSerializerMixin
 from core.models import Pizza
+from core.serializers import ValuesSerializer
 
 
-class PizzaSerializer(serializers.ModelSerializer):
+class PizzaSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for the Pizza model"""
 
     id = serializers.SerializerMethodField('get_id')
@@ -15,3 +17,17 @@ class PizzaSerializer(serializers.ModelSerializer):
 
     def get_id(self, obj):
         return obj.uuid
+
+
+created_at_field = serializers.DateTimeField(read_only=True)
+
+
+class PizzaValuesSerializer(TimedSerializerMixin, ValuesSerializer):
+    """PizzaSerializer output for the menu listing, from `.values()` rows"""
+
+    fields = (
+        ('id', ('uuid',), None),
+        ('flavour', ('flavour',), None),
+        ('prices', ('prices',), None),
+        ('created_at', ('created_at',), created_at_field.to_representation),
+    )
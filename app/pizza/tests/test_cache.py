@@ -0,0 +1,226 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.cache import LocalLRUCache
+from core.models import Pizza, Order
+from pizza.cache import MenuCache, menu_cache
+
+
+PIZZAS_URL = reverse('pizza:pizza-list')
+ORDER_URL = reverse('order:order-list')
+
+
+def detail_url(pizza_uuid):
+    """Return pizza detail URL"""
+    return reverse('pizza:pizza-detail', args=[pizza_uuid])
+
+
+class LocalLRUCacheTests(TestCase):
+    """Test the in-process LRU cache"""
+
+    def test_least_recently_used_is_evicted(self):
+        """Test the oldest unused entry is dropped when the cache is full"""
+
+        cache = LocalLRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_expired_entries_are_missed(self):
+        """Test entries older than the ttl are not returned"""
+
+        cache = LocalLRUCache(ttl=-1)
+        cache.set('a', 1)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+
+class MenuCacheTests(TestCase):
+    """Test the versioned menu cache"""
+
+    def setUp(self):
+        self.cache = MenuCache()
+        self.cache.clear()
+
+    def test_bump_invalidates_other_processes(self):
+        """Test a version bump invalidates the LRU of every cache instance"""
+
+        other = MenuCache()
+        self.cache.set('menu', ['Vegan'])
+        self.assertEqual(other.get('menu'), ['Vegan'])
+
+        self.cache.bump()
+
+        self.assertIsNone(other.get('menu'))
+        self.assertIsNone(self.cache.get('menu'))
+
+    def test_pizza_save_and_delete_invalidate(self):
+        """Test saving or deleting a pizza refreshes the cached menu"""
+
+        pizza = Pizza.objects.create(flavour='Vegan', prices={"S": 10.00})
+        self.assertEqual(self.cache.get_pizza(pizza.uuid), pizza)
+
+        pizza.flavour = 'Dessert'
+        pizza.save()
+        self.assertIsNone(self.cache.get_pizza_by_flavour('Vegan'))
+        self.assertEqual(self.cache.get_pizza_by_flavour('Dessert'), pizza)
+
+        pizza.delete()
+        self.assertIsNone(self.cache.get_pizza_by_flavour('Dessert'))
+
+    def test_value_loaded_during_bump_is_not_served(self):
+        """Test a menu loaded while a pizza changed is cached as stale"""
+
+        def load():
+            self.cache.bump()
+            return ['Vegan']
+
+        self.assertEqual(self.cache.get_or_set('menu', load), ['Vegan'])
+        self.assertEqual(self.cache.get_or_set('menu', lambda: ['Dessert']),
+                         ['Dessert'])
+
+    def test_zero_timeout(self):
+        """Test a timeout of 0 is kept rather than the default"""
+
+        self.assertEqual(MenuCache(timeout=0).timeout, 0)
+
+
+class MenuCacheApiTests(TestCase):
+    """Test the menu endpoints and order creation use the menu cache"""
+
+    def setUp(self):
+        menu_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        self.pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_pizzas_from_cache(self):
+        """Test a warm menu listing runs no queries"""
+
+        first = self.client.get(PIZZAS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(PIZZAS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, first.data)
+
+    def test_list_pizzas_after_create(self):
+        """Test a new pizza shows up in a previously cached listing"""
+
+        self.client.get(PIZZAS_URL)
+        Pizza.objects.create(flavour='Dessert', prices={"S": 10.00})
+
+        res = self.client.get(PIZZAS_URL)
+
+        flavours = [pizza['flavour'] for pizza in res.data['results']]
+        self.assertEqual(flavours, ['Dessert', 'Vegan'])
+
+    def test_view_pizza_detail_from_cache(self):
+        """Test a warm pizza detail runs no queries"""
+
+        self.client.get(detail_url(self.pizza.uuid))
+
+        with self.assertNumQueries(0):
+            res = self.client.get(detail_url(self.pizza.uuid))
+
+        self.assertEqual(res.data['flavour'], self.pizza.flavour)
+
+    def test_view_pizza_detail_not_found(self):
+        """Test an unknown or malformed pizza id is not found"""
+
+        res = self.client.get(detail_url('not-a-uuid'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_create_order_skips_pizza_lookup(self):
+        """Test creating an order with a warm menu only inserts the order"""
+
+        menu_cache.get_pizzas()
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(ORDER_URL, {'pizza_flavour': 'Vegan'})
+
+        tables = [query['sql'] for query in queries
+                  if 'core_pizza' in query['sql']]
+        self.assertEqual(tables, [])
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['pizza_flavour'], self.pizza.uuid)
+        self.assertTrue(Order.objects.filter(pizza_flavour=self.pizza)
+                        .exists())
+
+    def test_create_order_unknown_flavour(self):
+        """Test ordering a flavour missing from the menu is not found"""
+
+        res = self.client.post(ORDER_URL, {'pizza_flavour': 'Unknown'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class MenuConditionalGetTests(TestCase):
+    """Test menu reads are answered with 304 when the menu is unchanged"""
+
+    def setUp(self):
+        menu_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='johnny@andela.com',
+            password='password'
+        )
+        self.pizza = Pizza.objects.create(
+            flavour='Vegan',
+            prices={"S": 10.00, "M": 15.00, "L": 20.00}
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_pizzas_not_modified(self):
+        """Test an unchanged menu is answered from its ETag alone"""
+
+        res = self.client.get(PIZZAS_URL)
+        self.assertIn('no-cache', res['Cache-Control'])
+        self.assertNotIn('Last-Modified', res)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(PIZZAS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn('ETag', res)
+
+    def test_list_pizzas_modified(self):
+        """Test a menu change invalidates the ETag of the listing"""
+
+        etag = self.client.get(PIZZAS_URL)['ETag']
+        Pizza.objects.create(flavour='Dessert', prices={"S": 10.00})
+
+        res = self.client.get(PIZZAS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_view_pizza_detail_not_modified(self):
+        """Test an unchanged pizza is not sent again"""
+
+        res = self.client.get(detail_url(self.pizza.uuid))
+
+        res = self.client.get(detail_url(self.pizza.uuid),
+                              HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
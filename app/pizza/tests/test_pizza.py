@@ -3,10 +3,11 @@ from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 from rest_framework import status
 from core.models import Pizza
-from pizza.serializers import PizzaSerializer
+from pizza.serializers import PizzaSerializer, PizzaValuesSerializer
 
 
 PIZZAS_URL = reverse('pizza:pizza-list')
@@ -52,10 +53,10 @@ class PrivatePizzasApiTests(TestCase):
 
         res = self.client.get(PIZZAS_URL)
 
-        pizzas = Pizza.objects.all().order_by('-flavour')
+        pizzas = Pizza.objects.all().order_by('-created_at')
         serializer = PizzaSerializer(pizzas, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_create_pizza_successful(self):
         """Test creating a new pizza"""
@@ -128,3 +129,21 @@ class PrivatePizzasApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(len(pizza_state), 1)
         self.assertNotIn(pizza1_serializer.data, pizza_serializer.data)
+
+
+class PizzaValuesSerializerTests(TestCase):
+    """Test the menu listing serializer matches PizzaSerializer"""
+
+    def test_output_matches_model_serializer(self):
+        """Test both serializers render the same JSON bytes"""
+
+        Pizza.objects.create(flavour='Vegan',
+                             prices={"S": 10.00, "M": 15.50, "L": 20})
+        Pizza.objects.create(flavour='Dessert', prices={})
+        pizzas = Pizza.objects.order_by('-created_at')
+        rows = pizzas.values(*PizzaValuesSerializer.columns)
+
+        self.assertEqual(
+            JSONRenderer().render(PizzaValuesSerializer(rows, many=True).data),
+            JSONRenderer().render(PizzaSerializer(pizzas, many=True).data)
+        )
@@ -1,19 +1,76 @@
+from django.http import Http404
 from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
+from core.authentication import CachedTokenAuthentication
+from core.conditional import ConditionalGetMixin
 from core.models import Pizza
+from core.pagination import KeysetPagination
+from core.db import routers
+from core.views import ReplicaReadMixin, ValuesListMixin
 
 from pizza import serializers
+from pizza.cache import menu_cache
 
 
-class PizzaViewSet(viewsets.ModelViewSet):
+class PizzaViewSet(ReplicaReadMixin, ConditionalGetMixin, ValuesListMixin,
+                   viewsets.ModelViewSet):
     """Manage pizza in the database"""
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Pizza.objects.all()
     serializer_class = serializers.PizzaSerializer
+    list_serializer_class = serializers.PizzaValuesSerializer
+    pagination_class = KeysetPagination
+
+    def list(self, request, *args, **kwargs):
+        """Return a page of the menu, from the menu cache when possible
+
+        The ETag is the menu version, which every pizza change bumps.
+        """
+
+        version = menu_cache.get_version()
+        not_modified = self.check_not_modified(
+            request, etag=self.make_etag(request, version)
+        )
+
+        if not_modified is not None:
+            return not_modified
+
+        key = menu_cache.request_key(request)
+        data = menu_cache.get(key, version=version)
+
+        if data is None:
+            with routers.sticky_reads(menu_cache.sticky_key):
+                data = super().list(request, *args, **kwargs).data
+            menu_cache.set(key, data, version)
+
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return a pizza from the menu cache"""
+
+        try:
+            pizza = menu_cache.get_pizza(kwargs[self.lookup_field])
+        except ValueError:
+            pizza = None
+
+        if pizza is None:
+            raise Http404
+
+        self.check_object_permissions(request, pizza)
+        not_modified = self.check_not_modified(
+            request,
+            etag=self.make_etag(request, pizza.uuid, pizza.updated_at)
+        )
+
+        if not_modified is not None:
+            return not_modified
+
+        serializer = self.get_serializer(pizza)
+        return Response(serializer.data)
 
     def perform_create(self, serializer):
         """Create a new pizza"""